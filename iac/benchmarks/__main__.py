@@ -0,0 +1,119 @@
+"""
+Benchmarks the synth hot paths, using only local fixtures.
+
+    poetry run python -m benchmarks run --output results.json
+    poetry run python -m benchmarks compare baseline.json results.json
+    poetry run python -m benchmarks importtime -- k8s synth --help
+"""
+
+import json
+from pathlib import Path
+from typing import Annotated, Optional
+
+import typer
+from rich import print
+from rich.table import Table
+
+import benchmarks.cases  # noqa: F401, registers benchmarks
+from benchmarks.importtime import heavy_packages, import_times
+from benchmarks.runner import compare_results, run_benchmarks
+from lab.libs.cache import write_atomic
+from lab.libs.cli import make_typer
+
+app = make_typer()
+
+Threshold = Annotated[
+    float,
+    typer.Option(
+        min=0,
+        help="Fraction by which a metric may grow before it is a regression",
+    ),
+]
+
+
+def _compare(baseline: dict, current: dict, threshold: float) -> None:
+    comparisons = compare_results(baseline, current, threshold)
+
+    table = Table("benchmark", "metric", "baseline", "current", "change")
+    for x in comparisons:
+        change = "-" if x.change is None else f"{x.change:+.1%}"
+        table.add_row(
+            x.name,
+            x.metric,
+            f"{x.baseline:.2f}",
+            f"{x.current:.2f}",
+            f"[red]{change}[/red]" if x.regressed else change,
+        )
+    print(table)
+
+    if regressions := [x for x in comparisons if x.regressed]:
+        print(f"[red]{len(regressions)} regression(s) above {threshold:.0%}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command()
+def run(
+    output: Annotated[
+        Optional[Path], typer.Option(help="Write results to this JSON file")
+    ] = None,
+    pattern: Annotated[
+        str, typer.Option(help="Only run benchmarks matching this glob")
+    ] = "*",
+    repeat: Annotated[int, typer.Option(min=1)] = 5,
+    baseline: Annotated[
+        Optional[Path], typer.Option(help="Compare results against this JSON file")
+    ] = None,
+    threshold: Threshold = 0.1,
+) -> None:
+    """
+    Runs benchmarks, optionally comparing them against a baseline.
+    """
+    results = run_benchmarks(pattern=pattern, repeat=repeat)
+
+    if output:
+        write_atomic(output, (json.dumps(results, indent=2) + "\n").encode())
+
+    if baseline:
+        _compare(json.loads(baseline.read_text()), results, threshold)
+
+
+@app.command()
+def compare(
+    baseline: Path,
+    current: Path,
+    threshold: Threshold = 0.1,
+) -> None:
+    """
+    Compares stored results, failing if any metric regressed.
+    """
+    _compare(
+        json.loads(baseline.read_text()), json.loads(current.read_text()), threshold
+    )
+
+
+@app.command()
+def importtime(
+    args: Annotated[
+        Optional[list[str]], typer.Argument(help="Arguments to labcli")
+    ] = None,
+    top: Annotated[int, typer.Option(min=1)] = 20,
+) -> None:
+    """
+    Reports the slowest imports when running labcli, like `python -X importtime`.
+    """
+    times = import_times(args or ["--help"])
+
+    table = Table("module", "self (ms)", "cumulative (ms)")
+    for x in sorted(times, key=lambda x: -x.cumulative_us)[:top]:
+        table.add_row(
+            x.module, f"{x.self_us / 1000:.1f}", f"{x.cumulative_us / 1000:.1f}"
+        )
+    print(table)
+
+    total = sum(x.cumulative_us for x in times if x.depth == 0)
+    print(f"{len(times)} modules imported in {total / 1000:.1f} ms")
+    print(f"heavy packages: {', '.join(heavy_packages(times)) or '-'}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,290 @@
+"""
+The synth hot paths. All inputs are local, see `benchmarks.inputs`.
+"""
+
+import io
+import subprocess
+import sys
+import tempfile
+from contextlib import ExitStack
+from pathlib import Path
+
+import cdk8s
+from cdk8s import JsonPatch
+
+from benchmarks.inputs import (
+    local_caches,
+    make_large_config,
+    read_fixture,
+    write_manifest,
+)
+from benchmarks.runner import Case, benchmark
+from lab.libs.config import parse_config
+from lab.libs.k8s.api_object import (
+    PatchSession,
+    patch_obj,
+    set_deployment_container_env,
+    set_deployment_container_envs,
+)
+from lab.libs.k8s.chart import Chart
+from lab.libs.k8s.include import Include, IncludedManifest, include_manifest
+
+# about the size of cert-manager.yaml
+LARGE_MANIFEST_OBJECTS = 500
+
+LARGE_CONFIG_ENTRIES = 10_000
+
+# the lookups made by a chart patching a few objects
+LOOKUPS = [
+    ("Deployment", "deployment-499"),
+    ("ConfigMap", "configmap-250"),
+    ("Service", "service-100"),
+    ("Secret", "secret-400"),
+    ("Deployment", "missing"),
+]
+
+
+def _tmpdir(stack: ExitStack) -> Path:
+    return Path(stack.enter_context(tempfile.TemporaryDirectory(prefix="lab-bench-")))
+
+
+def _large_manifest(stack: ExitStack) -> str:
+    return str(write_manifest(_tmpdir(stack) / "manifest.yaml", LARGE_MANIFEST_OBJECTS))
+
+
+def _deployment() -> cdk8s.ApiObject:
+    deployment = cdk8s.ApiObject(
+        cdk8s.Testing.chart(),
+        "deployment",
+        api_version="apps/v1",
+        kind="Deployment",
+        metadata=cdk8s.ApiObjectMetadata(name="deployment"),
+    )
+    deployment.add_json_patch(
+        JsonPatch.add(
+            "/spec",
+            {
+                "template": {
+                    "spec": {
+                        "containers": [
+                            {
+                                "name": f"container-{i}",
+                                "env": [{"name": "A", "value": "1"}],
+                            }
+                            for i in range(3)
+                        ]
+                    }
+                }
+            },
+        )
+    )
+    return deployment
+
+
+##
+## Startup
+##
+
+
+def _startup_case(args: list[str]) -> Case:
+    return Case(
+        lambda _: subprocess.run(
+            [sys.executable, "-m", "lab", *args], capture_output=True, check=True
+        )
+    )
+
+
+@benchmark("startup/help")
+def startup_help(stack: ExitStack) -> Case:
+    return _startup_case(["--help"])
+
+
+@benchmark("startup/k8s-synth-help")
+def startup_k8s_synth_help(stack: ExitStack) -> Case:
+    return _startup_case(["k8s", "synth", "--help"])
+
+
+@benchmark("startup/infra-synth-help")
+def startup_infra_synth_help(stack: ExitStack) -> Case:
+    return _startup_case(["infra", "synth", "--help"])
+
+
+##
+## Config
+##
+
+
+@benchmark("parse_config/small")
+def parse_small_config(stack: ExitStack) -> Case:
+    text = read_fixture("config.yaml")
+    return Case(lambda _: parse_config(io.StringIO(text)))
+
+
+@benchmark("parse_config/large")
+def parse_large_config(stack: ExitStack) -> Case:
+    text = make_large_config(LARGE_CONFIG_ENTRIES)
+    return Case(lambda _: parse_config(io.StringIO(text)))
+
+
+##
+## Include
+##
+
+
+def _lazy_include(url: str) -> IncludedManifest:
+    return include_manifest(Chart(cdk8s.App(), "chart"), "include", url=url)
+
+
+def _find_objects(include: IncludedManifest) -> None:
+    for kind, name in LOOKUPS:
+        include.find_object(kind=kind, name=name)
+
+
+@benchmark("include/parse")
+def include_parse(stack: ExitStack) -> Case:
+    url = _large_manifest(stack)
+    return Case(lambda _: Include(cdk8s.Testing.chart(), "include", url=url))
+
+
+@benchmark("include/find_object")
+def include_find_object(stack: ExitStack) -> Case:
+    url = _large_manifest(stack)
+    return Case(
+        _find_objects, setup=lambda: Include(cdk8s.Testing.chart(), "include", url=url)
+    )
+
+
+@benchmark("include/synth")
+def include_synth(stack: ExitStack) -> Case:
+    url = _large_manifest(stack)
+
+    def setup() -> cdk8s.Chart:
+        chart = cdk8s.Testing.chart()
+        _find_objects(Include(chart, "include", url=url))
+        return chart
+
+    return Case(lambda chart: chart.to_json(), setup=setup)
+
+
+@benchmark("include/lazy_parse")
+def include_lazy_parse(stack: ExitStack) -> Case:
+    url = _large_manifest(stack)
+    return Case(lambda _: _lazy_include(url))
+
+
+@benchmark("include/lazy_find_object")
+def include_lazy_find_object(stack: ExitStack) -> Case:
+    url = _large_manifest(stack)
+    return Case(_find_objects, setup=lambda: _lazy_include(url))
+
+
+@benchmark("include/lazy_synth")
+def include_lazy_synth(stack: ExitStack) -> Case:
+    url = _large_manifest(stack)
+
+    def setup() -> cdk8s.Chart:
+        include = _lazy_include(url)
+        _find_objects(include)
+        return cdk8s.Chart.of(include)
+
+    return Case(lambda chart: chart.to_json(), setup=setup)
+
+
+##
+## Patches
+##
+
+
+@benchmark("api_object/patch_obj")
+def api_object_patch_obj(stack: ExitStack) -> Case:
+    def run(obj: cdk8s.ApiObject) -> None:
+        for i in range(10):
+            patch_obj(obj, f"/metadata/annotations/a-{i}", str(i))
+
+    def setup() -> cdk8s.ApiObject:
+        obj = _deployment()
+        patch_obj(obj, "/metadata/annotations", {})
+        return obj
+
+    return Case(run, setup=setup)
+
+
+@benchmark("api_object/patch_session")
+def api_object_patch_session(stack: ExitStack) -> Case:
+    def run(obj: cdk8s.ApiObject) -> None:
+        with PatchSession(obj) as patch:
+            for i in range(10):
+                patch.add(f"/metadata/annotations/a-{i}", str(i))
+
+    def setup() -> cdk8s.ApiObject:
+        obj = _deployment()
+        patch_obj(obj, "/metadata/annotations", {})
+        return obj
+
+    return Case(run, setup=setup)
+
+
+@benchmark("api_object/set_deployment_container_env")
+def api_object_set_env(stack: ExitStack) -> Case:
+    def run(deployment: cdk8s.ApiObject) -> None:
+        for i in range(3):
+            set_deployment_container_env(
+                deployment,
+                container_name=f"container-{i}",
+                env_name="B",
+                env_value="2",
+            )
+
+    return Case(run, setup=_deployment)
+
+
+@benchmark("api_object/set_deployment_container_envs")
+def api_object_set_envs(stack: ExitStack) -> Case:
+    return Case(
+        lambda deployment: set_deployment_container_envs(
+            deployment, {f"container-{i}": {"B": "2"} for i in range(3)}
+        ),
+        setup=_deployment,
+    )
+
+
+##
+## Charts
+##
+
+
+def _chart_case(stack: ExitStack, group: str) -> Case:
+    # imported here, as charts depend on the generated `imports` package
+    from lab.cluster import CHART_GROUPS
+
+    stack.enter_context(local_caches(_tmpdir(stack)))
+    config = parse_config(io.StringIO(read_fixture("config.yaml")))
+
+    return Case(lambda _: CHART_GROUPS[group].build(cdk8s.App(), config))
+
+
+# the keys of `lab.cluster.CHART_GROUPS`, listed here so that benchmarks are
+# registered without importing charts
+for _group in [
+    "ingress-nginx",
+    "cloudflare-external-dns",
+    "cert-manager",
+    "grafana-alloy-crd",
+    "grafana-alloy",
+    "tailscale",
+    "bitwarden",
+]:
+    benchmark(f"construct/{_group}")(
+        lambda stack, group=_group: _chart_case(stack, group)
+    )
+
+
+@benchmark("synth/cluster")
+def synth_cluster(stack: ExitStack) -> Case:
+    from lab.cluster import build_cluster
+    from lab.libs.k8s.synth import synth_files
+
+    stack.enter_context(local_caches(_tmpdir(stack)))
+    config = parse_config(io.StringIO(read_fixture("config.yaml")))
+
+    return Case(lambda _: synth_files(lambda app: build_cluster(app, config)))
@@ -0,0 +1,52 @@
+"""
+Reports the modules imported by `labcli`, using `python -X importtime`.
+"""
+
+import re
+import subprocess
+import sys
+from collections.abc import Sequence
+
+_IMPORT_TIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+# packages which load a JSII assembly, or large generated bindings
+HEAVY_PACKAGES = ["cdk8s", "cdk8s_plus_29", "cdktf", "constructs", "imports", "jsii"]
+
+
+class ImportTime:
+    def __init__(self, module: str, self_us: int, cumulative_us: int, depth: int):
+        self.module = module
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.depth = depth
+
+
+def parse_import_times(stderr: str) -> list[ImportTime]:
+    times = []
+
+    for line in stderr.splitlines():
+        if match := _IMPORT_TIME.match(line):
+            self_us, cumulative_us, indent, module = match.groups()
+            times.append(
+                ImportTime(module, int(self_us), int(cumulative_us), len(indent) // 2)
+            )
+
+    return times
+
+
+def import_times(args: Sequence[str]) -> list[ImportTime]:
+    """
+    Runs `labcli` with `args`, returning the time taken to import each module.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "lab", *args],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    return parse_import_times(result.stderr)
+
+
+def heavy_packages(times: Sequence[ImportTime]) -> list[str]:
+    loaded = {x.module.split(".")[0] for x in times}
+    return [x for x in HEAVY_PACKAGES if x in loaded]
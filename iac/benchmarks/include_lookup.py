@@ -0,0 +1,61 @@
+"""
+Compares the JSII calls made by a linear scan over included objects with those
+made by `Include`'s index, for a manifest about the size of cert-manager.yaml.
+
+    poetry run python -m benchmarks.include_lookup
+"""
+
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+import cdk8s
+
+from benchmarks.cases import LOOKUPS
+from benchmarks.inputs import write_manifest
+from benchmarks.jsii_calls import count_jsii_calls
+from lab.libs.k8s.include import Include
+
+OBJECT_COUNT = 500
+
+
+def linear_find_object(
+    include: Include, *, kind: str, name: str
+) -> Optional[cdk8s.ApiObject]:
+    # the implementation of `Include.find_object` before it was indexed
+    for x in include.node.children:
+        x_obj = cdk8s.ApiObject.of(x)
+
+        if x_obj.kind.lower() == kind.lower() and x_obj.name == name:
+            return x_obj
+
+    return None
+
+
+def run(manifest_path: Path) -> None:
+    for label, find in [
+        ("linear scan", linear_find_object),
+        ("indexed", Include.find_object),
+    ]:
+        include = Include(cdk8s.Testing.chart(), "include", url=str(manifest_path))
+
+        start = time.perf_counter()
+        with count_jsii_calls() as counter:
+            for kind, name in LOOKUPS:
+                find(include, kind=kind, name=name)
+        elapsed = time.perf_counter() - start
+
+        print(
+            f"{label:>12}: {counter.calls:>6} JSII calls, {elapsed * 1000:>8.1f} ms"
+            f" for {len(LOOKUPS)} lookups in {OBJECT_COUNT} objects"
+        )
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        run(write_manifest(Path(tmpdir) / "manifest.yaml", OBJECT_COUNT))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Local inputs for benchmarks: fixtures, generated manifests and configs, and
+caches seeded so that charts are built without accessing the network.
+"""
+
+import json
+import sys
+from collections.abc import Generator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from lab.libs.cache import sha256_digest, write_atomic
+from lab.libs.k8s.helm import HelmRenderCache, get_helm_cache, set_helm_cache
+from lab.libs.k8s.manifest_cache import (
+    ManifestCache,
+    get_manifest_cache,
+    set_manifest_cache,
+)
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+# stands in for `helm template`, printing the fixture render of the chart,
+# which is the last argument
+FAKE_HELM = f"""#!{sys.executable}
+import sys
+from pathlib import Path
+
+sys.stdout.write((Path({str(FIXTURES_DIR / "helm")!r}) / f"{{sys.argv[-1]}}.yaml").read_text())
+"""
+
+
+def read_fixture(name: str) -> str:
+    return (FIXTURES_DIR / name).read_text()
+
+
+def make_manifest(object_count: int) -> list[dict[str, Any]]:
+    """
+    Returns ConfigMaps, Deployments, Secrets and Services, in turn.
+    """
+    kinds = ["ConfigMap", "Deployment", "Secret", "Service"]
+    objects = []
+
+    for i in range(object_count):
+        kind = kinds[i % len(kinds)]
+        obj: dict[str, Any] = {
+            "apiVersion": "apps/v1" if kind == "Deployment" else "v1",
+            "kind": kind,
+            "metadata": {
+                "name": f"{kind.lower()}-{i}",
+                "namespace": "default",
+                "labels": {"app": "bench", "index": str(i)},
+            },
+        }
+
+        if kind == "Deployment":
+            obj["spec"] = {
+                "selector": {"matchLabels": {"app": "bench"}},
+                "template": {
+                    "metadata": {"labels": {"app": "bench"}},
+                    "spec": {
+                        "containers": [
+                            {
+                                "name": f"container-{j}",
+                                "image": "nginx:1.27",
+                                "env": [
+                                    {"name": f"VAR_{k}", "value": str(k)}
+                                    for k in range(5)
+                                ],
+                            }
+                            for j in range(3)
+                        ]
+                    },
+                },
+            }
+        elif kind == "Service":
+            obj["spec"] = {"ports": [{"port": 80, "targetPort": 8080}]}
+        else:
+            obj["data"] = {f"key-{k}": f"value-{k}" for k in range(5)}
+
+        objects.append(obj)
+
+    return objects
+
+
+def write_manifest(path: Path, object_count: int) -> Path:
+    path.write_text(yaml.safe_dump_all(make_manifest(object_count)))
+    return path
+
+
+def make_large_config(entries: int) -> str:
+    """
+    Returns the example config with `entries` cluster admins and DNS zones.
+    """
+    config = yaml.safe_load(read_fixture("config.yaml"))
+    config["tailscale"]["cluster_api_proxy"]["cluster_admins"] = [
+        f"admin-{i}@example.com" for i in range(entries)
+    ]
+    config["cloudflare_acme_issuer"]["dns_zones"] = [
+        f"zone-{i}.example.com" for i in range(entries)
+    ]
+
+    return yaml.safe_dump(config)
+
+
+def _manifest_fixtures() -> dict[str, str]:
+    # imported here, as charts depend on the generated `imports` package
+    from lab.charts import CertManager, IngressNginx, Tailscale
+
+    return {
+        IngressNginx.MANIFEST_URL: "ingress-nginx.yaml",
+        CertManager.MANIFEST_URL: "cert-manager.yaml",
+        Tailscale.OPERATOR_MANIFEST_URL: "tailscale-operator.yaml",
+        Tailscale.AUTHPROXY_RBAC_MANIFEST_URL: "tailscale-authproxy-rbac.yaml",
+    }
+
+
+@contextmanager
+def local_caches(cache_dir: Path) -> Generator[None, None, None]:
+    """
+    Seeds the manifest cache with fixtures, and renders Helm charts from
+    fixtures, for the duration of the context.
+    """
+    manifests_dir = cache_dir / "manifests"
+    index = {}
+
+    for url, name in _manifest_fixtures().items():
+        data = (FIXTURES_DIR / name).read_bytes()
+        index[url] = digest = sha256_digest(data)
+        write_atomic(manifests_dir / "sha256" / digest.partition(":")[2], data)
+
+    write_atomic(manifests_dir / "index.json", json.dumps(index).encode())
+
+    fake_helm = cache_dir / "helm"
+    fake_helm.write_text(FAKE_HELM)
+    fake_helm.chmod(0o755)
+
+    manifest_cache, helm_cache = get_manifest_cache(), get_helm_cache()
+    set_manifest_cache(
+        ManifestCache(cache_dir=manifests_dir, lockfile=None, offline=True)
+    )
+    set_helm_cache(
+        HelmRenderCache(
+            cache_dir=cache_dir / "helm-cache", helm_executable=str(fake_helm)
+        )
+    )
+
+    try:
+        yield
+    finally:
+        set_manifest_cache(manifest_cache)
+        set_helm_cache(helm_cache)
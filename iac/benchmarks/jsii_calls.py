@@ -0,0 +1,28 @@
+from collections.abc import Generator
+from contextlib import contextmanager
+
+from jsii._kernel.providers.process import _NodeProcess
+
+
+class JsiiCallCounter:
+    def __init__(self) -> None:
+        self.calls = 0
+
+
+@contextmanager
+def count_jsii_calls() -> Generator[JsiiCallCounter, None, None]:
+    """
+    Counts the requests sent to the JSII runtime while the context is active.
+    """
+    counter = JsiiCallCounter()
+    send = _NodeProcess.send
+
+    def counting_send(self, *args, **kwargs):
+        counter.calls += 1
+        return send(self, *args, **kwargs)
+
+    _NodeProcess.send = counting_send
+    try:
+        yield counter
+    finally:
+        _NodeProcess.send = send
@@ -0,0 +1,147 @@
+import fnmatch
+import platform
+import statistics
+import time
+from collections.abc import Callable
+from contextlib import ExitStack
+from importlib.metadata import version
+from typing import Any, Optional
+
+from benchmarks.jsii_calls import count_jsii_calls
+
+# packages whose version affects results, recorded alongside them
+PACKAGES = ["cdk8s", "cdk8s-plus-29", "cdktf", "constructs", "jsii", "pydantic"]
+
+
+class Case:
+    """
+    A benchmark's timed function. `setup` runs before each repetition, untimed,
+    and its result is passed to `run`.
+    """
+
+    def __init__(
+        self, run: Callable[[Any], object], setup: Callable[[], Any] = lambda: None
+    ):
+        self.run = run
+        self.setup = setup
+
+
+BENCHMARKS: dict[str, Callable[[ExitStack], Case]] = {}
+
+
+def benchmark(
+    name: str,
+) -> Callable[[Callable[[ExitStack], Case]], Callable[[ExitStack], Case]]:
+    """
+    Registers a benchmark. The decorated function prepares inputs, registering
+    any cleanup on the ExitStack, and returns the Case to time.
+    """
+
+    def register(
+        prepare: Callable[[ExitStack], Case],
+    ) -> Callable[[ExitStack], Case]:
+        BENCHMARKS[name] = prepare
+        return prepare
+
+    return register
+
+
+def run_benchmark(prepare: Callable[[ExitStack], Case], repeat: int) -> dict:
+    with ExitStack() as stack:
+        case = prepare(stack)
+
+        # warm up caches, and the JSII runtime
+        case.run(case.setup())
+
+        timings = []
+        for _ in range(repeat):
+            arg = case.setup()
+
+            with count_jsii_calls() as counter:
+                start = time.perf_counter()
+                case.run(arg)
+                timings.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "repeat": repeat,
+        "min_ms": min(timings),
+        "median_ms": statistics.median(timings),
+        "jsii_calls": counter.calls,
+    }
+
+
+def run_benchmarks(
+    *, pattern: str = "*", repeat: int, log: Callable[[str], None] = print
+) -> dict:
+    """
+    Runs the registered benchmarks whose names match `pattern`. Benchmarks
+    whose dependencies cannot be imported are recorded as skipped.
+    """
+    results: dict[str, dict] = {}
+
+    for name, prepare in BENCHMARKS.items():
+        if not fnmatch.fnmatch(name, pattern):
+            continue
+
+        try:
+            results[name] = run_benchmark(prepare, repeat)
+        except ModuleNotFoundError as e:
+            results[name] = {"skipped": str(e)}
+
+        log(f"{name}: {_describe(results[name])}")
+
+    return {
+        "python": platform.python_version(),
+        "packages": {x: version(x) for x in PACKAGES},
+        "benchmarks": results,
+    }
+
+
+def _describe(result: dict) -> str:
+    if "skipped" in result:
+        return f"skipped ({result['skipped']})"
+
+    return f"{result['median_ms']:.2f} ms, {result['jsii_calls']} JSII calls"
+
+
+class Comparison:
+    def __init__(
+        self,
+        name: str,
+        metric: str,
+        baseline: float,
+        current: float,
+        threshold: float,
+    ):
+        self.name = name
+        self.metric = metric
+        self.baseline = baseline
+        self.current = current
+        self.regressed = current > baseline * (1 + threshold)
+
+    @property
+    def change(self) -> Optional[float]:
+        return (self.current - self.baseline) / self.baseline if self.baseline else None
+
+
+def compare_results(
+    baseline: dict, current: dict, threshold: float
+) -> list[Comparison]:
+    """
+    Compares the median time and JSII calls of benchmarks in both results. A
+    metric has regressed if it grew by more than `threshold`, a fraction.
+    """
+    comparisons = []
+
+    for name, result in current["benchmarks"].items():
+        base = baseline["benchmarks"].get(name, {})
+
+        if "skipped" in result or "skipped" in base or not base:
+            continue
+
+        for metric in ["median_ms", "jsii_calls"]:
+            comparisons.append(
+                Comparison(name, metric, base[metric], result[metric], threshold)
+            )
+
+    return comparisons
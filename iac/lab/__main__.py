@@ -1,11 +1,30 @@
-from lab.cli import register_infra_cli, register_k8s_cli
+import sys
+
+from lab.cli import (
+    register_infra_cli,
+    register_k8s_cli,
+    register_plan_cli,
+    register_serve_cli,
+)
 from lab.libs.cli import make_typer
+from lab.libs.daemon import forward_command
 
 
 app = make_typer()
 
 register_infra_cli(app)
 register_k8s_cli(app)
+register_plan_cli(app)
+register_serve_cli(app)
+
+
+def main() -> None:
+    # synths run in `labcli serve`, if it is running
+    if (exit_code := forward_command(sys.argv[1:])) is not None:
+        sys.exit(exit_code)
 
-if __name__ == "__main__":
     app()
+
+
+if __name__ == "__main__":
+    main()
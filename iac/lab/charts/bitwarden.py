@@ -1,9 +1,10 @@
 from constructs import Construct
 
-from cdk8s import ApiObjectMetadata, Chart, Size
+from cdk8s import ApiObject, ApiObjectMetadata, Chart, Size
 
 import cdk8s_plus_29 as kplus
-from lab.libs.config import BitwardenConfig
+from lab.libs.config import BitwardenConfig, ResourcesConfig
+from lab.libs.k8s.resources import container_resources, workload_key
 
 
 class Bitwarden(Chart):
@@ -15,6 +16,7 @@ class Bitwarden(Chart):
         id_: str,
         *,
         config: BitwardenConfig,
+        resources: ResourcesConfig,
         ingress_class_name: str,
         cluster_issuer_name: str,
     ):
@@ -76,9 +78,8 @@ class Bitwarden(Chart):
 
         main_container = deployment.add_container(
             image=f"vaultwarden/server:{Bitwarden.VERSION}",
-            resources=kplus.ContainerResources(
-                cpu=None,
-                memory=None,
+            resources=container_resources(
+                resources.profile(workload_key(ApiObject.of(deployment)), "medium")
             ),
             env_from=[kplus.EnvFrom(config_map=configmap), kplus.EnvFrom(sec=secret)],
             ports=[
@@ -1,9 +1,11 @@
-from cdk8s import ApiObjectMetadata, Chart
+from cdk8s import ApiObjectMetadata
 from constructs import Construct
 
-from lab.libs.k8s.include import Include
+from lab.libs.k8s.chart import Chart
+from lab.libs.k8s.include import include_manifest
+from lab.libs.k8s.resources import set_included_resources
 
-from lab.libs.config import CloudflareAcmeIssuerConfig
+from lab.libs.config import CloudflareAcmeIssuerConfig, ResourcesConfig
 
 from imports.io import cert_manager as cm
 import cdk8s_plus_29 as kplus
@@ -17,15 +19,25 @@ class CertManager(Chart):
 
     MANIFEST_URL = f"https://github.com/cert-manager/cert-manager/releases/download/v{VERSION}/cert-manager.yaml"
 
-    def __init__(self, scope: Construct, id_: str):
+    def __init__(self, scope: Construct, id_: str, *, resources: ResourcesConfig):
         super().__init__(scope, id_)
 
-        Include(
+        cm = include_manifest(
             self,
             "cert-manager",
             url=CertManager.MANIFEST_URL,
         )
 
+        set_included_resources(
+            cm,
+            resources,
+            {
+                "cert-manager/cert-manager": "medium",
+                "cert-manager/cert-manager-cainjector": "medium",
+                "cert-manager/cert-manager-webhook": "small",
+            },
+        )
+
 
 class CloudflareAcmeIssuer(Chart):
     LETS_ENCRYPT = "https://acme-v02.api.letsencrypt.org/directory"
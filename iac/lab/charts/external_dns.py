@@ -1,6 +1,7 @@
-from cdk8s import ApiObjectMetadata, Chart
+from cdk8s import ApiObject, ApiObjectMetadata, Chart
 from constructs import Construct
-from lab.libs.config import CloudflareDnsConfig
+from lab.libs.config import CloudflareDnsConfig, ResourcesConfig
+from lab.libs.k8s.resources import container_resources, workload_key
 
 import cdk8s_plus_29 as kplus
 
@@ -8,7 +9,14 @@ import cdk8s_plus_29 as kplus
 class CloudflareExternalDns(Chart):
     VERSION = "0.18.0"
 
-    def __init__(self, scope: Construct, id_: str, *, config: CloudflareDnsConfig):
+    def __init__(
+        self,
+        scope: Construct,
+        id_: str,
+        *,
+        config: CloudflareDnsConfig,
+        resources: ResourcesConfig,
+    ):
         super().__init__(scope, id_)
 
         ns = kplus.Namespace(self, id_)
@@ -57,14 +65,15 @@ class CloudflareExternalDns(Chart):
         ##
         ## Deployment
         ##
-        kplus.Deployment(
+        deployment = kplus.Deployment(
             self,
             f"{id_}-deployment",
             replicas=1,
             service_account=service_account,
             automount_service_account_token=True,
             metadata=ApiObjectMetadata(namespace=ns.name),
-        ).add_container(
+        )
+        deployment.add_container(
             image=f"registry.k8s.io/external-dns/external-dns:v{CloudflareExternalDns.VERSION}",
             args=[
                 "--source=ingress",
@@ -79,9 +88,8 @@ class CloudflareExternalDns(Chart):
             env_from=[
                 kplus.EnvFrom(sec=secret),
             ],
-            resources=kplus.ContainerResources(
-                cpu=None,
-                memory=None,
+            resources=container_resources(
+                resources.profile(workload_key(ApiObject.of(deployment)), "small")
             ),
             security_context=kplus.ContainerSecurityContextProps(
                 ensure_non_root=False,
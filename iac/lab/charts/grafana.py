@@ -1,12 +1,86 @@
 from constructs import Construct
 
-from cdk8s import ApiObjectMetadata, Chart, Helm
+from cdk8s import ApiObjectMetadata, Chart
 
 import cdk8s_plus_29 as kplus
-from lab.libs.config import GrafanaConfig
+from lab.libs.access_log import ACCESS_LOG_FIELDS, LATENCY_FIELDS
+from lab.libs.config import GrafanaConfig, ResourcesConfig
+from lab.libs.k8s.helm import Helm
+from lab.libs.k8s.resources import set_included_resources
 
+GRAFANA_HELM_REPO = "https://grafana.github.io/helm-charts"
 
-def get_chart_values(config: GrafanaConfig) -> dict:
+
+# fields of the ingress-nginx access log which become labels of its log stream,
+# and of the metrics derived from it
+INGRESS_ACCESS_LOG_LABELS = ["method", "status"]
+
+# the buckets of the latency histograms, in seconds
+INGRESS_LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+
+def _alloy_map(keys: list[str]) -> str:
+    return "{" + ", ".join(f'{x} = ""' for x in keys) + "}"
+
+
+def get_ingress_access_log_stages() -> str:
+    """
+    Returns the Alloy stages which parse the JSON access logs of the ingress-nginx
+    controller: their time becomes the timestamp of the entry, their status and
+    method labels, other fields structured metadata, and their latencies
+    histograms. Alloy exports the metrics as
+    `loki_process_custom_ingress_nginx_*`.
+    """
+    metadata = [
+        x for x in ACCESS_LOG_FIELDS if x not in INGRESS_ACCESS_LOG_LABELS + ["time"]
+    ]
+    histograms = "\n".join(
+        f"""    metric.histogram {{
+      name        = "ingress_nginx_{x}_seconds"
+      description = "The {x.replace("_", " ")} of requests, from access logs"
+      source      = "{x}"
+      buckets     = {INGRESS_LATENCY_BUCKETS}
+    }}"""
+        for x in LATENCY_FIELDS
+    )
+
+    # only the logs of the ingress-nginx controller are parsed
+    return f"""stage.match {{
+  selector = "{{namespace=\\"ingress-nginx\\", container=\\"controller\\"}}"
+
+  stage.json {{
+    expressions = {_alloy_map(list(ACCESS_LOG_FIELDS))}
+  }}
+
+  stage.timestamp {{
+    source = "time"
+    format = "RFC3339"
+  }}
+
+  stage.labels {{
+    values = {_alloy_map(INGRESS_ACCESS_LOG_LABELS)}
+  }}
+
+  stage.structured_metadata {{
+    values = {_alloy_map(metadata)}
+  }}
+
+  stage.metrics {{
+{histograms}
+    metric.counter {{
+      name        = "ingress_nginx_bytes_sent_total"
+      description = "The bytes sent to clients, from access logs"
+      source      = "bytes_sent"
+      action      = "add"
+    }}
+  }}
+}}
+"""
+
+
+def get_chart_values(
+    config: GrafanaConfig, *, ingress_access_logs: bool = False
+) -> dict:
     # autogenerated as YAML by Grafana Cloud, converted to a dict, and updated
     # with secrets from the config:
     #   https://DOMAIN.grafana.net/a/grafana-k8s-app/configuration/cluster-config
@@ -38,7 +112,14 @@ def get_chart_values(config: GrafanaConfig) -> dict:
         "annotationAutodiscovery": {"enabled": True},
         "prometheusOperatorObjects": {"enabled": True},
         "clusterEvents": {"enabled": True},
-        "podLogs": {"enabled": True},
+        "podLogs": {
+            "enabled": True,
+            **(
+                {"extraLogProcessingStages": get_ingress_access_log_stages()}
+                if ingress_access_logs
+                else {}
+            ),
+        },
         "alloy-metrics": {
             "enabled": True,
             "alloy": {
@@ -161,6 +242,8 @@ def get_chart_values(config: GrafanaConfig) -> dict:
 
 
 class GrafanaAlloyCrd(Chart):
+    CHART = "alloy-crd"
+
     CHART_VERSION = "1.0.0"
 
     def __init__(self, scope: Construct, id_: str):
@@ -169,8 +252,8 @@ class GrafanaAlloyCrd(Chart):
         Helm(
             self,
             f"{id_}-helm",
-            repo="https://grafana.github.io/helm-charts",
-            chart="alloy-crd",
+            repo=GRAFANA_HELM_REPO,
+            chart=GrafanaAlloyCrd.CHART,
             version=GrafanaAlloyCrd.CHART_VERSION,
             helm_flags=["--include-crds"],
         )
@@ -179,6 +262,8 @@ class GrafanaAlloyCrd(Chart):
 class GrafanaAlloy(Chart):
     NAMESPACE = "grafana"
 
+    CHART = "k8s-monitoring"
+
     CHART_VERSION = "3.1.0"
 
     def __init__(
@@ -187,6 +272,8 @@ class GrafanaAlloy(Chart):
         id_: str,
         *,
         config: GrafanaConfig,
+        resources: ResourcesConfig,
+        ingress_access_logs: bool = False,
     ):
         super().__init__(scope, id_, namespace=GrafanaAlloy.NAMESPACE)
 
@@ -194,15 +281,19 @@ class GrafanaAlloy(Chart):
             self, id_, metadata=ApiObjectMetadata(name=GrafanaAlloy.NAMESPACE)
         )
 
-        Helm(
+        helm = Helm(
             self,
             f"{id_}-helm",
-            repo="https://grafana.github.io/helm-charts",
+            repo=GRAFANA_HELM_REPO,
             # ensure the release name is the same as the chart name, this avoids
             # Helm prefixing object names, breaking the autogenerated values
             release_name="grafana-k8s-monitoring",
-            chart="k8s-monitoring",
+            chart=GrafanaAlloy.CHART,
             version=GrafanaAlloy.CHART_VERSION,
             namespace=GrafanaAlloy.NAMESPACE,
-            values=get_chart_values(config),
+            values=get_chart_values(config, ingress_access_logs=ingress_access_logs),
+            secrets=[config.access_policy_token.get_secret_value()],
         )
+
+        # the workloads of the release depend on which features are enabled
+        set_included_resources(helm, resources, {}, default="medium")
@@ -1,10 +1,63 @@
-from cdk8s import Chart
+from cdk8s import ApiObject
 from constructs import Construct
 
-from lab.libs.config import IngressConfig
+from imports import k8s
+from lab.libs.access_log import log_format
+from lab.libs.config import (
+    IngressConfig,
+    IngressLoadBalancerConfig,
+    IngressScalingConfig,
+    ResourcesConfig,
+)
 from lab.libs.exceptions import LabError
-from lab.libs.k8s.include import Include
-from lab.libs.k8s.api_object import patch_obj
+from lab.libs.k8s.chart import Chart
+from lab.libs.k8s.include import include_manifest
+from lab.libs.k8s.resources import set_included_resources
+from lab.libs.k8s.api_object import PatchSession
+
+# the prefixes of the annotations of each type of OCI load balancer
+_LB = "service.beta.kubernetes.io/oci-load-balancer"
+_NLB = "oci-network-load-balancer.oraclecloud.com"
+
+
+def _load_balancer_annotations(
+    lb: IngressLoadBalancerConfig, nsg_ocid: str
+) -> dict[str, str]:
+    annotations = {"oci.oraclecloud.com/load-balancer-type": lb.type}
+
+    health_check = {
+        "interval": lb.health_check_interval_ms,
+        "timeout": lb.health_check_timeout_ms,
+        "retries": lb.health_check_retries,
+    }
+
+    if lb.type == "nlb":
+        annotations[f"{_NLB}/oci-network-security-groups"] = nsg_ocid
+        if lb.preserve_source is not None:
+            annotations[f"{_NLB}/is-preserve-source"] = str(lb.preserve_source).lower()
+        if lb.proxy_protocol:
+            annotations[f"{_NLB}/is-ppv2-enabled"] = "true"
+
+        prefix = f"{_NLB}/health-check"
+    else:
+        annotations |= {
+            "oci.oraclecloud.com/oci-network-security-groups": nsg_ocid,
+            f"{_LB}-shape": "flexible",
+            f"{_LB}-shape-flex-min": str(lb.min_bandwidth_mbps),
+            f"{_LB}-shape-flex-max": str(lb.max_bandwidth_mbps),
+        }
+        if lb.idle_timeout_seconds is not None:
+            annotations[f"{_LB}-connection-idle-timeout"] = str(lb.idle_timeout_seconds)
+        if lb.proxy_protocol:
+            annotations[f"{_LB}-connection-proxy-protocol-version"] = "2"
+
+        prefix = f"{_LB}-health-check"
+
+    annotations |= {
+        f"{prefix}-{k}": str(v) for k, v in health_check.items() if v is not None
+    }
+
+    return annotations
 
 
 class IngressNginx(Chart):
@@ -12,58 +65,217 @@ class IngressNginx(Chart):
 
     INGRESS_CLASS_NAME = "nginx"
 
+    NAMESPACE = "ingress-nginx"
+
+    CONTROLLER_NAME = "ingress-nginx-controller"
+
+    # active connections of each controller pod, as served by the custom
+    # metrics API
+    CONNECTIONS_METRIC = "nginx_ingress_controller_nginx_process_connections"
+
+    # OKE labels each node with its fault domain
+    FAULT_DOMAIN_LABEL = "oci.oraclecloud.com/fault-domain"
+
     MANIFEST_URL = f"https://raw.githubusercontent.com/kubernetes/ingress-nginx/controller-v{VERSION}/deploy/static/provider/cloud/deploy.yaml"
 
-    def __init__(self, scope: Construct, id_: str, config: IngressConfig):
+    def __init__(
+        self,
+        scope: Construct,
+        id_: str,
+        config: IngressConfig,
+        *,
+        resources: ResourcesConfig,
+    ):
         super().__init__(scope, id_)
 
-        ing = Include(
+        ing = include_manifest(
             self,
             "ingress-nginx",
             url=IngressNginx.MANIFEST_URL,
         )
 
+        set_included_resources(
+            ing,
+            resources,
+            {f"{IngressNginx.NAMESPACE}/{IngressNginx.CONTROLLER_NAME}": "large"},
+        )
+
         ##
         ## Patch Service
         ##
         if not (
-            svc := ing.find_object(kind="Service", name="ingress-nginx-controller")
+            svc := ing.find_object(kind="Service", name=IngressNginx.CONTROLLER_NAME)
         ):
             raise LabError(
                 "could not find service/ingress-nginx-controller in ingress-nginx manifest"
             )
 
-        if svc.to_json().get("metadata", {}).get("annotations"):
-            raise LabError("Service has annotations, may be overriding default values")
+        with PatchSession(svc) as patch:
+            if patch.snapshot.get("metadata", {}).get("annotations"):
+                raise LabError(
+                    "Service has annotations, may be overriding default values"
+                )
 
-        patch_obj(
-            svc,
-            "/metadata/annotations",
-            {
-                "oci.oraclecloud.com/load-balancer-type": "nlb",
-                "oci-network-load-balancer.oraclecloud.com/oci-network-security-groups": config.oci_public_load_balancer_nsg_ocid,
-            },
-        )
+            patch.merge(
+                {
+                    "metadata": {
+                        "annotations": _load_balancer_annotations(
+                            config.load_balancer,
+                            config.oci_public_load_balancer_nsg_ocid,
+                        )
+                    }
+                }
+            )
+
+            # upstream's default, pinned: the NLB sends traffic only to nodes
+            # running a controller, skipping the kube-proxy hop between nodes
+            patch.merge({"spec": {"externalTrafficPolicy": "Local"}})
 
         ##
         ## Patch ConfigMap
         ##
         if not (
-            cfg := ing.find_object(kind="Configmap", name="ingress-nginx-controller")
+            cfg := ing.find_object(kind="Configmap", name=IngressNginx.CONTROLLER_NAME)
         ):
             raise LabError(
                 "could not find configmap/ingress-nginx-controller in ingress-nginx manifest"
             )
 
-        if cfg.to_json().get("data"):
-            raise LabError("ConfigMap is not empty, may be overriding default values")
-
-        patch_obj(
-            cfg,
-            "/data",
-            {
-                "allow-snippet-annotations": "true",
-                # we trust the users creating Ingress objects
-                "annotations-risk-level": "Critical",
-            },
+        data = {
+            "allow-snippet-annotations": "true",
+            # we trust the users creating Ingress objects
+            "annotations-risk-level": "Critical",
+            **config.performance.configmap_data(),
+        }
+
+        # must match the load balancer, or the controller cannot parse requests
+        if config.load_balancer.proxy_protocol:
+            data["use-proxy-protocol"] = "true"
+
+        if config.json_access_logs:
+            data |= {
+                "log-format-escape-json": "true",
+                "log-format-upstream": log_format(),
+            }
+
+        with PatchSession(cfg) as patch:
+            if patch.snapshot.get("data"):
+                raise LabError(
+                    "ConfigMap is not empty, may be overriding default values"
+                )
+
+            patch.add("/data", data)
+
+        ##
+        ## Scaling
+        ##
+        if not (
+            controller := ing.find_object(
+                kind="Deployment", name=IngressNginx.CONTROLLER_NAME
+            )
+        ):
+            raise LabError(
+                "could not find deployment/ingress-nginx-controller in ingress-nginx manifest"
+            )
+
+        if config.scaling.enabled:
+            self._scale_controller(controller, config.scaling)
+
+    def _scale_controller(
+        self, controller: ApiObject, scaling: IngressScalingConfig
+    ) -> None:
+        metadata = k8s.ObjectMeta(
+            name=IngressNginx.CONTROLLER_NAME, namespace=IngressNginx.NAMESPACE
+        )
+
+        with PatchSession(controller) as patch:
+            labels = patch.snapshot["spec"]["selector"]["matchLabels"]
+
+            def spread(topology_key: str, when_unsatisfiable: str) -> dict:
+                return {
+                    "maxSkew": 1,
+                    "topologyKey": topology_key,
+                    "whenUnsatisfiable": when_unsatisfiable,
+                    "labelSelector": {"matchLabels": labels},
+                    # only spread the pods of the current rollout
+                    "matchLabelKeys": ["pod-template-hash"],
+                    # and only over nodes which can run them
+                    "nodeTaintsPolicy": "Honor",
+                }
+
+            # replicas are set by the HPA
+            patch.merge(
+                {
+                    "spec": {
+                        "replicas": None,
+                        "template": {
+                            "spec": {
+                                "topologySpreadConstraints": [
+                                    spread("kubernetes.io/hostname", "DoNotSchedule"),
+                                    # nodes may share a fault domain
+                                    spread(
+                                        IngressNginx.FAULT_DOMAIN_LABEL,
+                                        "ScheduleAnyway",
+                                    ),
+                                ]
+                            }
+                        },
+                    }
+                }
+            )
+
+        metrics = [
+            k8s.MetricSpecV2(
+                type="Resource",
+                resource=k8s.ResourceMetricSourceV2(
+                    name="cpu",
+                    target=k8s.MetricTargetV2(
+                        type="Utilization",
+                        average_utilization=scaling.target_cpu_utilization,
+                    ),
+                ),
+            )
+        ]
+        if scaling.target_connections is not None:
+            metrics.append(
+                k8s.MetricSpecV2(
+                    type="Pods",
+                    pods=k8s.PodsMetricSourceV2(
+                        metric=k8s.MetricIdentifierV2(
+                            name=IngressNginx.CONNECTIONS_METRIC
+                        ),
+                        target=k8s.MetricTargetV2(
+                            type="AverageValue",
+                            average_value=k8s.Quantity.from_number(
+                                scaling.target_connections
+                            ),
+                        ),
+                    ),
+                )
+            )
+
+        k8s.KubeHorizontalPodAutoscalerV2(
+            self,
+            "controller-hpa",
+            metadata=metadata,
+            spec=k8s.HorizontalPodAutoscalerSpecV2(
+                scale_target_ref=k8s.CrossVersionObjectReferenceV2(
+                    api_version="apps/v1",
+                    kind="Deployment",
+                    name=IngressNginx.CONTROLLER_NAME,
+                ),
+                min_replicas=scaling.min_replicas,
+                max_replicas=scaling.max_replicas,
+                metrics=metrics,
+            ),
+        )
+
+        k8s.KubePodDisruptionBudget(
+            self,
+            "controller-pdb",
+            metadata=metadata,
+            spec=k8s.PodDisruptionBudgetSpec(
+                max_unavailable=k8s.IntOrString.from_number(1),
+                selector=k8s.LabelSelector(match_labels=labels),
+            ),
         )
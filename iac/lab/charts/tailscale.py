@@ -1,26 +1,38 @@
 from typing import cast
 from constructs import Construct
 
-from cdk8s import Chart
-
-from lab.libs.config import TailscaleClusterApiProxy, TailscaleConfig
+from lab.libs.config import (
+    ResourcesConfig,
+    TailscaleClusterApiProxy,
+    TailscaleConfig,
+)
 from lab.libs.exceptions import LabError
-from lab.libs.k8s.include import Include
-from lab.libs.k8s.api_object import patch_obj, set_deployment_container_env
+from lab.libs.k8s.chart import Chart
+from lab.libs.k8s.include import (
+    IncludedManifest,
+    ObjectSelector,
+    Override,
+    include_manifest,
+)
+from lab.libs.k8s.api_object import set_deployment_container_envs
+from lab.libs.k8s.resources import set_included_resources
 
 import cdk8s_plus_29 as kplus
 
 
-def _update_oauth_secret(ts: Include, client_id: str, client_secret: str) -> None:
-    if not (oauth_secret := ts.find_object(kind="Secret", name="operator-oauth")):
-        raise LabError("could not find secret/operator-oauth in tailscale manifest")
-
-    patch_obj(oauth_secret, "/stringData/client_id", client_id)
-    patch_obj(oauth_secret, "/stringData/client_secret", client_secret)
+def _update_oauth_secret(
+    ts: IncludedManifest, client_id: str, client_secret: str
+) -> None:
+    ts.override(
+        Override(
+            ObjectSelector(kind="Secret", name="operator-oauth"),
+            {"stringData": {"client_id": client_id, "client_secret": client_secret}},
+        )
+    )
 
 
 def _configure_api_proxy(
-    ts: Include, api_proxy_config: TailscaleClusterApiProxy
+    ts: IncludedManifest, api_proxy_config: TailscaleClusterApiProxy
 ) -> None:
     # safe: Include may not be the root of the scope tree
     scope = cast(Construct, ts.node.scope)
@@ -28,11 +40,8 @@ def _configure_api_proxy(
     if not (operator_deployment := ts.find_object(kind="Deployment", name="operator")):
         raise LabError("could not find deployment/operator in tailscale manifest")
 
-    set_deployment_container_env(
-        operator_deployment,
-        container_name="operator",
-        env_name="APISERVER_PROXY",
-        env_value="true",
+    set_deployment_container_envs(
+        operator_deployment, {"operator": {"APISERVER_PROXY": "true"}}
     )
 
     kplus.ClusterRoleBinding(
@@ -54,10 +63,22 @@ class Tailscale(Chart):
 
     MANIFEST_BASE_URL = f"https://raw.githubusercontent.com/tailscale/tailscale/v{OPERATOR_VERSION}/cmd/k8s-operator/deploy/manifests"
 
-    def __init__(self, scope: Construct, id_: str, *, config: TailscaleConfig):
+    OPERATOR_MANIFEST_URL = f"{MANIFEST_BASE_URL}/operator.yaml"
+
+    AUTHPROXY_RBAC_MANIFEST_URL = f"{MANIFEST_BASE_URL}/authproxy-rbac.yaml"
+
+    def __init__(
+        self,
+        scope: Construct,
+        id_: str,
+        *,
+        config: TailscaleConfig,
+        resources: ResourcesConfig,
+    ):
         super().__init__(scope, id_)
 
         ts = self._include_operator_manifest()
+        set_included_resources(ts, resources, {"tailscale/operator": "small"})
 
         _update_oauth_secret(
             ts,
@@ -69,16 +90,16 @@ class Tailscale(Chart):
             self._include_authproxy_rbac_manifest()
             _configure_api_proxy(ts, config.cluster_api_proxy)
 
-    def _include_operator_manifest(self) -> Include:
-        return Include(
+    def _include_operator_manifest(self) -> IncludedManifest:
+        return include_manifest(
             self,
             "tailscale",
-            url=f"{Tailscale.MANIFEST_BASE_URL}/operator.yaml",
+            url=Tailscale.OPERATOR_MANIFEST_URL,
         )
 
-    def _include_authproxy_rbac_manifest(self) -> Include:
-        return Include(
+    def _include_authproxy_rbac_manifest(self) -> IncludedManifest:
+        return include_manifest(
             self,
             "tailscale-authproxy-rbac",
-            url=f"{Tailscale.MANIFEST_BASE_URL}/authproxy-rbac.yaml",
+            url=Tailscale.AUTHPROXY_RBAC_MANIFEST_URL,
         )
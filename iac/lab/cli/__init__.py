@@ -1,4 +1,6 @@
 from lab.cli.infra import register_infra_cli
 from lab.cli.k8s import register_k8s_cli
+from lab.cli.plan import register_plan_cli
+from lab.cli.serve import register_serve_cli
 
-__all__ = [register_infra_cli, register_k8s_cli]
+__all__ = [register_infra_cli, register_k8s_cli, register_plan_cli, register_serve_cli]
@@ -1,14 +1,29 @@
-from typing import Annotated
-import typer
+import json
+import os
+import time
+from pathlib import Path
+from typing import Annotated, Any, Optional
 
-from cdktf import App, CloudBackend, NamedCloudWorkspace
+from rich import print
+import typer
 
-from lab.stacks import Lab
 from lab.libs.cli import make_typer, make_envvar
+from lab.libs.profile import enable_profiling, profile, report_profiles
 
 cli = make_typer()
 
 
+def _app_options() -> dict[str, Any]:
+    """
+    Returns the options cdktf would otherwise read from the environment of the
+    JSII runtime, which `labcli serve` does not share with this command.
+    """
+    return {
+        "outdir": str(Path(os.environ.get("CDKTF_OUTDIR", "cdktf.out")).resolve()),
+        "context": json.loads(os.environ.get("CDKTF_CONTEXT_JSON", "{}")),
+    }
+
+
 @cli.command()
 def synth(
     tfc_organization: Annotated[
@@ -20,25 +35,111 @@ def synth(
     tfc_workspace: Annotated[
         str,
         typer.Option(
-            envvar=make_envvar("TFC_WORKSPACE"), help="Terraform Cloud workspace"
+            envvar=make_envvar("TFC_WORKSPACE"),
+            help=(
+                "Terraform Cloud workspace of the cluster stack. Other stacks use "
+                "it as a prefix, e.g. lab-billing"
+            ),
         ),
     ] = "lab",
+    stacks: Annotated[
+        Optional[list[str]],
+        typer.Option(
+            "--stack",
+            # read by cdktf.App, which does not yet act on it
+            envvar="CDKTF_TARGET_STACK_ID",
+            help="Only synthesize this stack. May be given more than once",
+        ),
+    ] = None,
+    jobs: Annotated[
+        Optional[int],
+        typer.Option(
+            "--jobs",
+            "-j",
+            min=1,
+            envvar=make_envvar("SYNTH_JOBS"),
+            help="Synthesize stacks in this many worker processes. Defaults to one "
+            "per stack",
+        ),
+    ] = None,
+    incremental: Annotated[
+        bool,
+        typer.Option(
+            help="Reuse the previous output of stacks whose fingerprint is unchanged",
+        ),
+    ] = True,
+    profiling: Annotated[
+        bool,
+        typer.Option(
+            "--profile",
+            help="Record the wall time of each phase of the synth",
+        ),
+    ] = False,
+    profile_dir: Annotated[
+        Path, typer.Option(help="Directory in which to write profiles")
+    ] = Path("profile"),
 ) -> None:
     """
-    Synthesizes this project to Terraform.
+    Synthesizes this project to Terraform, one stack per Terraform Cloud
+    workspace.
     """
-    app = App()
-
-    stacks = [Lab(app, "lab")]
+    # imported here, so that the CLI starts without loading cdktf and the
+    # provider bindings
+    from lab.libs.fingerprint import get_fingerprint_store
+    from lab.libs.tf.synth import read_manifest, write_stacks
+    from lab.stacks import STACKS, TerraformCloud, fingerprint_stack, synth_stacks
 
-    for s in stacks:
-        CloudBackend(
-            s,
-            organization=tfc_organization,
-            workspaces=NamedCloudWorkspace(tfc_workspace),
+    if unknown := [x for x in stacks or [] if x not in STACKS]:
+        print(
+            f"[red]unknown stacks: {', '.join(unknown)} "
+            f"(expected {', '.join(STACKS)})[/red]"
         )
+        raise typer.Exit(1)
+
+    profiler = enable_profiling("infra synth") if profiling else None
+
+    start = time.perf_counter()
+
+    options = _app_options()
+    outdir = Path(options["outdir"])
+    cloud = TerraformCloud(organization=tfc_organization, workspace=tfc_workspace)
+    selected = stacks or list(STACKS)
+
+    fingerprints = get_fingerprint_store(outdir)
+    # stacks are only reused if they are in the manifest
+    previous = read_manifest(outdir)["stacks"]
+
+    with profile("fingerprint"):
+        stack_fingerprints = {
+            x: fingerprint_stack(x, cloud, options["context"]) for x in selected
+        }
+
+    reused = [
+        k
+        for k, v in stack_fingerprints.items()
+        if incremental and k in previous and fingerprints.is_current(k, v, outdir)
+    ]
+    rebuilt = [x for x in selected if x not in reused]
+
+    synthesized, profiles = synth_stacks(
+        cloud,
+        jobs=jobs or max(len(rebuilt), 1),
+        context=options["context"],
+        stacks=rebuilt,
+        profiling=profiling,
+    )
+    write_stacks(outdir, synthesized, stack_names=STACKS)
+
+    for x in synthesized:
+        fingerprints.record(x.name, stack_fingerprints[x.name], x.files)
+    fingerprints.save()
+
+    print(f"synthesized in {time.perf_counter() - start:.1f}s")
+    print(f"rebuilt: {', '.join(rebuilt) or '-'}")
+    print(f"reused: {', '.join(reused) or '-'}")
 
-    app.synth()
+    if profiler:
+        report_profiles(profile_dir, "infra-synth", [profiler.profile, *profiles])
 
 
 def register_infra_cli(app: typer.Typer) -> None:
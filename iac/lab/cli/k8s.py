@@ -1,65 +1,457 @@
-from typing import Annotated
+from __future__ import annotations
+
+import io
+import json
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Annotated, Optional
 
 from rich import print
 import typer
-from lab.libs.cli import make_typer
-
-from lab.charts import (
-    Bitwarden,
-    CloudflareExternalDns,
-    CertManager,
-    GrafanaAlloy,
-    GrafanaAlloyCrd,
-    IngressNginx,
-    Tailscale,
-    CloudflareAcmeIssuer,
-)
-from lab.libs.config import parse_config
-from lab.libs.exceptions import ConfigError
-
-from cdk8s import App
+from lab.libs.cli import make_typer, make_envvar
+
+from lab.libs.exceptions import ConfigError, LabError
+from lab.libs.k8s.stream import OutputFormat
+from lab.libs.profile import enable_profiling, profile, report_profiles
+
+# cdk8s, and the charts, are imported by the commands that use them, so that
+# the CLI starts without loading their JSII assemblies
+if TYPE_CHECKING:
+    from lab.libs.k8s.diff import ManifestDiff
+    from lab.libs.k8s.helm import HelmChartRef
 
 cli = make_typer()
 
+Offline = Annotated[
+    bool,
+    typer.Option(
+        envvar=make_envvar("OFFLINE"),
+        help="Only use cached manifests and charts, never access the network",
+    ),
+]
+Jobs = Annotated[
+    int,
+    typer.Option(
+        "--jobs",
+        "-j",
+        min=1,
+        envvar=make_envvar("SYNTH_JOBS"),
+        help="Synthesize independent charts in this many worker processes",
+    ),
+]
+
+
+def _manifest_urls() -> list[str]:
+    """
+    Returns the remote manifests included by charts, pinned by `labcli k8s lock`.
+    """
+    from lab.charts import CertManager, IngressNginx, Tailscale
+
+    return [
+        IngressNginx.MANIFEST_URL,
+        CertManager.MANIFEST_URL,
+        Tailscale.OPERATOR_MANIFEST_URL,
+        Tailscale.AUTHPROXY_RBAC_MANIFEST_URL,
+    ]
+
+
+def _helm_charts() -> list[HelmChartRef]:
+    """
+    Returns the Helm charts rendered by charts, stored locally by
+    `labcli k8s pull-charts`.
+    """
+    from lab.charts.grafana import GRAFANA_HELM_REPO, GrafanaAlloy, GrafanaAlloyCrd
+    from lab.libs.k8s.helm import HelmChartRef
+
+    return [
+        HelmChartRef(
+            repo=GRAFANA_HELM_REPO,
+            chart=GrafanaAlloyCrd.CHART,
+            version=GrafanaAlloyCrd.CHART_VERSION,
+        ),
+        HelmChartRef(
+            repo=GRAFANA_HELM_REPO,
+            chart=GrafanaAlloy.CHART,
+            version=GrafanaAlloy.CHART_VERSION,
+        ),
+    ]
+
 
 @cli.command()
-def synth(config_file: Annotated[typer.FileText, typer.Option()]) -> None:
-    app = App()
+def synth(
+    config_file: Annotated[typer.FileText, typer.Option()],
+    offline: Offline = False,
+    jobs: Jobs = 1,
+    incremental: Annotated[
+        bool,
+        typer.Option(
+            help="Reuse the previous output of charts whose fingerprint is unchanged",
+        ),
+    ] = True,
+    profiling: Annotated[
+        bool,
+        typer.Option(
+            "--profile",
+            help="Record the wall time of each phase of the synth",
+        ),
+    ] = False,
+    profile_dir: Annotated[
+        Path, typer.Option(help="Directory in which to write profiles")
+    ] = Path("profile"),
+    output: Annotated[
+        Optional[str],
+        typer.Option(
+            "--output",
+            "-o",
+            help=(
+                "Directory to write manifests to, or '-' to write them to stdout as "
+                "a single stream. Defaults to $CDK8S_OUTDIR, or dist"
+            ),
+        ),
+    ] = None,
+    output_format: Annotated[
+        OutputFormat,
+        typer.Option("--format", help="Format of the stream written to stdout"),
+    ] = OutputFormat.YAML,
+    low_memory: Annotated[
+        bool,
+        typer.Option(
+            help=(
+                "Synthesize each group of charts in a new worker process, which "
+                "exits once its files are written"
+            ),
+        ),
+    ] = False,
+    watch: Annotated[
+        bool,
+        typer.Option(
+            help=(
+                "After synthesizing, rebuild the charts affected by each change to "
+                "the config file or lab's sources, until interrupted"
+            ),
+        ),
+    ] = False,
+) -> None:
+    """
+    Synthesizes the cluster's charts, writing each group of charts as soon as
+    it is synthesized.
+    """
+    from lab.cluster import CHART_GROUPS, configure_caches, synth_cluster
+    from lab.libs.config import parse_config
+    from lab.libs.fingerprint import get_fingerprint_store, hash_files
+    from lab.libs.k8s.stream import write_stream
+    from lab.libs.k8s.synth import get_outdir, write_files
+
+    # with a stream on stdout, status is written to stderr
+    to_stdout = output == "-"
+    status = sys.stderr if to_stdout else sys.stdout
+
+    if watch and (to_stdout or config_file.name == "<stdin>"):
+        print("[red]--watch needs a config file and an output directory[/red]")
+        raise typer.Exit(1)
+
+    profiler = enable_profiling("k8s synth") if profiling else None
+
+    config_text = config_file.read()
 
     try:
-        config = parse_config(config_file)
+        with profile("config parse"):
+            config = parse_config(io.StringIO(config_text))
     except ConfigError as e:
+        print(f"[red]{e}[/red]", file=status)
+        raise typer.Exit(1) from e
+
+    start = time.perf_counter()
+
+    configure_caches(offline)
+
+    if to_stdout:
+        try:
+            result = synth_cluster(
+                config_text,
+                jobs=jobs,
+                offline=offline,
+                profiling=profiling,
+                on_group=lambda _, files: write_stream(
+                    sys.stdout.buffer, files, output_format
+                ),
+                isolate=low_memory,
+            )
+        except LabError as e:
+            print(f"[red]{e}[/red]", file=status)
+            raise typer.Exit(1) from e
+
+        sys.stdout.buffer.flush()
+
+        print(
+            f"synthesized in {time.perf_counter() - start:.1f}s with {jobs} job(s)",
+            file=status,
+        )
+        print(f"manifest cache: {result.manifest_cache_stats}", file=status)
+        print(f"helm render cache: {result.helm_cache_stats}", file=status)
+
+        if profiler:
+            report_profiles(
+                profile_dir,
+                "k8s-synth",
+                [profiler.profile, *result.profiles],
+                file=status,
+            )
+        return
+
+    outdir = Path(output) if output else get_outdir()
+    fingerprints = get_fingerprint_store(outdir)
+
+    with profile("fingerprint"):
+        group_fingerprints = {k: v.fingerprint(config) for k, v in CHART_GROUPS.items()}
+
+    reused = [
+        k
+        for k, v in group_fingerprints.items()
+        if incremental and fingerprints.is_current(k, v, outdir)
+    ]
+    rebuilt = [x for x in CHART_GROUPS if x not in reused]
+
+    # only hashes are kept, so each group's files can be released once written
+    file_hashes: dict[str, dict[str, str]] = {}
+
+    def write_group(group: str, files: dict[str, bytes]) -> None:
+        write_files(outdir, files)
+        file_hashes[group] = hash_files(files)
+
+    try:
+        result = synth_cluster(
+            config_text,
+            jobs=jobs,
+            offline=offline,
+            groups=rebuilt,
+            profiling=profiling,
+            on_group=write_group,
+            isolate=low_memory,
+        )
+    except LabError as e:
         print(f"[red]{e}[/red]")
         raise typer.Exit(1) from e
 
-    ##
-    ## Cluster Services
-    ##
-    IngressNginx(app, "ingress-nginx", config.ingress)
-    CloudflareExternalDns(app, "cloudflare-external-dns", config=config.cloudflare_dns)
-    CertManager(app, "cert-manager")
-    issuer = CloudflareAcmeIssuer(
-        app,
-        "cloudflare-acme-issuer",
-        config=config.cloudflare_acme_issuer,
-        acme_server=CloudflareAcmeIssuer.LETS_ENCRYPT,
-    )
-    GrafanaAlloyCrd(app, "grafana-alloy-crd")
-    GrafanaAlloy(app, "grafana-alloy", config=config.grafana)
-
-    ##
-    ## Apps
-    ##
-    Tailscale(app, "tailscale", config=config.tailscale)
-    Bitwarden(
-        app,
-        "bitwarden",
-        config=config.bitwarden,
-        cluster_issuer_name=issuer.cluster_issuer_name,
-        ingress_class_name=IngressNginx.INGRESS_CLASS_NAME,
+    for group, hashes in file_hashes.items():
+        fingerprints.record_hashes(group, group_fingerprints[group], hashes)
+    pruned = fingerprints.prune(CHART_GROUPS, outdir)
+    fingerprints.save()
+
+    print(f"synthesized in {time.perf_counter() - start:.1f}s with {jobs} job(s)")
+    print(f"rebuilt: {', '.join(rebuilt) or '-'}")
+    print(f"reused: {', '.join(reused) or '-'}")
+    if pruned:
+        print(f"deleted: {', '.join(pruned)}")
+    print(f"manifest cache: {result.manifest_cache_stats}")
+    print(f"helm render cache: {result.helm_cache_stats}")
+
+    if profiler:
+        report_profiles(profile_dir, "k8s-synth", [profiler.profile, *result.profiles])
+
+    if watch:
+        try:
+            _watch(Path(config_file.name), outdir, offline)
+        except KeyboardInterrupt:
+            pass
+
+
+def _print_diff(manifest_diff: ManifestDiff, *, changes: bool) -> None:
+    from rich.markup import escape
+
+    for key in manifest_diff.added:
+        print(f"[green]+ {escape(str(key))}[/green]")
+    for key in manifest_diff.removed:
+        print(f"[red]- {escape(str(key))}[/red]")
+    for key, key_changes in manifest_diff.changed.items():
+        print(f"[yellow]~ {escape(str(key))}[/yellow]")
+
+        for x in key_changes if changes else []:
+            path, old, new = escape(x.path), json.dumps(x.old), json.dumps(x.new)
+            if x.op == "add":
+                print(f"    [green]+ {path}: {escape(new)}[/green]")
+            elif x.op == "remove":
+                print(f"    [red]- {path}: {escape(old)}[/red]")
+            else:
+                print(f"    ~ {path}: {escape(old)} -> {escape(new)}")
+
+    print(
+        f"{len(manifest_diff.added)} added, {len(manifest_diff.removed)} removed, "
+        f"{len(manifest_diff.changed)} changed, {manifest_diff.unchanged} unchanged"
     )
 
-    app.synth()
+
+def _rebuild(config_path: Path, outdir: Path, offline: bool) -> None:
+    # imported on each rebuild, as the modules may have been reloaded
+    from lab.cluster import CHART_GROUPS, configure_caches, synth_group
+    from lab.libs.config import parse_config
+    from lab.libs.fingerprint import get_fingerprint_store
+    from lab.libs.k8s.diff import diff_manifests
+    from lab.libs.k8s.synth import write_files
+
+    with open(config_path) as f:
+        config = parse_config(f)
+
+    configure_caches(offline)
+    fingerprints = get_fingerprint_store(outdir)
+
+    rebuilt = []
+    for group, chart_group in CHART_GROUPS.items():
+        fingerprint = chart_group.fingerprint(config)
+        if fingerprints.is_current(group, fingerprint, outdir):
+            continue
+
+        start = time.perf_counter()
+        files = synth_group(config, group)
+        previous = {
+            x: (outdir / x).read_bytes() for x in files if (outdir / x).exists()
+        }
+        write_files(outdir, files)
+
+        fingerprints.record(group, fingerprint, files)
+        rebuilt.append(group)
+
+        print(f"rebuilt {group} in {time.perf_counter() - start:.2f}s")
+        _print_diff(diff_manifests(previous, files), changes=False)
+
+    for name in fingerprints.prune(CHART_GROUPS, outdir):
+        print(f"deleted {name}")
+    fingerprints.save()
+
+    if not rebuilt:
+        print("no charts changed")
+
+
+def _watch(config_path: Path, outdir: Path, offline: bool) -> None:
+    """
+    Rebuilds charts in this process, whose JSII runtime stays loaded, each time
+    the config file or lab's sources change.
+    """
+    from lab.libs.modules import PACKAGE_ROOT, reload_modules
+    from lab.libs.watch import make_watcher
+
+    with make_watcher([PACKAGE_ROOT], [config_path]) as watcher:
+        print(
+            f"watching {config_path} and {PACKAGE_ROOT} "
+            f"({type(watcher).__name__}), press Ctrl-C to stop"
+        )
+
+        # sources whose modules are yet to be reloaded
+        pending: set[Path] = set()
+
+        while True:
+            changed = watcher.wait()
+            pending |= changed
+            start = time.perf_counter()
+
+            print(f"changed: {', '.join(sorted(x.name for x in changed))}")
+
+            # a change may be incomplete, e.g. a syntax error, so errors are
+            # reported until the next change
+            try:
+                reloaded = reload_modules(pending)
+                pending = set()
+
+                if reloaded:
+                    print(f"reloaded: {', '.join(reloaded)}")
+
+                _rebuild(config_path, outdir, offline)
+            except Exception as e:
+                print(f"[red]{type(e).__name__}: {e}[/red]")
+                continue
+
+            print(f"rebuilt in {time.perf_counter() - start:.2f}s")
+
+
+@cli.command()
+def diff(
+    config_file: Annotated[typer.FileText, typer.Option()],
+    offline: Offline = False,
+    jobs: Jobs = 1,
+    against: Annotated[
+        Optional[Path],
+        typer.Option(
+            help=(
+                "Directory of the previous synth to compare against. Defaults to "
+                "$CDK8S_OUTDIR, or dist"
+            ),
+        ),
+    ] = None,
+    write_changed: Annotated[
+        Optional[Path],
+        typer.Option(
+            help="Write only the added and changed objects to this file, to apply"
+        ),
+    ] = None,
+) -> None:
+    """
+    Synthesizes the cluster's charts, and lists the objects which were added,
+    removed or changed since the previous synth. Secret values are redacted.
+    """
+    from lab.cluster import configure_caches, synth_cluster
+    from lab.libs.cache import write_atomic
+    from lab.libs.k8s.diff import diff_manifests
+    from lab.libs.k8s.stream import write_stream
+    from lab.libs.k8s.synth import get_outdir, read_files
+
+    configure_caches(offline)
+
+    try:
+        result = synth_cluster(config_file.read(), jobs=jobs, offline=offline)
+        manifest_diff = diff_manifests(
+            read_files(against or get_outdir()), result.files
+        )
+    except LabError as e:
+        print(f"[red]{e}[/red]")
+        raise typer.Exit(1) from e
+
+    _print_diff(manifest_diff, changes=True)
+
+    if write_changed:
+        stream = io.BytesIO()
+        write_stream(stream, manifest_diff.changed_files(), OutputFormat.YAML)
+        write_atomic(write_changed, stream.getvalue())
+
+
+@cli.command()
+def lock(
+    update: Annotated[
+        bool, typer.Option(help="Download and re-pin manifests that are already pinned")
+    ] = False,
+) -> None:
+    """
+    Downloads remote manifests and pins their digests in the lockfile.
+    """
+    from lab.cluster import configure_caches
+
+    manifest_cache, _ = configure_caches(offline=False)
+
+    try:
+        for url in _manifest_urls():
+            manifest_cache.resolve(url, pin=True, refresh=update)
+    except LabError as e:
+        print(f"[red]{e}[/red]")
+        raise typer.Exit(1) from e
+
+    print(f"manifest cache: {manifest_cache.stats}")
+
+
+@cli.command()
+def pull_charts() -> None:
+    """
+    Stores Helm chart tarballs locally, so charts can be rendered offline.
+    """
+    from lab.cluster import configure_caches
+
+    _, helm_cache = configure_caches(offline=False)
+
+    try:
+        for ref in _helm_charts():
+            print(f"{ref.chart}-{ref.version}: {helm_cache.pull(ref)}")
+    except LabError as e:
+        print(f"[red]{e}[/red]")
+        raise typer.Exit(1) from e
 
 
 def register_k8s_cli(app: typer.Typer) -> None:
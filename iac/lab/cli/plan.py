@@ -0,0 +1,134 @@
+from pathlib import Path
+from typing import Annotated, Optional
+
+from rich import print
+from rich.table import Table
+import typer
+
+from lab.libs.cli import make_typer
+from lab.libs.exceptions import LabError
+
+cli = make_typer()
+
+
+@cli.command()
+def capacity(
+    manifests: Annotated[
+        Optional[Path],
+        typer.Option(
+            help="Directory of synthesized manifests [default: CDK8S_OUTDIR or dist]"
+        ),
+    ] = None,
+    nodes: Annotated[
+        Optional[int],
+        typer.Option(min=1, help="Plan for this many nodes, rather than the pool's"),
+    ] = None,
+    ocpus: Annotated[
+        Optional[float],
+        typer.Option(min=0, help="Plan for nodes with this many OCPUs"),
+    ] = None,
+    memory: Annotated[
+        Optional[float],
+        typer.Option(min=0, help="Plan for nodes with this much memory, in GB"),
+    ] = None,
+    max_cpu_overcommit: Annotated[
+        float,
+        typer.Option(
+            min=0,
+            help=(
+                "Fail if the CPU limits of a node's pods exceed its allocatable CPU "
+                "by this ratio. Containers without a limit count as its whole CPU"
+            ),
+        ),
+    ] = 2.0,
+) -> None:
+    """
+    Places the pods of the synthesized workloads on the cluster's worker pool,
+    and reports each node's requests, limits and headroom. Fails if a pod would
+    not schedule, or a node's CPU is overcommitted.
+    """
+    from dataclasses import replace
+
+    from lab.libs.capacity import (
+        WORKER_POOL,
+        allocatable,
+        find_workloads,
+        plan_capacity,
+    )
+    from lab.libs.k8s.diff import index_objects
+    from lab.libs.k8s.quantity import format_cpu, format_memory
+    from lab.libs.k8s.synth import get_outdir, read_files
+
+    pool = replace(
+        WORKER_POOL,
+        size=WORKER_POOL.size if nodes is None else nodes,
+        ocpus=WORKER_POOL.ocpus if ocpus is None else ocpus,
+        memory_gbs=WORKER_POOL.memory_gbs if memory is None else memory,
+    )
+
+    outdir = manifests or get_outdir()
+    files = read_files(outdir)
+    if not files:
+        print(f"[red]no synthesized manifests in {outdir}, run `k8s synth`[/red]")
+        raise typer.Exit(1)
+
+    try:
+        plan = plan_capacity(pool, find_workloads(index_objects(files)))
+    except LabError as e:
+        print(f"[red]{e}[/red]")
+        raise typer.Exit(1) from e
+
+    node = allocatable(pool)
+    print(
+        f"{pool.size} x {pool.shape}, {pool.ocpus:g} OCPUs and {pool.memory_gbs:g} GB: "
+        f"{format_cpu(node.cpu)} CPU and {format_memory(node.memory)} allocatable"
+    )
+
+    table = Table(
+        "node",
+        "pods",
+        "CPU requests",
+        "memory requests",
+        "CPU limits",
+        "memory limits",
+        "CPU free",
+        "memory free",
+    )
+    for x in plan.nodes:
+        requests, free = x.requests, x.free
+        table.add_row(
+            x.name,
+            str(len(x.pods)),
+            f"{format_cpu(requests.cpu)} ({requests.cpu / x.allocatable.cpu:.0%})",
+            f"{format_memory(requests.memory)} "
+            f"({requests.memory / x.allocatable.memory:.0%})",
+            f"{x.cpu_overcommit():.2f}x",
+            f"{x.memory_overcommit():.2f}x",
+            format_cpu(free.cpu),
+            format_memory(free.memory),
+        )
+    print(table)
+
+    failed = False
+    for pod in plan.unschedulable:
+        failed = True
+        print(
+            f"[red]unschedulable: {pod.workload} requests "
+            f"{format_cpu(pod.requests.cpu)} CPU and "
+            f"{format_memory(pod.requests.memory)}[/red]"
+        )
+
+    for x in plan.starved(max_cpu_overcommit):
+        failed = True
+        print(
+            f"[red]CPU-starved: the CPU limits on {x.name} are "
+            f"{x.cpu_overcommit():.2f}x its allocatable CPU, "
+            f"more than {max_cpu_overcommit:g}x[/red]"
+        )
+
+    if failed:
+        raise typer.Exit(1)
+
+
+def register_plan_cli(app: typer.Typer) -> None:
+    app.add_typer(cli, name="plan")
@@ -0,0 +1,46 @@
+import os
+import sys
+from typing import Annotated
+
+from rich import print
+import typer
+
+from lab.libs.exceptions import LabError
+
+
+def serve(
+    max_requests: Annotated[
+        int,
+        typer.Option(
+            min=1,
+            help=(
+                "Restart after serving this many commands, releasing the objects "
+                "the JSII runtime holds"
+            ),
+        ),
+    ] = 100,
+) -> None:
+    """
+    Keeps the JSII runtime and charts loaded, and runs `k8s synth` and
+    `infra synth` for other invocations of labcli, which otherwise run them
+    themselves.
+    """
+    from lab.libs import daemon
+
+    socket_path = daemon.get_socket_path()
+    print(f"serving on {socket_path}", file=sys.stderr)
+
+    try:
+        daemon.serve(socket_path, max_requests=max_requests)
+    except LabError as e:
+        print(f"[red]{e}[/red]")
+        raise typer.Exit(1) from e
+    except KeyboardInterrupt:
+        return
+
+    print("restarting", file=sys.stderr)
+    os.execv(sys.executable, [sys.executable, *sys.orig_argv[1:]])
+
+
+def register_serve_cli(app: typer.Typer) -> None:
+    app.command()(serve)
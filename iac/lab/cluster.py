@@ -0,0 +1,374 @@
+import inspect
+import io
+import multiprocessing
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import version
+from itertools import repeat
+from pathlib import Path
+from typing import Optional
+
+from cdk8s import App, Chart
+
+from lab.charts import (
+    Bitwarden,
+    CloudflareExternalDns,
+    CertManager,
+    GrafanaAlloy,
+    GrafanaAlloyCrd,
+    IngressNginx,
+    Tailscale,
+    CloudflareAcmeIssuer,
+)
+from lab.libs.cache import CacheStats, get_cache_dir, stable_hash
+from lab.libs.config import Config, parse_config
+from lab.libs.fingerprint import hash_sources, reveal_secrets, version_constants
+from lab.libs.k8s.helm import HelmRenderCache, get_helm_cache, set_helm_cache
+from lab.libs.k8s.manifest_cache import (
+    ManifestCache,
+    get_manifest_cache,
+    set_manifest_cache,
+)
+from lab.libs.k8s.resources import check_bounded
+from lab.libs.k8s.synth import synth_files
+from lab.libs.modules import imported_sources
+from lab.libs.profile import Profile, enable_profiling, profile
+
+# chart class attributes which pin the version of what the chart deploys
+VERSION_CONSTANTS = ["VERSION", "CHART_VERSION", "OPERATOR_VERSION"]
+
+# packages whose version affects the synthesized output of every chart
+SYNTH_PACKAGES = ["cdk8s", "cdk8s-plus-29", "constructs"]
+
+
+class ChartGroup:
+    """
+    A group of charts that can be built independently of all other charts.
+
+    Args:
+        build: defines the charts in an App
+        charts: the classes of the charts defined by `build`
+        config_fields: the sections of `Config` used by the charts
+    """
+
+    def __init__(
+        self,
+        build: Callable[[App, Config], None],
+        *,
+        charts: Sequence[type[Chart]],
+        config_fields: Sequence[str],
+    ):
+        self.build = build
+        self.charts = charts
+        self.config_fields = config_fields
+
+    def fingerprint(self, config: Config) -> str:
+        """
+        Returns a hash of everything that affects the synthesized charts: their
+        config, versions, sources and upstream manifests.
+        """
+        manifest_cache = get_manifest_cache()
+
+        return stable_hash(
+            {
+                "config": stable_hash(
+                    {x: reveal_secrets(getattr(config, x)) for x in self.config_fields}
+                ),
+                "versions": {
+                    x.__name__: version_constants(x, VERSION_CONSTANTS)
+                    for x in self.charts
+                },
+                "manifests": {
+                    url: manifest_cache.digest(url)
+                    for x in self.charts
+                    for url in _manifest_urls(x)
+                },
+                "sources": hash_sources(
+                    imported_sources(
+                        {x.__module__ for x in self.charts}
+                        | _referenced_modules(self.build)
+                    )
+                    + _shared_sources()
+                ),
+                "packages": {x: version(x) for x in SYNTH_PACKAGES},
+            }
+        )
+
+
+def _manifest_urls(chart: type[Chart]) -> list[str]:
+    return [getattr(chart, x) for x in dir(chart) if x.endswith("MANIFEST_URL")]
+
+
+def _referenced_modules(build: Callable) -> set[str]:
+    # the modules of the lab objects which a builder reads, e.g. the constants of
+    # charts outside its group
+    names: set[str] = set()
+    codes = [build.__code__]
+    while codes:
+        code = codes.pop()
+        names.update(code.co_names)
+        codes.extend(x for x in code.co_consts if inspect.iscode(x))
+
+    return {
+        module.__name__
+        for x in names
+        if x in build.__globals__
+        and (module := inspect.getmodule(build.__globals__[x]))
+        and module.__name__.startswith("lab.")
+    }
+
+
+def _shared_sources() -> list[Path]:
+    # libraries used by all charts, and the composition in this module. lab is
+    # a namespace package, without a __file__
+    root = Path(__file__).parent
+    return list((root / "libs").rglob("*.py")) + [Path(__file__)]
+
+
+##
+## Cluster Services
+##
+
+
+def _ingress_nginx(app: App, config: Config) -> None:
+    IngressNginx(app, "ingress-nginx", config.ingress, resources=config.resources)
+
+
+def _cloudflare_external_dns(app: App, config: Config) -> None:
+    CloudflareExternalDns(
+        app,
+        "cloudflare-external-dns",
+        config=config.cloudflare_dns,
+        resources=config.resources,
+    )
+
+
+def _cert_manager(app: App, config: Config) -> None:
+    CertManager(app, "cert-manager", resources=config.resources)
+
+
+def _grafana_alloy_crd(app: App, config: Config) -> None:
+    GrafanaAlloyCrd(app, "grafana-alloy-crd")
+
+
+def _grafana_alloy(app: App, config: Config) -> None:
+    GrafanaAlloy(
+        app,
+        "grafana-alloy",
+        config=config.grafana,
+        resources=config.resources,
+        ingress_access_logs=config.ingress.json_access_logs,
+    )
+
+
+##
+## Apps
+##
+
+
+def _tailscale(app: App, config: Config) -> None:
+    Tailscale(app, "tailscale", config=config.tailscale, resources=config.resources)
+
+
+def _bitwarden(app: App, config: Config) -> None:
+    # Bitwarden references the ClusterIssuer by its generated name, so the
+    # issuer is built in the same group
+    issuer = CloudflareAcmeIssuer(
+        app,
+        "cloudflare-acme-issuer",
+        config=config.cloudflare_acme_issuer,
+        acme_server=CloudflareAcmeIssuer.LETS_ENCRYPT,
+    )
+    Bitwarden(
+        app,
+        "bitwarden",
+        config=config.bitwarden,
+        cluster_issuer_name=issuer.cluster_issuer_name,
+        ingress_class_name=IngressNginx.INGRESS_CLASS_NAME,
+        resources=config.resources,
+    )
+
+
+CHART_GROUPS: dict[str, ChartGroup] = {
+    "ingress-nginx": ChartGroup(
+        _ingress_nginx, charts=[IngressNginx], config_fields=["ingress", "resources"]
+    ),
+    "cloudflare-external-dns": ChartGroup(
+        _cloudflare_external_dns,
+        charts=[CloudflareExternalDns],
+        config_fields=["cloudflare_dns", "resources"],
+    ),
+    "cert-manager": ChartGroup(
+        _cert_manager, charts=[CertManager], config_fields=["resources"]
+    ),
+    "grafana-alloy-crd": ChartGroup(
+        _grafana_alloy_crd, charts=[GrafanaAlloyCrd], config_fields=[]
+    ),
+    "grafana-alloy": ChartGroup(
+        _grafana_alloy,
+        charts=[GrafanaAlloy],
+        config_fields=["grafana", "ingress", "resources"],
+    ),
+    "tailscale": ChartGroup(
+        _tailscale, charts=[Tailscale], config_fields=["tailscale", "resources"]
+    ),
+    "bitwarden": ChartGroup(
+        _bitwarden,
+        charts=[CloudflareAcmeIssuer, Bitwarden],
+        config_fields=["cloudflare_acme_issuer", "bitwarden", "resources"],
+    ),
+}
+
+
+def build_cluster(
+    app: App, config: Config, *, groups: Optional[Iterable[str]] = None
+) -> None:
+    """
+    Defines the charts in `groups`, or all charts, in the App.
+    """
+    for group in CHART_GROUPS if groups is None else groups:
+        with profile(f"construct {group}"):
+            CHART_GROUPS[group].build(app, config)
+
+
+def configure_caches(offline: bool) -> tuple[ManifestCache, HelmRenderCache]:
+    manifest_cache = ManifestCache(
+        cache_dir=get_cache_dir() / "manifests", offline=offline
+    )
+    set_manifest_cache(manifest_cache)
+
+    helm_cache = HelmRenderCache(cache_dir=get_cache_dir() / "helm", offline=offline)
+    set_helm_cache(helm_cache)
+
+    return manifest_cache, helm_cache
+
+
+class SynthResult:
+    def __init__(
+        self,
+        *,
+        files_by_group: dict[str, dict[str, bytes]],
+        manifest_cache_stats: CacheStats,
+        helm_cache_stats: CacheStats,
+        profiles: Optional[list[Profile]] = None,
+    ):
+        self.files_by_group = files_by_group
+        self.manifest_cache_stats = manifest_cache_stats
+        self.helm_cache_stats = helm_cache_stats
+        # recorded by worker processes, when profiling
+        self.profiles = profiles or []
+
+    @property
+    def files(self) -> dict[str, bytes]:
+        return {k: v for x in self.files_by_group.values() for k, v in x.items()}
+
+    def merge(self, other: "SynthResult") -> None:
+        self.files_by_group.update(other.files_by_group)
+        self.manifest_cache_stats.merge(other.manifest_cache_stats)
+        self.helm_cache_stats.merge(other.helm_cache_stats)
+        self.profiles.extend(other.profiles)
+
+
+def synth_group(config: Config, group: str) -> dict[str, bytes]:
+    """
+    Synthesizes a single group of charts in its own App. Raises LabError if a
+    container of a workload has no CPU or memory limit.
+    """
+    files = synth_files(lambda app: build_cluster(app, config, groups=[group]))
+    check_bounded(files)
+
+    return files
+
+
+def _synth_group_worker(
+    config_text: str, group: str, offline: bool, profiling: bool
+) -> SynthResult:
+    profiler = enable_profiling(f"worker: {group}") if profiling else None
+
+    with profile("config parse"):
+        config = parse_config(io.StringIO(config_text))
+
+    manifest_cache, helm_cache = configure_caches(offline)
+
+    return SynthResult(
+        files_by_group={group: synth_group(config, group)},
+        manifest_cache_stats=manifest_cache.stats,
+        helm_cache_stats=helm_cache.stats,
+        profiles=[profiler.profile] if profiler else [],
+    )
+
+
+def synth_cluster(
+    config_text: str,
+    *,
+    jobs: int,
+    offline: bool,
+    groups: Optional[Iterable[str]] = None,
+    profiling: bool = False,
+    on_group: Optional[Callable[[str, dict[str, bytes]], None]] = None,
+    isolate: bool = False,
+) -> SynthResult:
+    """
+    Synthesizes groups of charts, each in its own App. With more than one job,
+    groups are synthesized in a pool of worker processes, each with its own
+    JSII runtime.
+
+    Files are identical to those synthesized by a single App, as groups do not
+    depend on each other.
+
+    If `on_group` is set, it is called with the files of each group, in order,
+    as soon as they are synthesized, and the files are not kept in the result.
+    With `isolate`, each group is synthesized in a new worker process, which
+    exits once it is done, releasing the group's construct tree. Together these
+    bound peak memory to about that of the largest group.
+
+    If `profiling` is set, each worker records a profile, which is returned in
+    the result. Serial synths record to the profiler of this process.
+    """
+    groups = list(CHART_GROUPS if groups is None else groups)
+
+    result = SynthResult(
+        files_by_group={},
+        manifest_cache_stats=CacheStats(),
+        helm_cache_stats=CacheStats(),
+    )
+
+    def add_group(group: str, files: dict[str, bytes]) -> None:
+        if on_group:
+            on_group(group, files)
+        else:
+            result.files_by_group[group] = files
+
+    if jobs == 1 and not isolate:
+        config = parse_config(io.StringIO(config_text))
+        for group in groups:
+            add_group(group, synth_group(config, group))
+
+        result.manifest_cache_stats.merge(get_manifest_cache().stats)
+        result.helm_cache_stats.merge(get_helm_cache().stats)
+        return result
+
+    # the JSII runtime is a child process of the parent, so workers must not
+    # be forked from it
+    context = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        mp_context=context,
+        # the JSII runtime never frees objects, so only a new process does
+        max_tasks_per_child=1 if isolate else None,
+    ) as pool:
+        for x in pool.map(
+            _synth_group_worker,
+            repeat(config_text),
+            groups,
+            repeat(offline),
+            repeat(profiling),
+        ):
+            for group, files in x.files_by_group.items():
+                add_group(group, files)
+
+            x.files_by_group = {}
+            result.merge(x)
+
+    return result
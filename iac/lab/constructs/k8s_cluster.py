@@ -4,6 +4,7 @@ from constructs import Construct
 
 from imports.oke import Oke
 from imports.oci.provider import OciProvider
+from lab.libs.capacity import WORKER_POOL
 
 
 class KubernetesCluster(Construct):
@@ -53,10 +54,10 @@ class KubernetesCluster(Construct):
             worker_pools={
                 "default": {
                     "mode": "node-pool",
-                    "size": 2,
-                    "shape": "VM.Standard.A1.Flex",
-                    "ocpus": 2,
-                    "memory": 12,
+                    "size": WORKER_POOL.size,
+                    "shape": WORKER_POOL.shape,
+                    "ocpus": WORKER_POOL.ocpus,
+                    "memory": WORKER_POOL.memory_gbs,
                     "boot_volume_size": 50,
                     "kubernetes_version": KubernetesCluster.WORKER_NODE_VERSION,
                 },
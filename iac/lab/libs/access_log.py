@@ -0,0 +1,49 @@
+"""
+The JSON access log of the ingress-nginx controller, shared by the chart which
+configures it and the log pipeline which parses it.
+"""
+
+import json
+
+# each field of the log, and the nginx variable it is read from. All values are
+# strings, as nginx writes "-" for unset variables, and a list for each retried
+# upstream
+ACCESS_LOG_FIELDS = {
+    "time": "$time_iso8601",
+    "request_id": "$req_id",
+    "remote_addr": "$remote_addr",
+    "method": "$request_method",
+    "host": "$host",
+    "path": "$uri",
+    "protocol": "$server_protocol",
+    "status": "$status",
+    "bytes_sent": "$bytes_sent",
+    "request_length": "$request_length",
+    "request_time": "$request_time",
+    "ingress_namespace": "$namespace",
+    "ingress": "$ingress_name",
+    "service": "$service_name",
+    "upstream_addr": "$upstream_addr",
+    "upstream_status": "$upstream_status",
+    "upstream_connect_time": "$upstream_connect_time",
+    "upstream_header_time": "$upstream_header_time",
+    "upstream_response_time": "$upstream_response_time",
+}
+
+# fields which are durations, in seconds: the time from the first byte read from
+# the client to the last byte sent, and the time to connect to, receive the
+# headers of, and receive the whole response of the upstream
+LATENCY_FIELDS = [
+    "request_time",
+    "upstream_connect_time",
+    "upstream_header_time",
+    "upstream_response_time",
+]
+
+
+def log_format() -> str:
+    """
+    Returns the `log-format-upstream` of the controller. Variables are escaped by
+    the controller when `log-format-escape-json` is set.
+    """
+    return json.dumps(ACCESS_LOG_FIELDS)
@@ -0,0 +1,56 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+from lab.libs.cli import make_envvar
+
+
+class CacheStats:
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    def merge(self, other: "CacheStats") -> None:
+        self.hits += other.hits
+        self.misses += other.misses
+
+    def __str__(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses"
+
+
+def get_cache_dir() -> Path:
+    """
+    Returns the root directory for lab's persistent caches.
+
+    Uses `LAB_CACHE_DIR` if set, otherwise `$XDG_CACHE_HOME/lab`.
+    """
+    if cache_dir := os.environ.get(make_envvar("CACHE_DIR")):
+        return Path(cache_dir)
+
+    xdg_cache_home = os.environ.get("XDG_CACHE_HOME")
+    return (Path(xdg_cache_home) if xdg_cache_home else Path.home() / ".cache") / "lab"
+
+
+def stable_hash(data: Any) -> str:
+    """
+    Returns a sha256 hash of JSON-serializable data, independent of key order.
+    """
+    return hashlib.sha256(
+        json.dumps(data, sort_keys=True, separators=(",", ":"), default=str).encode()
+    ).hexdigest()
+
+
+def sha256_digest(data: bytes) -> str:
+    return f"sha256:{hashlib.sha256(data).hexdigest()}"
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """
+    Writes `data` to `path` such that readers never see a partial file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
@@ -0,0 +1,321 @@
+"""
+Plans whether the synthesized workloads fit onto the cluster's worker pool.
+
+Each workload's pods are placed by their requests, as the scheduler would: a
+DaemonSet's pod on every node, then the replicas of other workloads, largest
+first, on the feasible node with the most free resources. Jobs and CronJobs
+are not planned, as their pods do not run continuously.
+"""
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any, NamedTuple, Optional
+
+from lab.libs.exceptions import LabError
+from lab.libs.k8s.diff import ObjectKey, SynthesizedObject
+from lab.libs.k8s.quantity import parse_quantity
+
+GIB = 2**30
+
+# kinds whose pods are planned, and the path of their pod spec
+WORKLOAD_KINDS = {
+    "Deployment": ("spec", "template", "spec"),
+    "StatefulSet": ("spec", "template", "spec"),
+    "ReplicaSet": ("spec", "template", "spec"),
+    "DaemonSet": ("spec", "template", "spec"),
+    "Pod": ("spec",),
+}
+
+# hardware threads, i.e. vCPUs, per OCPU. Ampere shapes have one, x86 two
+_THREADS_PER_OCPU = {"VM.Standard.A1.Flex": 1}
+
+# the part of each tier of a node's capacity which OKE reserves for the kubelet
+# and system daemons: (size of the tier, fraction reserved)
+_CPU_RESERVED = [(1, 0.06), (1, 0.01), (2, 0.005), (float("inf"), 0.0025)]
+_MEMORY_RESERVED = [
+    (4 * GIB, 0.25),
+    (4 * GIB, 0.2),
+    (8 * GIB, 0.1),
+    (112 * GIB, 0.06),
+    (float("inf"), 0.02),
+]
+
+# below which the kubelet evicts pods
+_EVICTION_THRESHOLD = 100 * 2**20
+
+
+@dataclass(frozen=True)
+class WorkerPool:
+    """
+    Args:
+        size: the number of nodes
+        shape: the OCI shape of each node
+        ocpus: the OCPUs of each node
+        memory_gbs: the memory of each node, in GB
+    """
+
+    size: int
+    shape: str
+    ocpus: float
+    memory_gbs: float
+
+    @property
+    def cpu(self) -> float:
+        return self.ocpus * _THREADS_PER_OCPU.get(self.shape, 2)
+
+    @property
+    def memory(self) -> float:
+        return self.memory_gbs * GIB
+
+
+# the worker pool of the cluster, see `lab.constructs.KubernetesCluster`. Here,
+# rather than with the construct, so that planning does not load cdktf
+WORKER_POOL = WorkerPool(size=2, shape="VM.Standard.A1.Flex", ocpus=2, memory_gbs=12)
+
+
+def _reserved(capacity: float, tiers: list[tuple[float, float]]) -> float:
+    reserved = 0.0
+    for size, fraction in tiers:
+        reserved += min(capacity, size) * fraction
+        capacity -= min(capacity, size)
+
+    return reserved
+
+
+def allocatable(pool: WorkerPool) -> "Amount":
+    """
+    Returns the resources of each node which pods can request. Raises
+    LabError if a node has no CPU or memory left for pods.
+    """
+    node = Amount(
+        cpu=pool.cpu - _reserved(pool.cpu, _CPU_RESERVED),
+        memory=pool.memory
+        - _reserved(pool.memory, _MEMORY_RESERVED)
+        - _EVICTION_THRESHOLD,
+    )
+    if node.cpu <= 0 or node.memory <= 0:
+        raise LabError(
+            f"nodes of {pool.ocpus:g} OCPUs and {pool.memory_gbs:g} GB have no "
+            "allocatable CPU or memory after system reservations"
+        )
+
+    return node
+
+
+class Amount(NamedTuple):
+    # in cores
+    cpu: float = 0.0
+    # in bytes
+    memory: float = 0.0
+
+    def __add__(self, other: "Amount") -> "Amount":  # type: ignore[override]
+        return Amount(self.cpu + other.cpu, self.memory + other.memory)
+
+    def __sub__(self, other: "Amount") -> "Amount":
+        return Amount(self.cpu - other.cpu, self.memory - other.memory)
+
+    def fits(self, other: "Amount") -> bool:
+        return self.cpu <= other.cpu and self.memory <= other.memory
+
+
+@dataclass(frozen=True)
+class PodSpec:
+    """
+    Args:
+        workload: the workload which owns the pod
+        requests: the resources the scheduler reserves for the pod
+        limits: the most the pod can use, for resources whose containers are
+            all limited
+        unbounded_cpu: whether a container has no CPU limit
+        unbounded_memory: whether a container has no memory limit
+    """
+
+    workload: ObjectKey
+    requests: Amount
+    limits: Amount
+    unbounded_cpu: bool
+    unbounded_memory: bool
+
+
+def _container_amounts(container: dict) -> tuple[Amount, Amount, bool, bool]:
+    resources = container.get("resources") or {}
+    requests = resources.get("requests") or {}
+    limits = resources.get("limits") or {}
+
+    def amount(values: dict, name: str) -> Optional[float]:
+        if name not in values:
+            return None
+
+        try:
+            return float(parse_quantity(values[name]))
+        except ValueError as e:
+            raise LabError(f"container {container.get('name')}: {e}") from e
+
+    cpu_limit, memory_limit = amount(limits, "cpu"), amount(limits, "memory")
+
+    # unset requests default to the limit
+    cpu_request = amount(requests, "cpu")
+    memory_request = amount(requests, "memory")
+    if cpu_request is None:
+        cpu_request = cpu_limit
+    if memory_request is None:
+        memory_request = memory_limit
+
+    return (
+        Amount(cpu_request or 0.0, memory_request or 0.0),
+        Amount(cpu_limit or 0.0, memory_limit or 0.0),
+        cpu_limit is None,
+        memory_limit is None,
+    )
+
+
+def pod_spec(workload: ObjectKey, spec: dict) -> PodSpec:
+    """
+    Returns the resources of a pod: the sum of its containers', or the most any
+    init container needs, if that is more.
+    """
+    requests = limits = Amount()
+    unbounded_cpu = unbounded_memory = False
+
+    for container in spec.get("containers") or []:
+        request, limit, no_cpu_limit, no_memory_limit = _container_amounts(container)
+        requests += request
+        limits += limit
+        unbounded_cpu |= no_cpu_limit
+        unbounded_memory |= no_memory_limit
+
+    for container in spec.get("initContainers") or []:
+        request, limit, _, _ = _container_amounts(container)
+        requests = Amount(
+            max(requests.cpu, request.cpu), max(requests.memory, request.memory)
+        )
+        limits = Amount(max(limits.cpu, limit.cpu), max(limits.memory, limit.memory))
+
+    return PodSpec(workload, requests, limits, unbounded_cpu, unbounded_memory)
+
+
+def _get(document: dict, path: Iterable[str]) -> Any:
+    for x in path:
+        document = document.get(x) or {}
+
+    return document
+
+
+@dataclass
+class Workloads:
+    # pods which run on every node
+    daemons: list[PodSpec] = field(default_factory=list)
+    # pods which are placed on any node
+    replicas: list[PodSpec] = field(default_factory=list)
+
+
+def find_workloads(objects: dict[ObjectKey, SynthesizedObject]) -> Workloads:
+    """
+    Returns the pods of the workloads in synthesized objects. Workloads scaled
+    by a HorizontalPodAutoscaler are planned at its maximum.
+    """
+    max_replicas = {
+        (key.namespace, target.get("kind"), target.get("name")): spec["maxReplicas"]
+        for key, obj in objects.items()
+        if key.kind == "HorizontalPodAutoscaler"
+        and "maxReplicas" in (spec := obj.obj.get("spec") or {})
+        and (target := spec.get("scaleTargetRef") or {})
+    }
+
+    workloads = Workloads()
+    for key, obj in objects.items():
+        if key.kind not in WORKLOAD_KINDS:
+            continue
+
+        pod = pod_spec(key, _get(obj.obj, WORKLOAD_KINDS[key.kind]))
+        if key.kind == "DaemonSet":
+            workloads.daemons.append(pod)
+            continue
+
+        replicas = 1 if key.kind == "Pod" else obj.obj["spec"].get("replicas", 1)
+        replicas = max(
+            replicas, max_replicas.get((key.namespace, key.kind, key.name), 0)
+        )
+        workloads.replicas += [pod] * replicas
+
+    return workloads
+
+
+@dataclass
+class Node:
+    name: str
+    allocatable: Amount
+    pods: list[PodSpec] = field(default_factory=list)
+
+    @property
+    def requests(self) -> Amount:
+        return sum((x.requests for x in self.pods), Amount())
+
+    @property
+    def limits(self) -> Amount:
+        return sum((x.limits for x in self.pods), Amount())
+
+    @property
+    def free(self) -> Amount:
+        return self.allocatable - self.requests
+
+    def cpu_overcommit(self) -> float:
+        """
+        Returns the ratio of CPU limits to allocatable CPU, counting containers
+        without a limit as able to use all of it.
+        """
+        limits = sum(
+            self.allocatable.cpu if x.unbounded_cpu else x.limits.cpu for x in self.pods
+        )
+        return limits / self.allocatable.cpu
+
+    def memory_overcommit(self) -> float:
+        return self.limits.memory / self.allocatable.memory
+
+
+@dataclass
+class CapacityPlan:
+    nodes: list[Node]
+    # pods which fit on no node
+    unschedulable: list[PodSpec]
+
+    def starved(self, max_cpu_overcommit: float) -> list[Node]:
+        """
+        Returns the nodes whose pods can use more than `max_cpu_overcommit`
+        times their CPU, and so would be throttled under load.
+        """
+        return [x for x in self.nodes if x.cpu_overcommit() > max_cpu_overcommit]
+
+
+def _score(node: Node) -> float:
+    # the scheduler's default, preferring the least allocated node
+    free = node.free
+    return free.cpu / node.allocatable.cpu + free.memory / node.allocatable.memory
+
+
+def plan_capacity(pool: WorkerPool, workloads: Workloads) -> CapacityPlan:
+    """
+    Places the pods of workloads on the nodes of a pool, by their requests.
+    """
+    nodes = [Node(f"node-{i}", allocatable(pool)) for i in range(pool.size)]
+    plan = CapacityPlan(nodes=nodes, unschedulable=[])
+
+    for node in nodes:
+        for pod in workloads.daemons:
+            if pod.requests.fits(node.free):
+                node.pods.append(pod)
+            else:
+                plan.unschedulable.append(pod)
+
+    for pod in sorted(
+        workloads.replicas,
+        key=lambda x: (x.requests.cpu, x.requests.memory),
+        reverse=True,
+    ):
+        feasible = [x for x in nodes if pod.requests.fits(x.free)]
+        if feasible:
+            max(feasible, key=_score).pods.append(pod)
+        else:
+            plan.unschedulable.append(pod)
+
+    return plan
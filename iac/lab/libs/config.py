@@ -1,8 +1,18 @@
 from ipaddress import IPv4Network
-from typing import IO, Optional
-from pydantic import BaseModel, ValidationError, SecretStr
+from typing import IO, Annotated, Literal, Optional, Union
+from pydantic import (
+    BaseModel,
+    Field,
+    NonNegativeInt,
+    PositiveInt,
+    ValidationError,
+    SecretStr,
+    field_validator,
+    model_validator,
+)
 
 from lab.libs.exceptions import ConfigError
+from lab.libs.k8s.quantity import parse_quantity
 
 import yaml
 
@@ -60,8 +70,237 @@ class TailscaleConfig(BaseModel):
     cluster_api_proxy: Optional[TailscaleClusterApiProxy] = None
 
 
+# an nginx size, e.g. "16k"
+NginxSize = Annotated[str, Field(pattern=r"^[0-9]+[kKmM]?$")]
+
+MimeType = Annotated[str, Field(pattern=r"^[\w.+-]+/[\w.+*-]+$")]
+
+
+class IngressPerformanceConfig(BaseModel):
+    """
+    Settings of the ingress-nginx controller ConfigMap, named as its keys, with
+    "_" in place of "-". Unset settings keep the controller's defaults.
+    """
+
+    worker_processes: Optional[Union[Literal["auto"], PositiveInt]] = None
+    max_worker_connections: Optional[NonNegativeInt] = None
+    # in seconds
+    keep_alive: Optional[NonNegativeInt] = None
+    keep_alive_requests: Optional[PositiveInt] = None
+    upstream_keepalive_connections: Optional[NonNegativeInt] = None
+    upstream_keepalive_requests: Optional[PositiveInt] = None
+    use_gzip: Optional[bool] = None
+    gzip_level: Optional[Annotated[int, Field(ge=1, le=9)]] = None
+    gzip_types: Optional[list[MimeType]] = None
+    enable_brotli: Optional[bool] = None
+    brotli_level: Optional[Annotated[int, Field(ge=1, le=11)]] = None
+    brotli_types: Optional[list[MimeType]] = None
+    use_http2: Optional[bool] = None
+    proxy_buffer_size: Optional[NginxSize] = None
+    proxy_buffers_number: Optional[PositiveInt] = None
+    ssl_session_cache: Optional[bool] = None
+    ssl_session_cache_size: Optional[NginxSize] = None
+
+    @model_validator(mode="after")
+    def _compression_enabled(self) -> "IngressPerformanceConfig":
+        # (setting, the controller's default, settings which need it enabled)
+        for enabled, default, settings in [
+            ("use_gzip", False, ["gzip_level", "gzip_types"]),
+            ("enable_brotli", False, ["brotli_level", "brotli_types"]),
+            ("ssl_session_cache", True, ["ssl_session_cache_size"]),
+        ]:
+            value = getattr(self, enabled)
+            if default if value is None else value:
+                continue
+
+            for x in settings:
+                if getattr(self, x) is not None:
+                    raise ValueError(f"{x} has no effect unless {enabled} is true")
+
+        return self
+
+    def configmap_data(self) -> dict[str, str]:
+        """
+        Returns the set settings, as ConfigMap data.
+        """
+
+        def value(x: Union[str, int, bool, list[str]]) -> str:
+            if isinstance(x, bool):
+                return str(x).lower()
+            if isinstance(x, list):
+                return " ".join(x)
+
+            return str(x)
+
+        return {
+            k.replace("_", "-"): value(v)
+            for k, v in self.model_dump(exclude_none=True).items()
+        }
+
+
+class IngressScalingConfig(BaseModel):
+    # scale the controller with an HPA, and add a PDB and topology spread.
+    # Otherwise, the upstream Deployment is unchanged, with a single replica
+    enabled: bool = False
+    min_replicas: PositiveInt = 2
+    max_replicas: PositiveInt = 4
+    # average CPU use of the controller pods, as a percentage of their request
+    target_cpu_utilization: PositiveInt = 80
+    # average connections per controller pod, which must be served by the
+    # custom metrics API, e.g. by prometheus-adapter
+    target_connections: Optional[PositiveInt] = None
+
+    @model_validator(mode="after")
+    def _replica_range(self) -> "IngressScalingConfig":
+        if self.min_replicas > self.max_replicas:
+            raise ValueError(
+                f"min_replicas {self.min_replicas} is more than "
+                f"max_replicas {self.max_replicas}"
+            )
+
+        return self
+
+
+# options which only apply to one type of OCI load balancer
+_LOAD_BALANCER_OPTIONS = {
+    "lb": ["min_bandwidth_mbps", "max_bandwidth_mbps", "idle_timeout_seconds"],
+    "nlb": ["preserve_source"],
+}
+
+
+class IngressLoadBalancerConfig(BaseModel):
+    """
+    The OCI load balancer of the ingress Service: a network load balancer
+    ("nlb"), or a flexible load balancer ("lb"). Unset options keep OCI's
+    defaults.
+    """
+
+    type: Literal["nlb", "lb"] = "nlb"
+    # the bandwidth of a flexible load balancer; 10 Mbps is always free
+    min_bandwidth_mbps: Annotated[int, Field(ge=10, le=8000)] = 10
+    max_bandwidth_mbps: Annotated[int, Field(ge=10, le=8000)] = 10
+    # send the client's address to the controller with PROXY protocol v2
+    proxy_protocol: bool = False
+    # forward packets with the client's source address, rather than the
+    # network load balancer's
+    preserve_source: Optional[bool] = None
+    health_check_interval_ms: Optional[Annotated[int, Field(ge=1000, le=1800000)]] = (
+        None
+    )
+    health_check_timeout_ms: Optional[Annotated[int, Field(ge=1, le=600000)]] = None
+    health_check_retries: Optional[Annotated[int, Field(ge=1, le=10)]] = None
+    idle_timeout_seconds: Optional[Annotated[int, Field(ge=1, le=7200)]] = None
+
+    @model_validator(mode="after")
+    def _options_apply(self) -> "IngressLoadBalancerConfig":
+        for type_, options in _LOAD_BALANCER_OPTIONS.items():
+            if type_ == self.type:
+                continue
+
+            if invalid := [x for x in options if x in self.model_fields_set]:
+                raise ValueError(
+                    f"{', '.join(invalid)} only apply to load balancers of type {type_}"
+                )
+
+        if self.min_bandwidth_mbps > self.max_bandwidth_mbps:
+            raise ValueError(
+                f"min_bandwidth_mbps {self.min_bandwidth_mbps} is more than "
+                f"max_bandwidth_mbps {self.max_bandwidth_mbps}"
+            )
+
+        if (
+            self.health_check_timeout_ms is not None
+            and self.health_check_interval_ms is not None
+            and self.health_check_timeout_ms >= self.health_check_interval_ms
+        ):
+            raise ValueError("health_check_timeout_ms must be less than the interval")
+
+        return self
+
+
 class IngressConfig(BaseModel):
     oci_public_load_balancer_nsg_ocid: str
+    # log each request as JSON, with its latency, which Grafana Alloy parses
+    json_access_logs: bool = False
+    load_balancer: IngressLoadBalancerConfig = IngressLoadBalancerConfig()
+    performance: IngressPerformanceConfig = IngressPerformanceConfig()
+    scaling: IngressScalingConfig = IngressScalingConfig()
+
+
+class ResourceQuantities(BaseModel):
+    cpu: str
+    memory: str
+
+    @field_validator("cpu", "memory")
+    @classmethod
+    def _is_quantity(cls, value: str) -> str:
+        if parse_quantity(value) <= 0:
+            raise ValueError(f"quantity must be positive: {value!r}")
+
+        return value
+
+
+class ResourceProfile(BaseModel):
+    """
+    The requests and limits of each container of a workload.
+    """
+
+    requests: ResourceQuantities
+    limits: ResourceQuantities
+
+    @model_validator(mode="after")
+    def _requests_within_limits(self) -> "ResourceProfile":
+        for x in ["cpu", "memory"]:
+            request = getattr(self.requests, x)
+            limit = getattr(self.limits, x)
+            if parse_quantity(request) > parse_quantity(limit):
+                raise ValueError(
+                    f"{x} request {request} is more than its limit {limit}"
+                )
+
+        return self
+
+
+def _profile(
+    cpu_request: str, memory_request: str, cpu_limit: str, memory_limit: str
+) -> ResourceProfile:
+    return ResourceProfile(
+        requests=ResourceQuantities(cpu=cpu_request, memory=memory_request),
+        limits=ResourceQuantities(cpu=cpu_limit, memory=memory_limit),
+    )
+
+
+# sized for the two 2 OCPU, 12 GB nodes of the worker pool
+DEFAULT_RESOURCE_PROFILES = {
+    "small": _profile("10m", "32Mi", "100m", "128Mi"),
+    "medium": _profile("50m", "128Mi", "500m", "512Mi"),
+    "large": _profile("100m", "256Mi", "1", "1Gi"),
+}
+
+
+class ResourcesConfig(BaseModel):
+    # added to, or replacing, the default profiles
+    profiles: dict[str, ResourceProfile] = {}
+    # the profile of workloads, by "<namespace>/<name>", in place of the
+    # chart's default
+    workloads: dict[str, str] = {}
+
+    @model_validator(mode="after")
+    def _profiles_exist(self) -> "ResourcesConfig":
+        profiles = {**DEFAULT_RESOURCE_PROFILES, **self.profiles}
+        for workload, name in self.workloads.items():
+            if name not in profiles:
+                raise ValueError(f"workload {workload} has unknown profile {name}")
+
+        return self
+
+    def profile(self, workload: str, default: str) -> ResourceProfile:
+        """
+        Returns the profile of a workload, by "<namespace>/<name>", or the
+        profile named `default` if none is configured.
+        """
+        name = self.workloads.get(workload, default)
+        return {**DEFAULT_RESOURCE_PROFILES, **self.profiles}[name]
 
 
 class Config(BaseModel):
@@ -71,6 +310,7 @@ class Config(BaseModel):
     cloudflare_dns: CloudflareDnsConfig
     grafana: GrafanaConfig
     ingress: IngressConfig
+    resources: ResourcesConfig = ResourcesConfig()
 
 
 def parse_config(raw_config: IO) -> Config:
@@ -0,0 +1,396 @@
+"""
+A daemon which keeps the JSII runtime, and the modules which load assemblies
+into it, warm between runs of labcli.
+
+Clients send the arguments of a served command over a Unix socket. The daemon
+runs the command in the client's directory and environment, streaming its
+output to the client as it is written, then its exit code. Commands run one at
+a time. When the daemon is not running, is running another command, or cannot
+serve a request exactly, clients run the command themselves.
+"""
+
+import base64
+import contextlib
+import importlib
+import io
+import json
+import os
+import shutil
+import socket
+import sys
+import threading
+import traceback
+from collections.abc import Generator, Iterable
+from pathlib import Path
+from typing import Any, BinaryIO, Optional
+
+from lab.libs.cache import get_cache_dir
+from lab.libs.cli import make_envvar
+from lab.libs.exceptions import LabError
+from lab.libs.profile import disable_profiling
+
+# commands which are served, by their leading arguments
+SERVED_COMMANDS = [["k8s", "synth"], ["infra", "synth"]]
+
+# imported when the daemon starts, loading the JSII assemblies
+PRELOAD_MODULES = ["lab.__main__", "lab.cluster", "lab.stacks"]
+
+# read by the JSII runtime, whose environment is fixed when it starts. Requests
+# are only served if the client's values match the daemon's
+RUNTIME_ENVVARS = [
+    "CDK8S_DISABLE_SORT",
+    "CDKTF_CONTINUE_SYNTH_ON_ERROR_ANNOTATIONS",
+    "SYNTH_HCL_OUTPUT",
+    "TERRAFORM_BINARY_NAME",
+]
+
+# read by the JSII runtime, but passed to it explicitly by commands, so they
+# are removed from the daemon's environment before the runtime starts
+EXPLICIT_ENVVARS = ["CDKTF_CONTEXT_JSON", "CDKTF_OUTDIR"]
+
+# how long the daemon waits for a client to send its request, or to read output
+CLIENT_TIMEOUT_SECONDS = 30
+
+# how often the daemon checks whether it must restart, while waiting for clients
+_ACCEPT_INTERVAL_SECONDS = 0.1
+
+
+def get_socket_path() -> Path:
+    """
+    Returns the socket the daemon listens on: `LAB_SOCKET` if set, otherwise
+    in lab's cache directory.
+    """
+    if path := os.environ.get(make_envvar("SOCKET")):
+        return Path(path)
+
+    return get_cache_dir() / "serve.sock"
+
+
+def _send(sock: socket.socket, message: dict[str, Any]) -> None:
+    sock.sendall(json.dumps(message).encode() + b"\n")
+
+
+def _receive(sock: socket.socket) -> dict[str, Any]:
+    with sock.makefile("rb") as f:
+        line = f.readline()
+
+    if not line:
+        raise ConnectionError("connection closed")
+
+    return json.loads(line)
+
+
+def _receive_all(sock: socket.socket) -> Iterable[dict[str, Any]]:
+    with sock.makefile("rb") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def _runtime_env(env: dict[str, str]) -> dict[str, Optional[str]]:
+    return {x: env.get(x) for x in RUNTIME_ENVVARS}
+
+
+##
+## Client
+##
+
+
+def request_command(
+    socket_path: Path,
+    args: list[str],
+    *,
+    stdout: Optional[BinaryIO] = None,
+    stderr: Optional[BinaryIO] = None,
+) -> Optional[dict[str, Any]]:
+    """
+    Asks the daemon to run a command, writing its output to `stdout` and
+    `stderr`, or this process', as it is received. Returns the daemon's final
+    response, with the command's exit code, or None if the daemon is not
+    running or did not answer.
+
+    Raises LabError if the connection is lost after output was written.
+    """
+    streams = {
+        "stdout": stdout or sys.stdout.buffer,
+        "stderr": stderr or sys.stderr.buffer,
+    }
+    size = shutil.get_terminal_size()
+    written = False
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(str(socket_path))
+            _send(
+                sock,
+                {
+                    "args": args,
+                    "cwd": os.getcwd(),
+                    "env": dict(os.environ),
+                    "terminal": sys.stdout.isatty(),
+                    "columns": size.columns,
+                },
+            )
+
+            for message in _receive_all(sock):
+                if "status" in message:
+                    return message
+
+                stream = streams[message["stream"]]
+                stream.write(base64.b64decode(message["data"]))
+                stream.flush()
+                written = True
+    except (OSError, ValueError) as e:
+        if written:
+            raise LabError(f"lost connection to the daemon: {e}") from e
+        return None
+
+    if written:
+        raise LabError("lost connection to the daemon")
+    return None
+
+
+def _is_serving(socket_path: Path) -> bool:
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(str(socket_path))
+            return True
+    except OSError:
+        return False
+
+
+def _reads_stdin(args: list[str]) -> bool:
+    return "--config-file=-" in args or any(
+        x == "--config-file" and y == "-" for x, y in zip(args, args[1:])
+    )
+
+
+def forward_command(args: list[str]) -> Optional[int]:
+    """
+    Runs a served command in the daemon, writing its output to this process'.
+    Returns its exit code, or None if the command must be run in this process.
+
+    Set `LAB_NO_SERVE` to never use the daemon.
+    """
+    if (
+        os.environ.get(make_envvar("NO_SERVE"))
+        or not any(args[: len(x)] == x for x in SERVED_COMMANDS)
+        # help is fast anyway, stdin is not forwarded, and watching never ends
+        or "--help" in args
+        or "--watch" in args
+        or _reads_stdin(args)
+    ):
+        return None
+
+    try:
+        response = request_command(get_socket_path(), args)
+    except LabError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    if not response or response["status"] != "ok":
+        return None
+
+    return response["exit_code"]
+
+
+##
+## Daemon
+##
+
+
+def _source_stamp() -> list[tuple[str, int, int]]:
+    # modules are not reloaded, so the daemon must restart when they change
+    stamp = []
+    for path in sorted(Path(__file__).parents[1].rglob("*.py")):
+        stat = path.stat()
+        stamp.append((str(path), stat.st_mtime_ns, stat.st_size))
+
+    return stamp
+
+
+@contextlib.contextmanager
+def _client_context(request: dict[str, Any]) -> Generator[None, None, None]:
+    import rich
+
+    cwd = os.getcwd()
+    env = dict(os.environ)
+
+    os.chdir(request["cwd"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+    # the console detects colors from the environment when it is created
+    rich.reconfigure(force_terminal=request["terminal"], width=request["columns"])
+
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+        os.environ.clear()
+        os.environ.update(env)
+        rich.reconfigure()
+        disable_profiling()
+
+
+class _OutputStream(io.RawIOBase):
+    """
+    Sends what is written to it to a client, as messages of the given stream.
+    Once the client has gone, or stopped reading, output is discarded, so that
+    the command still completes.
+    """
+
+    def __init__(self, conn: socket.socket, name: str):
+        self._conn = conn
+        self._name = name
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:  # type: ignore[override]
+        if self._conn.fileno() != -1:
+            try:
+                _send(
+                    self._conn,
+                    {"stream": self._name, "data": base64.b64encode(data).decode()},
+                )
+            except OSError:
+                self._conn.close()
+
+        return len(data)
+
+
+def _run_command(conn: socket.socket, request: dict[str, Any]) -> dict[str, Any]:
+    from lab.__main__ import app
+
+    # buffered as a pipe would be, so output is sent in chunks as it is written
+    out = io.TextIOWrapper(
+        io.BufferedWriter(_OutputStream(conn, "stdout")), write_through=True
+    )
+    err = io.TextIOWrapper(
+        io.BufferedWriter(_OutputStream(conn, "stderr")), write_through=True
+    )
+
+    with (
+        _client_context(request),
+        contextlib.redirect_stdout(out),
+        contextlib.redirect_stderr(err),
+    ):
+        try:
+            app(request["args"], prog_name="labcli")
+            exit_code = 0
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else int(e.code is not None)
+        except Exception:
+            traceback.print_exc()
+            exit_code = 1
+
+        out.flush()
+        err.flush()
+
+    return {"status": "ok", "exit_code": exit_code}
+
+
+def _fallback(reason: str) -> dict[str, Any]:
+    return {"status": "fallback", "reason": reason}
+
+
+def _reply(conn: socket.socket, response: dict[str, Any]) -> None:
+    # the client may have gone
+    with contextlib.suppress(OSError):
+        _send(conn, response)
+
+
+def serve(
+    socket_path: Path,
+    *,
+    max_requests: int,
+    preload: Iterable[str] = PRELOAD_MODULES,
+) -> None:
+    """
+    Serves commands until the daemon must restart, or until interrupted.
+
+    Each client is handled in its own thread, so that one which is slow to send
+    its request blocks no other. Clients which connect while a command runs
+    are told to run their command themselves.
+
+    The daemon restarts when lab's sources change, as modules are not reloaded,
+    and after `max_requests` commands, as the JSII runtime never frees objects.
+    """
+    if _is_serving(socket_path):
+        raise LabError(f"already serving on {socket_path}")
+
+    for x in EXPLICIT_ENVVARS:
+        os.environ.pop(x, None)
+
+    for x in preload:
+        importlib.import_module(x)
+
+    stamp = _source_stamp()
+    runtime_env = _runtime_env(dict(os.environ))
+
+    # commands change the directory, environment and output of the process, so
+    # only one runs at a time
+    running = threading.Lock()
+    restart = threading.Event()
+    served = 0
+
+    def handle(conn: socket.socket) -> None:
+        nonlocal served
+
+        with conn:
+            conn.settimeout(CLIENT_TIMEOUT_SECONDS)
+
+            try:
+                request = _receive(conn)
+            except (OSError, ValueError):
+                # e.g. clients checking whether the daemon is running
+                return
+
+            if not running.acquire(blocking=False):
+                _reply(conn, _fallback("another command is running"))
+                return
+
+            # the response is sent before releasing the lock, so that it is not
+            # lost when the daemon restarts
+            try:
+                if restart.is_set():
+                    _reply(conn, _fallback("restarting"))
+                elif _source_stamp() != stamp:
+                    _reply(conn, _fallback("lab's sources changed"))
+                    restart.set()
+                elif _runtime_env(request["env"]) != runtime_env:
+                    _reply(conn, _fallback("JSII runtime environment differs"))
+                else:
+                    _reply(conn, _run_command(conn, request))
+                    served += 1
+                    if served >= max_requests:
+                        restart.set()
+            finally:
+                running.release()
+
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    # bound elsewhere, so clients which find the socket can connect
+    bind_path = socket_path.with_name(f".{socket_path.name}.{os.getpid()}")
+    bind_path.unlink(missing_ok=True)
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+            server.bind(str(bind_path))
+            os.chmod(bind_path, 0o600)
+            server.listen()
+            os.replace(bind_path, socket_path)
+            server.settimeout(_ACCEPT_INTERVAL_SECONDS)
+
+            while not restart.is_set():
+                try:
+                    conn, _ = server.accept()
+                except TimeoutError:
+                    continue
+
+                threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+        # finish the command which asked to restart
+        with running:
+            pass
+    finally:
+        bind_path.unlink(missing_ok=True)
+        socket_path.unlink(missing_ok=True)
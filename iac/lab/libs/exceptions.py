@@ -4,3 +4,7 @@ class LabError(Exception):
 
 class ConfigError(LabError):
     pass
+
+
+class CacheError(LabError):
+    pass
@@ -0,0 +1,145 @@
+import contextlib
+import hashlib
+import json
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel, SecretStr
+
+from lab.libs.cache import get_cache_dir, stable_hash, write_atomic
+
+
+def hash_sources(paths: Iterable[Path]) -> str:
+    """
+    Returns a hash of the contents of the given files, independent of order.
+    """
+    digest = hashlib.sha256()
+
+    for path in sorted(set(paths)):
+        digest.update(str(path).encode())
+        digest.update(hashlib.sha256(path.read_bytes()).digest())
+
+    return digest.hexdigest()
+
+
+def hash_files(files: dict[str, bytes]) -> dict[str, str]:
+    """
+    Returns the hash of each synthesized file, by name.
+    """
+    return {k: hashlib.sha256(v).hexdigest() for k, v in files.items()}
+
+
+def version_constants(cls: type, names: Iterable[str]) -> dict[str, str]:
+    """
+    Returns the version constants defined by a class, e.g. `VERSION`.
+    """
+    return {x: getattr(cls, x) for x in names if hasattr(cls, x)}
+
+
+def reveal_secrets(data: Any) -> Any:
+    """
+    Converts config models to plain data, revealing secrets, so that changes to
+    secrets change fingerprints. Only hash the result, never store it.
+    """
+    if isinstance(data, BaseModel):
+        return {k: reveal_secrets(getattr(data, k)) for k in type(data).model_fields}
+    if isinstance(data, SecretStr):
+        return data.get_secret_value()
+    if isinstance(data, dict):
+        return {k: reveal_secrets(v) for k, v in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [reveal_secrets(x) for x in data]
+
+    return data
+
+
+class FingerprintStore:
+    """
+    Records the fingerprint of each unit of synthesized output, e.g. a group of
+    charts, along with hashes of the files it produced.
+
+    A unit is current if its fingerprint is unchanged and its files are still
+    present and unmodified, in which case the files can be reused.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+
+        try:
+            self._entries: dict[str, dict] = json.loads(path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._entries = {}
+
+        # files which units no longer produce
+        self._stale: set[str] = set()
+
+    def is_current(self, unit: str, fingerprint: str, outdir: Path) -> bool:
+        if not (entry := self._entries.get(unit)):
+            return False
+
+        if entry["fingerprint"] != fingerprint:
+            return False
+
+        for name, file_hash in entry["files"].items():
+            try:
+                data = (outdir / name).read_bytes()
+            except FileNotFoundError:
+                return False
+
+            if hashlib.sha256(data).hexdigest() != file_hash:
+                return False
+
+        return True
+
+    def record(self, unit: str, fingerprint: str, files: dict[str, bytes]) -> None:
+        self.record_hashes(unit, fingerprint, hash_files(files))
+
+    def record_hashes(
+        self, unit: str, fingerprint: str, file_hashes: dict[str, str]
+    ) -> None:
+        """
+        Records a unit from the hashes of its files, see `hash_files`, so that
+        the files need not be kept once written.
+        """
+        if entry := self._entries.get(unit):
+            self._stale.update(set(entry["files"]) - set(file_hashes))
+
+        self._entries[unit] = {"fingerprint": fingerprint, "files": file_hashes}
+
+    def prune(self, units: Iterable[str], outdir: Path) -> list[str]:
+        """
+        Forgets units which are not in `units`, e.g. removed groups, and deletes
+        from `outdir` the files which no remaining unit produces. Returns the
+        names of the deleted files.
+        """
+        units = set(units)
+        for unit in set(self._entries) - units:
+            self._stale.update(self._entries.pop(unit)["files"])
+
+        produced = {x for entry in self._entries.values() for x in entry["files"]}
+
+        deleted = []
+        for name in sorted(self._stale - produced):
+            with contextlib.suppress(FileNotFoundError):
+                (outdir / name).unlink()
+                deleted.append(name)
+
+        self._stale = set()
+        return deleted
+
+    def save(self) -> None:
+        write_atomic(
+            self.path,
+            (json.dumps(self._entries, indent=2, sort_keys=True) + "\n").encode(),
+        )
+
+
+def get_fingerprint_store(outdir: Path) -> FingerprintStore:
+    """
+    Returns the fingerprints of the output in `outdir`.
+    """
+    # kept outside of the output directory, so it is not applied as a manifest
+    # or read as a stack
+    outdir_id = stable_hash(str(outdir.resolve()))
+    return FingerprintStore(get_cache_dir() / "synth" / f"{outdir_id}.json")
@@ -1,19 +1,266 @@
-from typing import Any
+import copy
+from collections.abc import Mapping
+from types import TracebackType
+from typing import Any, Optional, Union
 from cdk8s import ApiObject
 
 from lab.libs.exceptions import LabError
+from lab.libs.profile import profile
 from cdk8s import JsonPatch
 
 
 def patch_obj(resource: ApiObject, path: str, data: Any) -> None:
-    resource.add_json_patch(JsonPatch.add(path, data))
+    """
+    Adds `data` at `path`, in a single, unchecked operation. To apply several
+    operations to an object, use `PatchSession`.
+    """
+    with profile("json patch"):
+        resource.add_json_patch(JsonPatch.add(path, data))
 
 
-def set_deployment_container_env(
-    deployment: ApiObject, *, container_name: str, env_name: str, env_value: str
+def _parse_pointer(path: str) -> list[str]:
+    if path == "":
+        return []
+
+    if not path.startswith("/"):
+        raise ValueError("JSON pointer must start with '/'")
+
+    return [x.replace("~1", "/").replace("~0", "~") for x in path[1:].split("/")]
+
+
+def pointer_token(key: str) -> str:
+    """
+    Escapes an object member for use in a JSON pointer.
+    """
+    return key.replace("~", "~0").replace("/", "~1")
+
+
+def _named_list(value: Any) -> bool:
+    return isinstance(value, list) and all(
+        isinstance(x, Mapping) and "name" in x for x in value
+    )
+
+
+def _without_nulls(value: Any) -> Any:
+    """
+    Copy of `value` without null object members, at any depth, as a merge
+    patch adds them to members that do not exist yet.
+    """
+    if isinstance(value, Mapping):
+        return {k: _without_nulls(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [_without_nulls(x) for x in value]
+
+    return value
+
+
+def _list_index(container: list, token: str, *, allow_end: bool) -> int:
+    if token == "-" and allow_end:
+        return len(container)
+
+    if not token.isdigit() or (len(token) > 1 and token.startswith("0")):
+        raise ValueError(f"'{token}' is not an array index")
+
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise ValueError(f"index {index} is out of range")
+
+    return index
+
+
+class PatchSession:
+    """
+    Collects JSON patch operations on an ApiObject, and applies them in a
+    single call to the JSII runtime.
+
+    Operations are checked as they are collected, against a snapshot of the
+    object taken once, with `to_json()`, on first use. The snapshot is updated
+    by each operation, so later operations see the effects of earlier ones.
+
+    Use as a context manager, which applies the operations on exit:
+
+        with PatchSession(secret) as patch:
+            patch.add("/stringData/client_id", client_id)
+            patch.add("/stringData/client_secret", client_secret)
+    """
+
+    def __init__(self, resource: ApiObject):
+        self.resource = resource
+        self._snapshot: Optional[dict] = None
+        self._ops: list[JsonPatch] = []
+
+    @property
+    def snapshot(self) -> dict:
+        """
+        The object, as it will be after the operations are applied.
+        """
+        if self._snapshot is None:
+            self._snapshot = self.resource.to_json()
+
+        return self._snapshot
+
+    def add(self, path: str, value: Any) -> None:
+        """
+        Adds `value` at `path`, replacing any existing object member. The parent
+        of `path` must exist.
+        """
+        parent, token = self._resolve_parent("add", path)
+
+        if isinstance(parent, list):
+            try:
+                index = _list_index(parent, token, allow_end=True)
+            except ValueError as e:
+                raise self._error("add", path, str(e)) from e
+
+            parent.insert(index, copy.deepcopy(value))
+        else:
+            parent[token] = copy.deepcopy(value)
+
+        self._ops.append(JsonPatch.add(path, value))
+
+    def replace(self, path: str, value: Any) -> None:
+        """
+        Replaces the existing value at `path`.
+        """
+        parent, token = self._resolve_parent("replace", path)
+        key = self._existing_key("replace", path, parent, token)
+
+        parent[key] = copy.deepcopy(value)
+        self._ops.append(JsonPatch.replace(path, value))
+
+    def remove(self, path: str) -> None:
+        """
+        Removes the existing value at `path`.
+        """
+        parent, token = self._resolve_parent("remove", path)
+        key = self._existing_key("remove", path, parent, token)
+
+        del parent[key]
+        self._ops.append(JsonPatch.remove(path))
+
+    def merge(self, patch: Mapping[str, Any]) -> None:
+        """
+        Merges `patch` into the object, in the style of a strategic merge patch:
+        objects are merged recursively, and null removes a member, or is dropped
+        from a value that is added. Lists of objects with names, such as
+        containers or env, are merged by name, and other lists are replaced.
+        """
+        self._merge("", self.snapshot, patch)
+
+    def _merge(self, path: str, target: dict, patch: Mapping[str, Any]) -> None:
+        for key, value in patch.items():
+            at = f"{path}/{pointer_token(key)}"
+            existing = target.get(key)
+
+            if value is None:
+                if key in target:
+                    self.remove(at)
+            elif isinstance(value, Mapping) and isinstance(existing, dict):
+                self._merge(at, existing, value)
+            elif value and _named_list(value) and existing and _named_list(existing):
+                index = {x["name"]: i for i, x in enumerate(existing)}
+                for item in value:
+                    if item["name"] in index:
+                        i = index[item["name"]]
+                        self._merge(f"{at}/{i}", existing[i], item)
+                    else:
+                        self.add(f"{at}/-", _without_nulls(item))
+            else:
+                self.add(at, _without_nulls(value))
+
+    def apply(self) -> None:
+        """
+        Applies the collected operations to the object.
+        """
+        if self._ops:
+            with profile("json patch"):
+                self.resource.add_json_patch(*self._ops)
+
+        self._ops = []
+
+    def __enter__(self) -> "PatchSession":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        # leave the object unchanged if building the patch failed
+        if exc_type is None:
+            self.apply()
+
+    def _error(self, op: str, path: str, reason: str) -> LabError:
+        return LabError(
+            f"cannot {op} '{path}' in "
+            f"{self.resource.kind.lower()}/{self.resource.name}: {reason}"
+        )
+
+    def _resolve_parent(self, op: str, path: str) -> tuple[Any, str]:
+        try:
+            tokens = _parse_pointer(path)
+        except ValueError as e:
+            raise self._error(op, path, str(e)) from e
+
+        if not tokens:
+            raise self._error(op, path, "cannot patch the whole object")
+
+        parent: Any = self.snapshot
+        for i, token in enumerate(tokens[:-1]):
+            at = "/" + "/".join(tokens[: i + 1])
+
+            try:
+                if isinstance(parent, list):
+                    parent = parent[_list_index(parent, token, allow_end=False)]
+                elif isinstance(parent, dict):
+                    parent = parent[token]
+                else:
+                    raise ValueError(f"'{at}' is not an object or array")
+            except KeyError:
+                raise self._error(op, path, f"'{at}' does not exist") from None
+            except ValueError as e:
+                raise self._error(op, path, str(e)) from e
+
+        if not isinstance(parent, (dict, list)):
+            raise self._error(op, path, "parent is not an object or array")
+
+        return parent, tokens[-1]
+
+    def _existing_key(self, op: str, path: str, parent: Any, token: str) -> Any:
+        if isinstance(parent, list):
+            try:
+                return _list_index(parent, token, allow_end=False)
+            except ValueError as e:
+                raise self._error(op, path, str(e)) from e
+
+        if token not in parent:
+            raise self._error(op, path, "path does not exist")
+
+        return token
+
+
+# a literal value, or the source of a `valueFrom`, e.g. {"secretKeyRef": {...}}
+EnvValue = Union[str, Mapping[str, Any]]
+
+
+def _env_var(name: str, value: EnvValue) -> dict[str, Any]:
+    if isinstance(value, str):
+        return {"name": name, "value": value}
+
+    return {"name": name, "valueFrom": copy.deepcopy(dict(value))}
+
+
+def set_deployment_container_envs(
+    deployment: ApiObject, envs: Mapping[str, Mapping[str, EnvValue]]
 ) -> None:
     """
-    Sets an environment variable on a container in a Deployment spec.
+    Sets environment variables on containers, or init containers, in a
+    Deployment spec, given as {container name: {variable name: value}}.
+
+    Existing variables are updated in place, preserving order, and new
+    variables are appended. The Deployment is serialized once, and patched in
+    a single call.
     """
 
     _deployment_name = deployment.metadata.name
@@ -24,38 +271,50 @@ def set_deployment_container_env(
             f"resource '{_deployment_name}' is a {deployment.kind}, expected Deployment"
         )
 
-    # get the index of the the container with the given name
-    try:
-        containers = deployment.to_json()["spec"]["template"]["spec"]["containers"]
-        container_index = next(
-            i
-            for i, container in enumerate(containers)
-            if container["name"] == container_name
-        )
-    except StopIteration:
-        raise LabError(
-            f"container '{container_name}' not found in deployment/{_deployment_name}"
-        )
-    except KeyError:
-        raise LabError(
-            f"error parsing containers, is '{_deployment_name}' a valid deployment?"
-        )
+    with PatchSession(deployment) as patch:
+        # get the path of each container, by name
+        try:
+            pod_spec = patch.snapshot["spec"]["template"]["spec"]
+            containers = {
+                container["name"]: (f"/spec/template/spec/{field}/{i}", container)
+                for field, field_containers in [
+                    ("initContainers", pod_spec.get("initContainers", [])),
+                    ("containers", pod_spec["containers"]),
+                ]
+                for i, container in enumerate(field_containers)
+            }
+        except KeyError:
+            raise LabError(
+                f"error parsing containers, is '{_deployment_name}' a valid deployment?"
+            )
 
-    # update the environment
-    current_env = containers[container_index].get("env", [])
-
-    if env_name in [x["name"] for x in current_env]:
-        # if the env contains the variable, update in place, preserving order
-        new_env = [
-            e if e["name"] != env_name else {"name": env_name, "value": env_value}
-            for e in current_env
-        ]
-    else:
-        # if the env does not contain the variable, append it
-        new_env = current_env + [{"name": env_name, "value": env_value}]
-
-    patch_obj(
-        deployment,
-        f"/spec/template/spec/containers/{container_index}/env",
-        new_env,
-    )
+        for container_name, env in envs.items():
+            if container_name not in containers:
+                raise LabError(
+                    f"container '{container_name}' not found in deployment/{_deployment_name}"
+                )
+
+            path, container = containers[container_name]
+            new_env = list(container.get("env", []))
+            index = {x["name"]: i for i, x in enumerate(new_env)}
+
+            for env_name, env_value in env.items():
+                if env_name in index:
+                    # if the env contains the variable, update in place, preserving order
+                    new_env[index[env_name]] = _env_var(env_name, env_value)
+                else:
+                    # if the env does not contain the variable, append it
+                    index[env_name] = len(new_env)
+                    new_env.append(_env_var(env_name, env_value))
+
+            patch.add(f"{path}/env", new_env)
+
+
+def set_deployment_container_env(
+    deployment: ApiObject, *, container_name: str, env_name: str, env_value: str
+) -> None:
+    """
+    Sets an environment variable on a container in a Deployment spec. To set
+    several variables, use `set_deployment_container_envs`.
+    """
+    set_deployment_container_envs(deployment, {container_name: {env_name: env_value}})
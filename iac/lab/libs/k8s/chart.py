@@ -0,0 +1,78 @@
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Any, Optional
+
+import cdk8s
+from constructs import Construct
+
+from lab.libs.exceptions import LabError
+
+if TYPE_CHECKING:
+    from lab.libs.k8s.include import LazyInclude
+
+# the objects of a LazyInclude are rendered in place of an object of this kind
+PLACEHOLDER_API_VERSION = "lab.internal/v1"
+PLACEHOLDER_KIND = "IncludedObjects"
+
+
+class Chart(cdk8s.Chart):
+    """
+    A `cdk8s.Chart` which renders the objects of its `LazyInclude`s, in place
+    of their placeholders, when it is synthesized.
+
+    Objects are rendered by `to_json`, which `cdk8s.App` uses to synthesize
+    charts, except with `YamlOutputType.FOLDER_PER_CHART_FILE_PER_RESOURCE`.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        id: str,
+        *,
+        namespace: Optional[str] = None,
+        labels: Optional[Mapping[str, str]] = None,
+        disable_resource_name_hashes: Optional[bool] = None,
+    ):
+        super().__init__(
+            scope,
+            id,
+            namespace=namespace,
+            labels=labels,
+            disable_resource_name_hashes=disable_resource_name_hashes,
+        )
+
+        self._lazy_includes: dict[str, "LazyInclude"] = {}
+
+    def add_lazy_include(self, placeholder: str, include: "LazyInclude") -> None:
+        """
+        Registers a `LazyInclude`, whose placeholder has the given name.
+        """
+        self._lazy_includes[placeholder] = include
+
+    def to_json(self) -> list[Any]:
+        objects = super().to_json()
+
+        if not self._lazy_includes:
+            return objects
+
+        result = []
+        i = 0
+        while i < len(objects):
+            obj = objects[i]
+            i += 1
+
+            if not (
+                obj.get("apiVersion") == PLACEHOLDER_API_VERSION
+                and obj.get("kind") == PLACEHOLDER_KIND
+            ):
+                result.append(obj)
+                continue
+
+            name = obj["metadata"]["name"]
+            if not (include := self._lazy_includes.get(name)):
+                raise LabError(f"no LazyInclude for placeholder '{name}'")
+
+            # objects created by lookups follow the placeholder
+            result.extend(include.render(objects[i : i + include.object_count]))
+            i += include.object_count
+
+        return result
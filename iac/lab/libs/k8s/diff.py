@@ -0,0 +1,248 @@
+"""
+Compares synthesized manifests object by object, e.g. against the previous
+synth.
+
+Objects are indexed by apiVersion, kind, namespace and name, and compared by a
+hash of their synthesized text. Only objects whose hash changed are loaded and
+diffed structurally.
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Any, NamedTuple, Optional
+
+from lab.libs.exceptions import LabError
+from lab.libs.k8s.documents import load_synthesized
+
+REDACTED = "<redacted>"
+
+# the fields of a Secret whose values are never shown
+_SECRET_FIELDS = {"data", "stringData"}
+
+# cdk8s separates the documents in a file with a line of "---"
+_DOCUMENT_SEPARATOR = re.compile(r"^---\n", re.M)
+
+# the first top-level key after the ones `ApiObject.toJson` writes first
+_BODY = re.compile(r"^(?!apiVersion:|kind:|metadata:)\S", re.M)
+
+
+class ObjectKey(NamedTuple):
+    api_version: str
+    kind: str
+    # empty for cluster scoped objects
+    namespace: str
+    name: str
+
+    def __str__(self) -> str:
+        name = f"{self.namespace}/{self.name}" if self.namespace else self.name
+        return f"{self.api_version} {self.kind} {name}"
+
+
+class Change(NamedTuple):
+    # as in JSON patch: "add", "remove" or "replace"
+    op: str
+    path: str
+    old: Any = None
+    new: Any = None
+
+
+def _load(file: str, text: str) -> dict:
+    try:
+        documents = load_synthesized(text)
+    except ValueError as e:
+        raise LabError(f"cannot load object in {file}: {e}") from e
+
+    if len(documents) != 1 or not isinstance(documents[0], dict):
+        raise LabError(f"cannot load object in {file}: not a single mapping")
+
+    return documents[0]
+
+
+def _object_key(document: dict) -> Optional[ObjectKey]:
+    metadata = document.get("metadata")
+    if not isinstance(metadata, dict):
+        return None
+
+    fields = [
+        document.get("apiVersion"),
+        document.get("kind"),
+        metadata.get("namespace") or "",
+        metadata.get("name"),
+    ]
+    if not all(isinstance(x, str) for x in fields):
+        return None
+
+    return ObjectKey(*fields)
+
+
+class SynthesizedObject:
+    """
+    An object in a synthesized file, which is only loaded in full if needed.
+    """
+
+    def __init__(self, file: str, text: str):
+        self.file = file
+        self.text = text
+        self.digest = hashlib.sha256(text.encode()).digest()
+        self._obj: Optional[dict] = None
+
+        # index by the header alone, falling back to the whole object
+        match = _BODY.search(text)
+        try:
+            key = _object_key(_load(file, text[: match.start()] if match else text))
+        except LabError:
+            key = None
+
+        if key is None:
+            key = _object_key(self.obj)
+        if key is None:
+            raise LabError(f"object without apiVersion, kind or name in {file}")
+
+        self.key = key
+
+    @property
+    def obj(self) -> dict:
+        if self._obj is None:
+            self._obj = _load(self.file, self.text)
+
+        return self._obj
+
+
+def index_objects(files: dict[str, bytes]) -> dict[ObjectKey, SynthesizedObject]:
+    """
+    Indexes the objects in synthesized files, in order of file name.
+    """
+    index: dict[ObjectKey, SynthesizedObject] = {}
+
+    for file, data in sorted(files.items()):
+        for text in _DOCUMENT_SEPARATOR.split(data.decode()):
+            if not text.strip():
+                continue
+
+            obj = SynthesizedObject(file, text)
+            if existing := index.get(obj.key):
+                raise LabError(f"{obj.key} is in both {existing.file} and {file}")
+
+            index[obj.key] = obj
+
+    return index
+
+
+def _pointer(path: str, token: Any) -> str:
+    return f"{path}/{str(token).replace('~', '~0').replace('/', '~1')}"
+
+
+def diff_values(old: Any, new: Any, path: str = "") -> list[Change]:
+    """
+    Returns the changes from `old` to `new`, compared by key and by list index.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = [
+            Change("remove", _pointer(path, k), old=v)
+            for k, v in old.items()
+            if k not in new
+        ]
+        for k, v in new.items():
+            if k in old:
+                changes += diff_values(old[k], v, _pointer(path, k))
+            else:
+                changes.append(Change("add", _pointer(path, k), new=v))
+
+        return changes
+
+    if isinstance(old, list) and isinstance(new, list):
+        changes = []
+        for i, (x, y) in enumerate(zip(old, new)):
+            changes += diff_values(x, y, _pointer(path, i))
+
+        changes += [
+            Change("remove", _pointer(path, i), old=old[i])
+            for i in range(len(new), len(old))
+        ]
+        changes += [
+            Change("add", _pointer(path, i), new=new[i])
+            for i in range(len(old), len(new))
+        ]
+        return changes
+
+    # e.g. 1 and True are equal in Python
+    if type(old) is not type(new) or old != new:
+        return [Change("replace", path, old=old, new=new)]
+
+    return []
+
+
+def _redact(key: ObjectKey, change: Change) -> Change:
+    tokens = change.path.split("/")
+    if key.kind != "Secret" or len(tokens) < 2 or tokens[1] not in _SECRET_FIELDS:
+        return change
+
+    return change._replace(
+        old=None if change.old is None else REDACTED,
+        new=None if change.new is None else REDACTED,
+    )
+
+
+@dataclass
+class ManifestDiff:
+    """
+    Args:
+        added: objects only in the new output
+        removed: objects only in the old output
+        changed: objects in both, with their changes. The values of Secrets
+            are redacted
+        unchanged: the number of objects which are structurally equal
+        new: the objects in the new output
+    """
+
+    added: list[ObjectKey]
+    removed: list[ObjectKey]
+    changed: dict[ObjectKey, list[Change]]
+    unchanged: int
+    new: dict[ObjectKey, SynthesizedObject]
+
+    def changed_files(self) -> dict[str, bytes]:
+        """
+        Returns files holding only the added and changed objects, exactly as
+        they were synthesized.
+        """
+        selected = {*self.added, *self.changed}
+
+        texts: dict[str, list[str]] = {}
+        for key, obj in self.new.items():
+            if key in selected:
+                texts.setdefault(obj.file, []).append(obj.text)
+
+        return {k: "---\n".join(v).encode() for k, v in texts.items()}
+
+
+def diff_manifests(old: dict[str, bytes], new: dict[str, bytes]) -> ManifestDiff:
+    """
+    Compares two sets of synthesized files, by object.
+    """
+    old_index = index_objects(old)
+    new_index = index_objects(new)
+
+    result = ManifestDiff(
+        added=[x for x in new_index if x not in old_index],
+        removed=[x for x in old_index if x not in new_index],
+        changed={},
+        unchanged=0,
+        new=new_index,
+    )
+
+    for key, obj in new_index.items():
+        if not (previous := old_index.get(key)):
+            continue
+
+        # objects whose text differs may still be equal, e.g. if their keys
+        # were written in another order
+        if previous.digest != obj.digest and (
+            changes := diff_values(previous.obj, obj.obj)
+        ):
+            result.changed[key] = [_redact(key, x) for x in changes]
+        else:
+            result.unchanged += 1
+
+    return result
@@ -0,0 +1,364 @@
+"""
+Loads and renders the documents of a Kubernetes manifest in Python, exactly as
+`cdk8s.Include` and `cdk8s.ApiObject` would in the JSII runtime.
+
+cdk8s parses YAML with the `yaml` npm package, using its YAML 1.1 schema. Plain
+scalars are resolved with that schema's rules, which differ from PyYAML's, e.g.
+`y` is a boolean and `1e3` is a number. Manifests which use YAML features whose
+results cannot be reproduced exactly, such as timestamps, merge keys or
+explicit tags, are not loaded.
+"""
+
+import functools
+import math
+import os
+import re
+from typing import Any, Optional
+
+import yaml
+
+# metadata which objects can be created with, see `ApiObjectMetadata`
+_METADATA_FIELDS = {"name", "namespace", "labels", "annotations", "finalizers"}
+
+
+class _Unsupported(Exception):
+    pass
+
+
+##
+## YAML 1.1, as resolved by the `yaml` npm package
+##
+
+_STR = "tag:yaml.org,2002:str"
+_NULL = "tag:lab.internal,2025:null"
+_TRUE = "tag:lab.internal,2025:true"
+_FALSE = "tag:lab.internal,2025:false"
+_INT_BIN = "tag:lab.internal,2025:int-bin"
+_INT_OCT = "tag:lab.internal,2025:int-oct"
+_INT = "tag:lab.internal,2025:int"
+_INT_HEX = "tag:lab.internal,2025:int-hex"
+_FLOAT = "tag:lab.internal,2025:float"
+_UNSUPPORTED = "tag:lab.internal,2025:unsupported"
+
+# in the order they are tested, the first match resolves a plain scalar
+_PLAIN_SCALARS = [
+    (_NULL, re.compile(r"(?:~|[Nn]ull|NULL)?")),
+    (_TRUE, re.compile(r"(?:Y|y|[Yy]es|YES|[Tt]rue|TRUE|[Oo]n|ON)")),
+    (_FALSE, re.compile(r"(?:N|n|[Nn]o|NO|[Ff]alse|FALSE|[Oo]ff|OFF)")),
+    (_INT_BIN, re.compile(r"[-+]?0b[0-1_]+")),
+    (_INT_OCT, re.compile(r"[-+]?0[0-7_]+")),
+    (_INT, re.compile(r"[-+]?[0-9][0-9_]*")),
+    (_INT_HEX, re.compile(r"[-+]?0x[0-9a-fA-F_]+")),
+    # infinity and NaN
+    (_UNSUPPORTED, re.compile(r"(?:[-+]?\.(?:inf|Inf|INF)|\.nan|\.NaN|\.NAN)")),
+    (_FLOAT, re.compile(r"[-+]?(?:[0-9][0-9_]*)?(?:\.[0-9_]*)?[eE][-+]?[0-9]+")),
+    (_FLOAT, re.compile(r"[-+]?(?:[0-9][0-9_]*)?\.[0-9_]*")),
+    # merge keys
+    (_UNSUPPORTED, re.compile(r"<<")),
+    # sexagesimal numbers, and timestamps
+    (_UNSUPPORTED, re.compile(r"[-+]?[0-9][0-9_]*(?::[0-5]?[0-9])+(?:\.[0-9_]*)?")),
+    (
+        _UNSUPPORTED,
+        re.compile(
+            r"([0-9]{4})-([0-9]{1,2})-([0-9]{1,2})"
+            r"(?:(?:t|T|[ \t]+)([0-9]{1,2}):([0-9]{1,2}):([0-9]{1,2}(\.[0-9]+)?)"
+            r"(?:[ \t]*(Z|[-+][012]?[0-9](?::[0-9]{2})?))?)?"
+        ),
+    ),
+]
+
+# the non-specific tag, which makes a scalar a string. libyaml resolves tagged
+# plain scalars as if they were untagged, so these are found in the text, which
+# may also find strings containing "!"
+_NON_SPECIFIC_TAG = re.compile(r"(?:^|[-:,\[{])[ \t]*!(?=[ \t\r\n,\]}]|$)", re.M)
+
+# integers beyond this are not exact as JavaScript numbers
+_MAX_SAFE_INTEGER = 2**53 - 1
+
+
+def _int(value: str, prefix: int, base: int) -> Any:
+    sign = value[0] if value[0] in "+-" else ""
+    digits = value[len(sign) + prefix :].replace("_", "")
+
+    if not digits:
+        raise _Unsupported(f"not a number: {value}")
+
+    n = int(digits, base)
+    if n > _MAX_SAFE_INTEGER:
+        raise _Unsupported(f"integer is not exact in JavaScript: {value}")
+
+    if sign == "-":
+        if not n:
+            raise _Unsupported(f"negative zero: {value}")
+
+        return -n
+
+    return n
+
+
+def _float(value: str) -> float:
+    try:
+        n = float(value.replace("_", ""))
+    except ValueError:
+        raise _Unsupported(f"not a number: {value}") from None
+
+    # JSON has neither infinity, NaN, nor a negative zero
+    if not math.isfinite(n) or (n == 0 and math.copysign(1, n) < 0):
+        raise _Unsupported(f"number is not representable in JSON: {value}")
+
+    return n
+
+
+# manifests repeat many plain scalars, e.g. keys
+@functools.lru_cache(maxsize=4096)
+def _resolve_plain(value: str) -> str:
+    for tag, pattern in _PLAIN_SCALARS:
+        if pattern.fullmatch(value):
+            return tag
+
+    return _STR
+
+
+class _Loader(yaml.CSafeLoader):
+    yaml_constructors: dict = {}
+
+    def resolve(self, kind: Any, value: Any, implicit: Any) -> str:
+        if kind is yaml.ScalarNode and implicit[0]:
+            return _resolve_plain(value)
+
+        return super().resolve(kind, value, implicit)
+
+    def construct_mapping(self, node: Any, deep: bool = False) -> dict:
+        if not isinstance(node, yaml.MappingNode):
+            raise _Unsupported(f"expected a mapping, got {node.id}")
+
+        mapping = {}
+        for key_node, value_node in node.value:
+            key = self.construct_object(key_node, deep=deep)
+
+            # cdk8s converts keys to strings, and rejects duplicate keys
+            if not isinstance(key, str):
+                raise _Unsupported(f"mapping key is not a string: {key!r}")
+            if key in mapping:
+                raise _Unsupported(f"duplicate mapping key: {key}")
+
+            mapping[key] = self.construct_object(value_node, deep=deep)
+
+        return mapping
+
+    def construct_unsupported(self, node: Any) -> Any:
+        raise _Unsupported(f"unsupported YAML tag: {node.tag}")
+
+
+_Loader.add_constructor(_STR, _Loader.construct_yaml_str)
+_Loader.add_constructor("tag:yaml.org,2002:seq", _Loader.construct_yaml_seq)
+_Loader.add_constructor("tag:yaml.org,2002:map", _Loader.construct_yaml_map)
+_Loader.add_constructor(_NULL, lambda loader, node: None)
+_Loader.add_constructor(_TRUE, lambda loader, node: True)
+_Loader.add_constructor(_FALSE, lambda loader, node: False)
+_Loader.add_constructor(_INT_BIN, lambda loader, node: _int(node.value, 2, 2))
+_Loader.add_constructor(_INT_OCT, lambda loader, node: _int(node.value, 1, 8))
+_Loader.add_constructor(_INT, lambda loader, node: _int(node.value, 0, 10))
+_Loader.add_constructor(_INT_HEX, lambda loader, node: _int(node.value, 2, 16))
+_Loader.add_constructor(_FLOAT, lambda loader, node: _float(node.value))
+_Loader.add_constructor(None, _Loader.construct_unsupported)
+
+
+##
+## Documents
+##
+
+
+def _is_empty(document: Any) -> bool:
+    return document is None or (isinstance(document, (dict, list)) and not document)
+
+
+def _is_str_map(value: Any) -> bool:
+    return value is None or (
+        isinstance(value, dict) and all(isinstance(x, str) for x in value.values())
+    )
+
+
+def object_id(document: dict) -> str:
+    """
+    Returns the construct ID `cdk8s.Include` gives the object: its name, kind
+    and namespace.
+    """
+    metadata = document["metadata"]
+    kind = document.get("kind")
+
+    return "-".join(
+        x
+        for x in [metadata["name"], kind and kind.lower(), metadata.get("namespace")]
+        if x
+    )
+
+
+def _check_document(document: Any) -> None:
+    if not isinstance(document, dict):
+        raise _Unsupported("document is not a mapping")
+
+    api_version = document.get("apiVersion")
+    if not isinstance(api_version, str) or api_version.count("/") > 1:
+        raise _Unsupported(f"invalid apiVersion: {api_version!r}")
+
+    if not isinstance(document.get("kind"), str):
+        raise _Unsupported("kind is not a string")
+
+    metadata = document.get("metadata")
+    if not isinstance(metadata, dict) or not isinstance(metadata.get("name"), str):
+        raise _Unsupported("object has no name")
+
+    # objects are created from these fields, the rest are only ever null
+    if extra := [
+        k for k, v in metadata.items() if k not in _METADATA_FIELDS and v is not None
+    ]:
+        raise _Unsupported(f"unsupported metadata: {', '.join(extra)}")
+
+    namespace = metadata.get("namespace")
+    finalizers = metadata.get("finalizers")
+
+    if not (
+        (namespace is None or isinstance(namespace, str))
+        and _is_str_map(metadata.get("labels"))
+        and _is_str_map(metadata.get("annotations"))
+        and (
+            finalizers is None
+            or (
+                isinstance(finalizers, list)
+                and all(isinstance(x, str) for x in finalizers)
+            )
+        )
+    ):
+        raise _Unsupported("invalid metadata")
+
+
+def _load_all(text: str) -> list[Any]:
+    return [x for x in yaml.load_all(text, Loader=_Loader) if not _is_empty(x)]
+
+
+def load_synthesized(text: str) -> list[Any]:
+    """
+    Returns the documents in YAML synthesized by cdk8s, skipping empty
+    documents. Raises ValueError if they cannot be loaded exactly.
+
+    cdk8s never tags scalars, so unlike `load_documents`, tags are not searched
+    for in the text.
+    """
+    try:
+        return _load_all(text)
+    except (yaml.YAMLError, _Unsupported) as e:
+        raise ValueError(str(e)) from e
+
+
+def load_documents(text: str) -> Optional[list[dict]]:
+    """
+    Returns the objects in a manifest, as `cdk8s.Include` would create them,
+    skipping empty documents. Returns None if the manifest cannot be loaded
+    exactly, including if it is invalid.
+    """
+    if _NON_SPECIFIC_TAG.search(text):
+        return None
+
+    try:
+        documents = _load_all(text)
+
+        for document in documents:
+            _check_document(document)
+    except (yaml.YAMLError, _Unsupported):
+        return None
+
+    ids = [object_id(x) for x in documents]
+    if len(set(ids)) != len(ids):
+        return None
+
+    return documents
+
+
+##
+## Rendering, like `ApiObject.toJson`
+##
+
+
+def _js_sort_key(key: str) -> bytes:
+    # JavaScript compares strings by UTF-16 code unit
+    return key.encode("utf-16-be", "surrogatepass")
+
+
+def sanitize(value: Any, *, sort_keys: bool = True, filter_empty: bool = False) -> Any:
+    """
+    Removes null values from mappings, and optionally sorts their keys, or
+    removes empty mappings and lists, like cdk8s' `sanitizeValue`.
+    """
+    if value is None:
+        return None
+
+    if isinstance(value, list):
+        if filter_empty and not value:
+            return None
+
+        return [
+            sanitize(x, sort_keys=sort_keys, filter_empty=filter_empty) for x in value
+        ]
+
+    if isinstance(value, dict):
+        result = {}
+        for key in sorted(value, key=_js_sort_key) if sort_keys else value:
+            x = sanitize(value[key], sort_keys=sort_keys, filter_empty=filter_empty)
+            if x is not None:
+                result[key] = x
+
+        if filter_empty and not result:
+            return None
+
+        return result
+
+    return value
+
+
+def sort_keys_enabled() -> bool:
+    return not os.environ.get("CDK8S_DISABLE_SORT")
+
+
+def effective_metadata(
+    document: dict, *, namespace: Optional[str], labels: dict[str, str]
+) -> dict:
+    """
+    Returns the metadata of an object created from `document`, in a chart with
+    the given namespace and labels.
+    """
+    metadata = document["metadata"]
+
+    return sanitize(
+        {
+            **metadata,
+            "namespace": (
+                metadata["namespace"]
+                if metadata.get("namespace") is not None
+                else namespace
+            ),
+            "labels": {**labels, **(metadata.get("labels") or {})},
+        },
+        filter_empty=True,
+    )
+
+
+def render_document(
+    document: dict, *, namespace: Optional[str], labels: dict[str, str]
+) -> dict:
+    """
+    Returns the JSON of an object created from `document`, in a chart with the
+    given namespace and labels.
+    """
+    data = sanitize(
+        {
+            **document,
+            "metadata": effective_metadata(
+                document, namespace=namespace, labels=labels
+            ),
+        },
+        sort_keys=sort_keys_enabled(),
+    )
+
+    first = {k: data[k] for k in ["apiVersion", "kind", "metadata"] if k in data}
+    return first | {k: v for k, v in data.items() if k not in first}
@@ -0,0 +1,280 @@
+import base64
+import hashlib
+import re
+import subprocess
+import tempfile
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Any, Optional
+
+import yaml
+from cdk8s import Names
+from constructs import Construct
+
+from lab.libs.cache import CacheStats, get_cache_dir, stable_hash, write_atomic
+from lab.libs.exceptions import CacheError, LabError
+from lab.libs.k8s.include import Include
+from lab.libs.profile import profile
+
+_SECRET_PLACEHOLDER = re.compile(r"__lab_secret_(raw|b64)_([0-9a-f]{16})__")
+
+
+def _secret_id(secret: str) -> str:
+    return hashlib.sha256(secret.encode()).hexdigest()[:16]
+
+
+def _secret_forms(secret: str) -> dict[str, str]:
+    return {"raw": secret, "b64": base64.b64encode(secret.encode()).decode()}
+
+
+class HelmChartRef:
+    """
+    A chart in a Helm repository, at a pinned version.
+    """
+
+    def __init__(self, *, repo: str, chart: str, version: str):
+        self.repo = repo
+        self.chart = chart
+        self.version = version
+
+    @property
+    def tarball_name(self) -> str:
+        return f"{self.chart}-{self.version}.tgz"
+
+
+class HelmRenderCache:
+    """
+    Caches manifests rendered by `helm template`, and chart tarballs pulled
+    with `helm pull`.
+
+    Renders are keyed by the chart, its version and repo, the release name and
+    namespace, Helm flags, and a hash of the values. Secrets are replaced by a
+    placeholder derived from their hash before a render is stored, and are
+    restored on read. Neither the values nor secrets are stored in clear.
+
+    Args:
+        cache_dir: directory in which to store renders and chart tarballs
+        offline: if set, never access the network, and raise CacheError for
+            charts that are neither rendered nor pulled
+        helm_executable: the Helm binary to run
+    """
+
+    def __init__(
+        self, *, cache_dir: Path, offline: bool = False, helm_executable: str = "helm"
+    ):
+        self.cache_dir = cache_dir
+        self.offline = offline
+        self.helm_executable = helm_executable
+        self.stats = CacheStats()
+
+    @property
+    def charts_dir(self) -> Path:
+        return self.cache_dir / "charts"
+
+    def pull(self, ref: HelmChartRef) -> Path:
+        """
+        Stores the chart tarball locally, so it can be rendered offline.
+        """
+        tarball = self.charts_dir / ref.tarball_name
+
+        if not tarball.is_file():
+            self.charts_dir.mkdir(parents=True, exist_ok=True)
+            self._helm(
+                "pull",
+                ref.chart,
+                "--repo",
+                ref.repo,
+                "--version",
+                ref.version,
+                "--destination",
+                str(self.charts_dir),
+            )
+
+        return tarball
+
+    def render(
+        self,
+        ref: HelmChartRef,
+        *,
+        release_name: str,
+        namespace: Optional[str] = None,
+        values: Optional[Mapping[str, Any]] = None,
+        helm_flags: Sequence[str] = (),
+        secrets: Sequence[str] = (),
+    ) -> bytes:
+        """
+        Returns the rendered manifest, running `helm template` on a miss.
+        """
+        key = stable_hash(
+            {
+                "repo": ref.repo,
+                "chart": ref.chart,
+                "version": ref.version,
+                "release_name": release_name,
+                "namespace": namespace,
+                "helm_flags": list(helm_flags),
+                "values": stable_hash(values or {}),
+            }
+        )
+        path = self.cache_dir / "renders" / f"{key}.yaml"
+
+        if path.is_file():
+            self.stats.hits += 1
+            return _restore_secrets(path.read_bytes(), secrets)
+
+        self.stats.misses += 1
+
+        tarball = self.charts_dir / ref.tarball_name
+        if self.offline and not tarball.is_file():
+            raise CacheError(
+                f"chart {ref.chart}-{ref.version} is not rendered or pulled, "
+                "cannot fetch in offline mode"
+            )
+
+        rendered = self._template(
+            ref,
+            tarball if tarball.is_file() else None,
+            release_name=release_name,
+            namespace=namespace,
+            values=values,
+            helm_flags=helm_flags,
+        )
+
+        write_atomic(path, _redact_secrets(rendered, secrets))
+        return rendered
+
+    def _template(
+        self,
+        ref: HelmChartRef,
+        tarball: Optional[Path],
+        *,
+        release_name: str,
+        namespace: Optional[str],
+        values: Optional[Mapping[str, Any]],
+        helm_flags: Sequence[str],
+    ) -> bytes:
+        # mirrors the arguments used by `cdk8s.Helm`
+        with tempfile.TemporaryDirectory(prefix="lab-helm-") as workdir:
+            args = ["template"]
+
+            if values:
+                values_path = Path(workdir) / "overrides.yaml"
+                values_path.write_text(yaml.safe_dump(dict(values)))
+                args += ["-f", str(values_path)]
+
+            if tarball is None:
+                args += ["--repo", ref.repo, "--version", ref.version]
+
+            if namespace:
+                args += ["--namespace", namespace]
+
+            args += [*helm_flags, release_name, str(tarball or ref.chart)]
+
+            return self._helm(*args)
+
+    def _helm(self, *args: str) -> bytes:
+        try:
+            result = subprocess.run(
+                [self.helm_executable, *args], capture_output=True, check=False
+            )
+        except FileNotFoundError as e:
+            raise LabError(
+                f"unable to execute '{self.helm_executable}', is it installed?"
+            ) from e
+
+        if result.returncode != 0:
+            raise LabError(f"error running helm {args[0]}: {result.stderr.decode()}")
+
+        return result.stdout
+
+
+def _redact_secrets(rendered: bytes, secrets: Sequence[str]) -> bytes:
+    text = rendered.decode()
+
+    # replace longer secrets first, in case one secret contains another
+    for secret in sorted(set(secrets), key=len, reverse=True):
+        for form, value in _secret_forms(secret).items():
+            text = text.replace(value, f"__lab_secret_{form}_{_secret_id(secret)}__")
+
+    return text.encode()
+
+
+def _restore_secrets(redacted: bytes, secrets: Sequence[str]) -> bytes:
+    forms = {_secret_id(x): _secret_forms(x) for x in secrets}
+
+    def restore(match: re.Match) -> str:
+        form, secret_id = match.groups()
+
+        if secret_id not in forms:
+            raise CacheError(
+                "cached helm render references a secret that was not provided"
+            )
+
+        return forms[secret_id][form]
+
+    return _SECRET_PLACEHOLDER.sub(restore, redacted.decode()).encode()
+
+
+_helm_cache: Optional[HelmRenderCache] = None
+
+
+def get_helm_cache() -> HelmRenderCache:
+    """
+    Returns the cache used by `Helm`, creating a default one on first use.
+    """
+    global _helm_cache
+
+    if _helm_cache is None:
+        _helm_cache = HelmRenderCache(cache_dir=get_cache_dir() / "helm")
+
+    return _helm_cache
+
+
+def set_helm_cache(cache: HelmRenderCache) -> None:
+    global _helm_cache
+    _helm_cache = cache
+
+
+class Helm(Include):
+    """
+    Renders a Helm chart, like `cdk8s.Helm`, through the Helm render cache.
+
+    On a cache hit, the rendered objects are included without running Helm.
+    Strings in `secrets` are never written to the cache in clear, see
+    `HelmRenderCache`.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        id: str,
+        *,
+        repo: str,
+        chart: str,
+        version: str,
+        namespace: Optional[str] = None,
+        release_name: Optional[str] = None,
+        values: Optional[Mapping[str, Any]] = None,
+        helm_flags: Sequence[str] = (),
+        secrets: Sequence[str] = (),
+    ):
+        # constraints: https://github.com/helm/helm/issues/6006
+        release_name = release_name or Names.to_dns_label(scope, max_len=53, extra=[id])
+
+        with profile(f"helm render ({chart})"):
+            rendered = get_helm_cache().render(
+                HelmChartRef(repo=repo, chart=chart, version=version),
+                release_name=release_name,
+                namespace=namespace,
+                values=values,
+                helm_flags=helm_flags,
+                secrets=secrets,
+            )
+
+        with tempfile.TemporaryDirectory(prefix="lab-helm-") as workdir:
+            manifest_path = Path(workdir) / "chart.yaml"
+            manifest_path.write_bytes(rendered)
+
+            super().__init__(scope, id, url=str(manifest_path))
+
+        self.release_name = release_name
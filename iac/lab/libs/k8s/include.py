@@ -1,18 +1,348 @@
-from typing import Optional
+from abc import ABC, ABCMeta, abstractmethod
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Optional, Union
 
-from cdk8s import ApiObject, Include as BaseInclude
+import cdk8s
+from cdk8s import ApiObject, ApiObjectMetadata, Include as BaseInclude, JsonPatch
+from constructs import Construct
 
+from lab.libs.exceptions import LabError
+from lab.libs.k8s.api_object import PatchSession, pointer_token
+from lab.libs.k8s.chart import PLACEHOLDER_API_VERSION, PLACEHOLDER_KIND, Chart
+from lab.libs.k8s.documents import (
+    effective_metadata,
+    load_documents,
+    object_id,
+    render_document,
+    sanitize,
+    sort_keys_enabled,
+)
+from lab.libs.k8s.manifest_cache import get_manifest_cache
+from lab.libs.profile import profile
 
-class Include(BaseInclude):
+
+@dataclass(frozen=True)
+class ObjectSelector:
+    """
+    Selects included objects. Unset fields match any object.
+
+    Args:
+        kind: the kind of the object, case insensitive
+        namespace: the namespace of the object
+        labels: labels which the object must have, with matching values
+        name: the name of the object, or a glob, e.g. "cert-manager-*"
+    """
+
+    kind: Optional[str] = None
+    namespace: Optional[str] = None
+    labels: dict[str, str] = field(default_factory=dict)
+    name: Optional[str] = None
+
+    def __str__(self) -> str:
+        fields = [
+            f"{k}={v}" for k, v in vars(self).items() if v is not None and v != {}
+        ]
+        return f"selector({', '.join(fields)})"
+
+
+@dataclass(frozen=True)
+class Override:
+    """
+    Changes to the included objects matched by a selector.
+
+    Args:
+        selector: the objects to change, of which there must be at least one
+        patch: merged into each object, see `PatchSession.merge`
+    """
+
+    selector: ObjectSelector
+    patch: Mapping = field(default_factory=dict)
+
+
+class _IndexEntry:
+    def __init__(self, kind: str, metadata: dict, load: Callable[[], ApiObject]):
+        self.kind = kind.lower()
+        self.name = metadata.get("name")
+        self.namespace = metadata.get("namespace")
+        self.labels = metadata.get("labels", {})
+        self._load = load
+        self._obj: Optional[ApiObject] = None
+
+    @property
+    def obj(self) -> ApiObject:
+        if self._obj is None:
+            self._obj = self._load()
+
+        return self._obj
+
+    def matches(self, selector: ObjectSelector) -> bool:
+        return (
+            (selector.kind is None or self.kind == selector.kind.lower())
+            and (selector.namespace is None or self.namespace == selector.namespace)
+            and (selector.name is None or fnmatchcase(self.name or "", selector.name))
+            and selector.labels.items() <= self.labels.items()
+        )
+
+
+class _ObjectIndex:
+    def __init__(self, entries: list[_IndexEntry]):
+        self.entries = entries
+        self.by_key: dict[tuple[str, Optional[str], str], _IndexEntry] = {}
+        self.by_kind_name: dict[tuple[str, str], _IndexEntry] = {}
+        self.by_kind: dict[str, list[_IndexEntry]] = {}
+
+        for entry in entries:
+            self.by_key.setdefault((entry.kind, entry.namespace, entry.name), entry)
+            self.by_kind_name.setdefault((entry.kind, entry.name), entry)
+            self.by_kind.setdefault(entry.kind, []).append(entry)
+
+
+class _Lookups(ABC):
+    """
+    Finds included objects, in an index built on first use by `_build_index`.
+    """
+
+    def find_object(
+        self, *, kind: str, name: str, namespace: Optional[str] = None
+    ) -> Optional[ApiObject]:
+        """
+        Returns the object with the given kind and name, or None if there is
+        no such object. If `namespace` is not given, the first object with the
+        given kind and name in any namespace is returned.
+        """
+        index = self._build_index()
+
+        if namespace is None:
+            entry = index.by_kind_name.get((kind.lower(), name))
+        else:
+            entry = index.by_key.get((kind.lower(), namespace, name))
+
+        return entry.obj if entry else None
+
+    def find_objects(self, selector: ObjectSelector) -> list[ApiObject]:
+        """
+        Returns all objects matching the selector, in manifest order.
+        """
+        index = self._build_index()
+
+        entries = index.entries
+        if selector.kind is not None:
+            entries = index.by_kind.get(selector.kind.lower(), [])
+
+        return [x.obj for x in entries if x.matches(selector)]
+
+    def override(self, *overrides: Override) -> None:
+        """
+        Merges each override into the objects its selector matches. Objects
+        are patched once, with the overrides which match them, in order.
+        Raises LabError if a selector matches no object.
+        """
+        patches: dict[int, tuple[ApiObject, list[Mapping]]] = {}
+
+        for x in overrides:
+            if not (objects := self.find_objects(x.selector)):
+                raise LabError(f"{x.selector} matches no included object")
+
+            for obj in objects:
+                patches.setdefault(id(obj), (obj, []))[1].append(x.patch)
+
+        for obj, obj_patches in patches.values():
+            with PatchSession(obj) as session:
+                for patch in obj_patches:
+                    session.merge(patch)
+
+    @abstractmethod
+    def _build_index(self) -> _ObjectIndex: ...
+
+
+# JSII classes have their own metaclass, which must be combined with that of
+# abstract classes to subclass both
+class _LookupsMeta(type(BaseInclude), ABCMeta):  # type: ignore[misc]
+    pass
+
+
+class Include(BaseInclude, _Lookups, metaclass=_LookupsMeta):
     """
     Wraps `cdk8s.Include` to add utilities for modifying the included YAML.
+
+    Remote manifests are loaded through the manifest cache, see
+    `lab.libs.k8s.manifest_cache`.
+
+    Lookups are answered from an index of the included objects, built on first
+    use. Each object is read from the JSII runtime once, rather than once per
+    lookup.
     """
 
-    def find_object(self, *, kind: str, name: str) -> Optional[ApiObject]:
-        for x in self.node.children:
-            x_obj = ApiObject.of(x)
+    def __init__(self, scope: Construct, id: str, *, url: str):
+        with profile(f"include fetch ({id})"):
+            path = get_manifest_cache().resolve(url)
+
+        with profile(f"include parse ({id})"):
+            super().__init__(scope, id, url=path)
+
+        self._index: Optional[_ObjectIndex] = None
+
+    def _build_index(self) -> _ObjectIndex:
+        if self._index is None:
+            self._index = _ObjectIndex(
+                [
+                    _IndexEntry(obj.kind, obj.metadata.to_json(), lambda obj=obj: obj)
+                    for obj in self.api_objects
+                ]
+            )
+
+        return self._index
+
+
+class LazyInclude(Construct, _Lookups, metaclass=_LookupsMeta):
+    """
+    Includes the objects in a manifest, like `Include`, with identical output,
+    without creating an ApiObject for each of them.
+
+    The manifest is loaded in Python, see `lab.libs.k8s.documents`. Objects are
+    rendered in Python when the chart is synthesized, in place of a single
+    placeholder ApiObject, see `lab.libs.k8s.chart.Chart`. Only objects
+    returned by `find_object` or `find_objects` are created as ApiObjects, so
+    that they can be modified.
+
+    Use `include_manifest`, which falls back to `Include` for manifests which
+    cannot be loaded exactly in Python.
+    """
+
+    def __init__(self, scope: Construct, id: str, *, documents: list[dict]):
+        super().__init__(scope, id)
+
+        chart = cdk8s.Chart.of(self)
+        if not isinstance(chart, Chart):
+            raise LabError(
+                f"LazyInclude '{self.node.path}' must be in a lab.libs.k8s.chart.Chart"
+            )
+
+        self._documents = documents
+        self._namespace = chart.namespace
+        self._labels = dict(chart.labels)
+
+        # objects created by lookups, by document index, in creation order
+        self._objects: dict[int, ApiObject] = {}
+        self._index: Optional[_ObjectIndex] = None
+
+        # ApiObject IDs are names, which are never prefixed by "_"
+        placeholder = ApiObject(
+            self,
+            "_included-objects",
+            api_version=PLACEHOLDER_API_VERSION,
+            kind=PLACEHOLDER_KIND,
+            metadata=ApiObjectMetadata(name=self.node.addr),
+        )
+        chart.add_lazy_include(placeholder.name, self)
+
+    @property
+    def object_count(self) -> int:
+        """
+        The number of objects created by lookups.
+        """
+        return len(self._objects)
+
+    def render(self, objects: list[dict]) -> list[dict]:
+        """
+        Returns the JSON of the included objects, in manifest order, given the
+        JSON of the objects created by lookups, in creation order.
+        """
+        rendered = dict(zip(self._objects, objects))
+
+        for index, obj in rendered.items():
+            if obj.get("kind") != self._documents[index]["kind"]:
+                raise LabError(
+                    f"objects created by LazyInclude '{self.node.path}' were "
+                    "reordered in the chart, do they have dependencies?"
+                )
+
+        return [
+            rendered[i]
+            if i in rendered
+            else render_document(x, namespace=self._namespace, labels=self._labels)
+            for i, x in enumerate(self._documents)
+        ]
+
+    def _build_index(self) -> _ObjectIndex:
+        if self._index is None:
+            self._index = _ObjectIndex(
+                [
+                    _IndexEntry(
+                        x["kind"],
+                        effective_metadata(
+                            x, namespace=self._namespace, labels=self._labels
+                        ),
+                        lambda i=i: self._object(i),
+                    )
+                    for i, x in enumerate(self._documents)
+                ]
+            )
+
+        return self._index
+
+    def _object(self, index: int) -> ApiObject:
+        if index in self._objects:
+            return self._objects[index]
+
+        document = self._documents[index]
+        metadata = document["metadata"]
+
+        obj = ApiObject(
+            self,
+            object_id(document),
+            api_version=document["apiVersion"],
+            kind=document["kind"],
+            metadata=ApiObjectMetadata(
+                name=metadata["name"],
+                namespace=metadata.get("namespace"),
+                labels=metadata.get("labels"),
+                annotations=metadata.get("annotations"),
+                finalizers=metadata.get("finalizers"),
+            ),
+        )
+
+        # ApiObjectProps has no other fields, add them as they would be
+        # rendered: with sorted keys, after apiVersion, kind and metadata
+        fields = sanitize(
+            {
+                k: v
+                for k, v in document.items()
+                if k not in ["apiVersion", "kind", "metadata"]
+            },
+            sort_keys=sort_keys_enabled(),
+        )
+        if fields:
+            obj.add_json_patch(
+                *[JsonPatch.add(f"/{pointer_token(k)}", v) for k, v in fields.items()]
+            )
+
+        self._objects[index] = obj
+        return obj
+
+
+IncludedManifest = Union[Include, LazyInclude]
+
+
+def include_manifest(scope: Construct, id: str, *, url: str) -> IncludedManifest:
+    """
+    Includes a manifest with `LazyInclude`, if `scope` is in a
+    `lab.libs.k8s.chart.Chart` and the manifest can be loaded exactly in
+    Python, and with `Include` otherwise.
+    """
+    if isinstance(cdk8s.Chart.of(scope), Chart):
+        with profile(f"include fetch ({id})"):
+            path = get_manifest_cache().resolve(url)
+
+        with profile(f"include parse ({id})"):
+            documents = load_documents(Path(path).read_text(encoding="utf-8"))
+
+        if documents is not None:
+            return LazyInclude(scope, id, documents=documents)
 
-            if x_obj.kind.lower() == kind.lower() and x_obj.name == name:
-                return x_obj
+        url = path
 
-        return None
+    return Include(scope, id, url=url)
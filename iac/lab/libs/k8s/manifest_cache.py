@@ -0,0 +1,178 @@
+import fcntl
+import json
+import urllib.error
+import urllib.request
+import warnings
+from pathlib import Path
+from typing import Optional
+
+from lab.libs.cache import CacheStats, get_cache_dir, sha256_digest, write_atomic
+from lab.libs.exceptions import CacheError
+
+# in the project, rather than the current directory, so that every synth reads
+# the same pins
+DEFAULT_LOCKFILE = Path(__file__).parents[3] / "manifests.lock"
+
+FETCH_TIMEOUT_SECONDS = 30
+
+
+def is_remote_url(url: str) -> bool:
+    return url.startswith(("http://", "https://"))
+
+
+class ManifestCache:
+    """
+    A content-addressed, on-disk cache for remote manifests.
+
+    Manifests are stored by their sha256 digest. An index maps each URL to the
+    digest last fetched for it, and an optional lockfile pins the digest that
+    each URL must resolve to. Pinned manifests are verified on download, and
+    are never re-downloaded while their content is in the cache. If the
+    lockfile exists, URLs which are not pinned are an error, unless resolved
+    with `pin`. If it does not, manifests are fetched unpinned, with a warning.
+
+    Args:
+        cache_dir: directory in which to store manifests
+        lockfile: path to a lockfile pinning manifest digests, or None to
+            disable pinning
+        offline: if set, never access the network, and raise CacheError for
+            manifests that are not cached
+    """
+
+    def __init__(
+        self,
+        *,
+        cache_dir: Path,
+        lockfile: Optional[Path] = DEFAULT_LOCKFILE,
+        offline: bool = False,
+    ):
+        self.cache_dir = cache_dir
+        self.lockfile = lockfile
+        self.offline = offline
+        self.stats = CacheStats()
+
+        self._index_path = cache_dir / "index.json"
+        self._index = _read_json(self._index_path)
+        self._locked = _read_json(lockfile) if lockfile else {}
+        self._require_pins = lockfile is not None and lockfile.is_file()
+        self._warned = False
+
+    def digest(self, url: str) -> Optional[str]:
+        """
+        Returns the digest pinned, or last fetched, for `url`, without fetching.
+        """
+        return self._locked.get(url, self._index.get(url))
+
+    def resolve(self, url: str, *, pin: bool = False, refresh: bool = False) -> str:
+        """
+        Returns a local path to the contents of `url`, downloading it if it is
+        not cached. Local paths are returned unchanged.
+
+        If `pin` is set, the URL is pinned in the lockfile if it is not already.
+        If `refresh` is set, the URL is downloaded again and re-pinned.
+        """
+        if not is_remote_url(url):
+            return url
+
+        pin = pin or refresh
+        if self.lockfile and not pin and url not in self._locked:
+            if self._require_pins:
+                raise CacheError(
+                    f"manifest is not pinned in {self.lockfile}, "
+                    f"run `labcli k8s lock`: {url}"
+                )
+
+            if not self._warned:
+                self._warned = True
+                warnings.warn(
+                    f"no lockfile at {self.lockfile}, manifests are not pinned, "
+                    "run `labcli k8s lock`",
+                    stacklevel=2,
+                )
+
+        digest = None if refresh else self.digest(url)
+
+        if digest and (path := self._blob_path(digest)).is_file():
+            self.stats.hits += 1
+            return str(path)
+
+        self.stats.misses += 1
+
+        if self.offline:
+            raise CacheError(
+                f"manifest is not cached, cannot fetch in offline mode: {url}"
+            )
+
+        data = _fetch(url)
+        digest = sha256_digest(data)
+
+        if not refresh and (pinned := self._locked.get(url)) and pinned != digest:
+            raise CacheError(
+                f"digest mismatch for {url}: lockfile pins {pinned}, got {digest}"
+            )
+
+        path = self._blob_path(digest)
+        write_atomic(path, data)
+
+        self._index[url] = digest
+        _update_json(self._index_path, url, digest)
+
+        if self.lockfile and pin and self._locked.get(url) != digest:
+            self._locked[url] = digest
+            _update_json(self.lockfile, url, digest)
+
+        return str(path)
+
+    def _blob_path(self, digest: str) -> Path:
+        algorithm, _, hexdigest = digest.partition(":")
+        return self.cache_dir / algorithm / hexdigest
+
+
+def _fetch(url: str) -> bytes:
+    try:
+        with urllib.request.urlopen(url, timeout=FETCH_TIMEOUT_SECONDS) as response:
+            return response.read()
+    except (urllib.error.URLError, TimeoutError) as e:
+        raise CacheError(f"error fetching {url}: {e}") from e
+
+
+def _read_json(path: Path) -> dict[str, str]:
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError as e:
+        raise CacheError(f"error parsing {path}: {e}") from e
+
+
+def _update_json(path: Path, key: str, value: str) -> None:
+    # other processes may be updating the same file, e.g. during a parallel
+    # synth, so merge into its current contents while holding a lock
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path.with_name(f".{path.name}.flock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        data = _read_json(path)
+        data[key] = value
+        write_atomic(path, (json.dumps(data, indent=2, sort_keys=True) + "\n").encode())
+
+
+_manifest_cache: Optional[ManifestCache] = None
+
+
+def get_manifest_cache() -> ManifestCache:
+    """
+    Returns the cache used by `Include`, creating a default one on first use.
+    """
+    global _manifest_cache
+
+    if _manifest_cache is None:
+        _manifest_cache = ManifestCache(cache_dir=get_cache_dir() / "manifests")
+
+    return _manifest_cache
+
+
+def set_manifest_cache(cache: ManifestCache) -> None:
+    global _manifest_cache
+    _manifest_cache = cache
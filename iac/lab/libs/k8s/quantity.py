@@ -0,0 +1,54 @@
+"""
+Parses Kubernetes resource quantities, e.g. "250m" CPU or "128Mi" memory.
+"""
+
+import re
+from decimal import Decimal, InvalidOperation
+from typing import Union
+
+_SUFFIXES = {
+    "n": Decimal("1e-9"),
+    "u": Decimal("1e-6"),
+    "m": Decimal("1e-3"),
+    "": Decimal(1),
+    "k": Decimal("1e3"),
+    "M": Decimal("1e6"),
+    "G": Decimal("1e9"),
+    "T": Decimal("1e12"),
+    "P": Decimal("1e15"),
+    "E": Decimal("1e18"),
+    "Ki": Decimal(2**10),
+    "Mi": Decimal(2**20),
+    "Gi": Decimal(2**30),
+    "Ti": Decimal(2**40),
+    "Pi": Decimal(2**50),
+    "Ei": Decimal(2**60),
+}
+
+_QUANTITY = re.compile(r"([+-]?[0-9.]+(?:[eE][+-]?[0-9]+)?)([a-zA-Z]*)")
+
+
+def parse_quantity(quantity: Union[str, int, float]) -> Decimal:
+    """
+    Returns the value of a quantity, in base units: cores for CPU, bytes for
+    memory.
+    """
+    if isinstance(quantity, (int, float)):
+        return Decimal(str(quantity))
+
+    match = _QUANTITY.fullmatch(quantity.strip())
+    if not match or match.group(2) not in _SUFFIXES:
+        raise ValueError(f"invalid quantity: {quantity!r}")
+
+    try:
+        return Decimal(match.group(1)) * _SUFFIXES[match.group(2)]
+    except InvalidOperation as e:
+        raise ValueError(f"invalid quantity: {quantity!r}") from e
+
+
+def format_cpu(cores: float) -> str:
+    return f"{round(cores * 1000)}m"
+
+
+def format_memory(size: float) -> str:
+    return f"{size / 2**20:.0f}Mi"
@@ -0,0 +1,140 @@
+"""
+Applies the resource profiles of `lab.libs.config.ResourcesConfig` to the
+containers of workloads, whether defined with cdk8s-plus or included from a
+manifest, and checks that no synthesized container is left unbounded.
+"""
+
+from collections.abc import Mapping
+from decimal import Decimal
+from typing import Optional
+
+import cdk8s_plus_29 as kplus
+from cdk8s import ApiObject, Chart, Size
+
+from lab.libs.config import ResourceProfile, ResourcesConfig
+from lab.libs.exceptions import LabError
+from lab.libs.k8s.api_object import PatchSession
+from lab.libs.k8s.diff import index_objects
+from lab.libs.k8s.include import IncludedManifest, ObjectSelector
+from lab.libs.k8s.quantity import parse_quantity
+
+# kinds whose containers run continuously, and must be bounded. Jobs run to
+# completion, and are not checked
+WORKLOAD_KINDS = ["Deployment", "DaemonSet", "StatefulSet"]
+
+
+def _whole(value: Decimal, unit: str, quantity: str) -> int:
+    if value != value.to_integral_value():
+        raise LabError(f"{quantity} is not a whole number of {unit}")
+
+    return int(value)
+
+
+def container_resources(profile: ResourceProfile) -> kplus.ContainerResources:
+    """
+    Returns the resources of a cdk8s-plus container. CPU must be a whole
+    number of millicores, and memory of mebibytes.
+    """
+
+    def cpu(quantity: str) -> kplus.Cpu:
+        return kplus.Cpu.millis(
+            _whole(parse_quantity(quantity) * 1000, "millicores", quantity)
+        )
+
+    def memory(quantity: str) -> Size:
+        return Size.mebibytes(
+            _whole(parse_quantity(quantity) / 2**20, "mebibytes", quantity)
+        )
+
+    return kplus.ContainerResources(
+        cpu=kplus.CpuResources(
+            request=cpu(profile.requests.cpu), limit=cpu(profile.limits.cpu)
+        ),
+        memory=kplus.MemoryResources(
+            request=memory(profile.requests.memory),
+            limit=memory(profile.limits.memory),
+        ),
+    )
+
+
+def set_workload_resources(workload: ApiObject, profile: ResourceProfile) -> None:
+    """
+    Sets the resources of every container, and init container, of a workload,
+    replacing any it had.
+    """
+    with PatchSession(workload) as patch:
+        pod_spec = patch.snapshot.get("spec", {}).get("template", {}).get("spec", {})
+
+        for field in ["initContainers", "containers"]:
+            for i in range(len(pod_spec.get(field, []))):
+                patch.add(
+                    f"/spec/template/spec/{field}/{i}/resources",
+                    profile.model_dump(),
+                )
+
+
+def workload_key(workload: ApiObject) -> str:
+    """
+    Returns the key of a workload in `ResourcesConfig`: "<namespace>/<name>",
+    as synthesized.
+    """
+    namespace = workload.metadata.namespace or Chart.of(workload).namespace
+    return f"{namespace or 'default'}/{workload.name}"
+
+
+def set_included_resources(
+    manifest: IncludedManifest,
+    resources: ResourcesConfig,
+    defaults: Mapping[str, str],
+    *,
+    default: Optional[str] = None,
+) -> None:
+    """
+    Sets the resources of the included workloads in `defaults`, by
+    "<namespace>/<name>", to their configured profile, or the named default.
+    If `default` is set, other included workloads use that profile, unless
+    configured.
+    """
+    workloads = {
+        workload_key(x): x
+        for kind in WORKLOAD_KINDS
+        for x in manifest.find_objects(ObjectSelector(kind=kind))
+    }
+
+    if missing := sorted(set(defaults) - set(workloads)):
+        raise LabError(f"could not find workloads {', '.join(missing)} in manifest")
+
+    for key, workload in workloads.items():
+        if key in defaults:
+            set_workload_resources(workload, resources.profile(key, defaults[key]))
+        elif default is not None:
+            set_workload_resources(workload, resources.profile(key, default))
+
+
+def check_bounded(files: dict[str, bytes]) -> None:
+    """
+    Raises LabError if a container of a workload in synthesized files has no
+    CPU or memory limit.
+    """
+    unbounded = []
+
+    for key, obj in index_objects(files).items():
+        if key.kind not in WORKLOAD_KINDS:
+            continue
+
+        pod_spec = obj.obj.get("spec", {}).get("template", {}).get("spec", {})
+        for container in pod_spec.get("initContainers", []) + pod_spec.get(
+            "containers", []
+        ):
+            limits = (container.get("resources") or {}).get("limits") or {}
+            if missing := [x for x in ["cpu", "memory"] if x not in limits]:
+                unbounded.append(
+                    f"{key.kind.lower()}/{key.name} in {key.namespace or 'default'}, "
+                    f"container {container.get('name')}: no {' or '.join(missing)} limit"
+                )
+
+    if unbounded:
+        raise LabError(
+            "containers without resource limits, set a profile in the "
+            "`resources` config:\n  " + "\n  ".join(unbounded)
+        )
@@ -0,0 +1,48 @@
+"""
+Writes synthesized manifests as a single stream, e.g. for `kubectl apply -f -`.
+
+Imports neither cdk8s nor the JSII runtime, so the CLI can use it to parse
+options.
+"""
+
+import json
+from enum import Enum
+from typing import BinaryIO
+
+from lab.libs.exceptions import LabError
+from lab.libs.k8s.documents import load_synthesized
+
+
+class OutputFormat(str, Enum):
+    YAML = "yaml"
+    JSONL = "jsonl"
+
+
+def write_stream(
+    stream: BinaryIO, files: dict[str, bytes], output_format: OutputFormat
+) -> None:
+    """
+    Writes the objects in synthesized files to `stream`, in order of file name.
+
+    As YAML, files are written unchanged, each starting a new document, so the
+    stream holds exactly the synthesized output. As JSON lines, each object is
+    loaded as cdk8s wrote it, and written as compact JSON on its own line.
+    """
+    for name, data in sorted(files.items()):
+        # charts without objects synthesize empty files
+        if not data.strip():
+            continue
+
+        if output_format is OutputFormat.YAML:
+            stream.write(b"---\n" + data)
+            continue
+
+        try:
+            documents = load_synthesized(data.decode())
+        except ValueError as e:
+            raise LabError(f"cannot write {name} as JSON: {e}") from e
+
+        stream.writelines(
+            json.dumps(x, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+            for x in documents
+        )
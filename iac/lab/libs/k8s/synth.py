@@ -0,0 +1,53 @@
+import os
+import tempfile
+from collections.abc import Callable
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from lab.libs.profile import profile
+
+if TYPE_CHECKING:
+    from cdk8s import App
+
+
+def get_outdir() -> Path:
+    """
+    Returns the directory `cdk8s.App` synthesizes to by default.
+    """
+    return Path(os.environ.get("CDK8S_OUTDIR", "dist"))
+
+
+def synth_files(build: Callable[["App"], None]) -> dict[str, bytes]:
+    """
+    Builds an App with `build`, synthesizes it to a temporary directory, and
+    returns the synthesized files by name.
+    """
+    # imported here, so that reading and writing files does not load JSII
+    from cdk8s import App
+
+    with tempfile.TemporaryDirectory(prefix="lab-synth-") as outdir:
+        app = App(outdir=outdir)
+        build(app)
+
+        with profile("app.synth"):
+            app.synth()
+
+        return {x.name: x.read_bytes() for x in sorted(Path(outdir).iterdir())}
+
+
+def write_files(outdir: Path, files: dict[str, bytes]) -> None:
+    with profile("write files"):
+        outdir.mkdir(parents=True, exist_ok=True)
+
+        for name, data in files.items():
+            (outdir / name).write_bytes(data)
+
+
+def read_files(outdir: Path) -> dict[str, bytes]:
+    """
+    Returns the files previously synthesized to `outdir`, by name.
+    """
+    if not outdir.is_dir():
+        return {}
+
+    return {x.name: x.read_bytes() for x in sorted(outdir.iterdir()) if x.is_file()}
@@ -0,0 +1,137 @@
+"""
+Reloads changed modules of the lab package, and the modules which import them,
+so that a long-lived process runs the current sources.
+"""
+
+import ast
+import graphlib
+import importlib
+import sys
+from collections.abc import Iterable
+from pathlib import Path
+
+# the root of the lab package, which has no __init__ and so no __file__
+PACKAGE_ROOT = Path(__file__).parents[1]
+
+# modules which are running, and so are never reloaded
+_NOT_RELOADED = ("lab.__main__", "lab.cli", "lab.libs.modules", "lab.libs.watch")
+
+
+def module_name(path: Path) -> str:
+    """
+    Returns the name of the module at `path`, within the lab package.
+    """
+    parts = path.resolve().relative_to(PACKAGE_ROOT.parent).with_suffix("").parts
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+
+    return ".".join(parts)
+
+
+def _imports(path: Path) -> set[str]:
+    imported = set()
+
+    for node in ast.walk(ast.parse(path.read_bytes(), str(path))):
+        if isinstance(node, ast.Import):
+            imported.update(x.name for x in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            # names may be submodules, e.g. `from lab.charts import grafana`
+            imported.add(node.module)
+            imported.update(f"{node.module}.{x.name}" for x in node.names)
+
+    return imported
+
+
+def import_graph() -> dict[str, set[str]]:
+    """
+    Returns the modules of the lab package which each module imports, found in
+    its source, including imports within functions.
+    """
+    paths = {module_name(x): x for x in PACKAGE_ROOT.rglob("*.py")}
+
+    # including modules which no longer exist, whose importers must be reloaded
+    return {
+        name: {x for x in _imports(path) if x == "lab" or x.startswith("lab.")}
+        for name, path in paths.items()
+    }
+
+
+def imported_sources(names: Iterable[str]) -> list[Path]:
+    """
+    Returns the sources of the modules `names`, and of the modules of the lab
+    package which they import, directly or indirectly.
+    """
+    paths = {module_name(x): x for x in PACKAGE_ROOT.rglob("*.py")}
+    graph = import_graph()
+
+    found = {x for x in names if x in paths}
+    stack = list(found)
+    while stack:
+        # imported names may be objects rather than modules, e.g. classes
+        for x in graph.get(stack.pop(), set()) & paths.keys() - found:
+            found.add(x)
+            stack.append(x)
+
+    return sorted(paths[x] for x in found)
+
+
+def _is_reloaded(name: str) -> bool:
+    return not any(name == x or name.startswith(f"{x}.") for x in _NOT_RELOADED)
+
+
+def dependents(graph: dict[str, set[str]], changed: Iterable[str]) -> set[str]:
+    """
+    Returns the changed modules, and the modules which import them, directly or
+    indirectly.
+    """
+    importers: dict[str, set[str]] = {}
+    for name, imported in graph.items():
+        for x in imported:
+            importers.setdefault(x, set()).add(name)
+
+    found = set(changed)
+    stack = list(found)
+    while stack:
+        for x in importers.get(stack.pop(), set()) - found:
+            found.add(x)
+            stack.append(x)
+
+    return found
+
+
+def reload_modules(paths: Iterable[Path]) -> list[str]:
+    """
+    Reloads the modules at `paths`, and the loaded modules which import them,
+    each after the modules it imports. Returns the names of the reloaded
+    modules.
+
+    Modules which are running, e.g. the CLI, are not reloaded, and keep
+    references to the objects they imported, such as exception classes.
+    """
+    names = {
+        module_name(x)
+        for x in paths
+        if x.suffix == ".py" and x.resolve().is_relative_to(PACKAGE_ROOT)
+    }
+    names = {x for x in names if _is_reloaded(x)}
+    if not names:
+        return []
+
+    # modules which import running modules need not reload with them
+    graph = {k: v for k, v in import_graph().items() if _is_reloaded(k)}
+
+    # deleted modules are not in the graph, but their importers are reloaded
+    affected = {x for x in dependents(graph, names) if x in graph and x in sys.modules}
+
+    sorter = graphlib.TopologicalSorter(
+        {x: graph.get(x, set()) & affected for x in affected}
+    )
+    try:
+        order = list(sorter.static_order())
+    except graphlib.CycleError:
+        order = sorted(affected)
+
+    for name in order:
+        importlib.reload(sys.modules[name])
+
+    return order
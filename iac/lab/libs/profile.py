@@ -0,0 +1,196 @@
+import json
+import time
+from collections.abc import Generator, Iterable
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Optional, TextIO
+
+from rich import print
+from rich.table import Table
+
+from lab.libs.cache import write_atomic
+
+
+class Span:
+    """
+    A timed phase, in nanoseconds relative to the start of its profile.
+    """
+
+    def __init__(self, name: str, start: int):
+        self.name = name
+        self.start = start
+        self.end = start
+        self.children: list["Span"] = []
+
+    @property
+    def duration(self) -> int:
+        return self.end - self.start
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "start_ms": self.start / 1e6,
+            "duration_ms": self.duration / 1e6,
+            "children": [x.to_json() for x in self.children],
+        }
+
+
+class Profile:
+    """
+    The spans recorded in a single process.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.spans: list[Span] = []
+
+    def walk(self) -> Iterable[Span]:
+        stack = list(reversed(self.spans))
+        while stack:
+            span = stack.pop()
+            yield span
+            stack.extend(reversed(span.children))
+
+
+class Profiler:
+    """
+    Records the wall time of nested phases.
+    """
+
+    def __init__(self, name: str):
+        self.profile = Profile(name)
+        self._origin = time.perf_counter_ns()
+        self._stack: list[Span] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Generator[None, None, None]:
+        span = Span(name, time.perf_counter_ns() - self._origin)
+        (self._stack[-1].children if self._stack else self.profile.spans).append(span)
+        self._stack.append(span)
+
+        try:
+            yield
+        finally:
+            span.end = time.perf_counter_ns() - self._origin
+            self._stack.pop()
+
+
+_profiler: Optional[Profiler] = None
+
+
+def enable_profiling(name: str) -> Profiler:
+    global _profiler
+    _profiler = Profiler(name)
+    return _profiler
+
+
+def disable_profiling() -> None:
+    global _profiler
+    _profiler = None
+
+
+@contextmanager
+def profile(name: str) -> Generator[None, None, None]:
+    """
+    Records the enclosed code as a phase, if profiling is enabled.
+    """
+    if _profiler is None:
+        yield
+        return
+
+    with _profiler.phase(name):
+        yield
+
+
+def summary_table(profiles: Iterable[Profile]) -> Table:
+    """
+    Returns the total time of each phase across profiles, longest first.
+    """
+    totals: dict[str, list[int]] = {}
+
+    for p in profiles:
+        for span in p.walk():
+            calls, duration = totals.get(span.name, [0, 0])
+            totals[span.name] = [calls + 1, duration + span.duration]
+
+    table = Table("phase", "calls", "total (ms)", "mean (ms)")
+    for name, (calls, duration) in sorted(totals.items(), key=lambda x: -x[1][1]):
+        table.add_row(
+            name,
+            str(calls),
+            f"{duration / 1e6:.1f}",
+            f"{duration / calls / 1e6:.1f}",
+        )
+
+    return table
+
+
+def to_json(profiles: Iterable[Profile]) -> dict[str, Any]:
+    return {
+        "profiles": [
+            {"name": p.name, "spans": [x.to_json() for x in p.spans]} for p in profiles
+        ]
+    }
+
+
+def to_speedscope(name: str, profiles: Iterable[Profile]) -> dict[str, Any]:
+    """
+    Returns the profiles in speedscope's evented format, one per process.
+
+    See https://github.com/jlfwong/speedscope/wiki/Importing-from-custom-sources
+    """
+    frames: dict[str, int] = {}
+    speedscope_profiles = []
+
+    def events(span: Span) -> Iterable[dict[str, Any]]:
+        frame = frames.setdefault(span.name, len(frames))
+        yield {"type": "O", "frame": frame, "at": span.start / 1e6}
+        for child in span.children:
+            yield from events(child)
+        yield {"type": "C", "frame": frame, "at": span.end / 1e6}
+
+    for p in profiles:
+        speedscope_profiles.append(
+            {
+                "type": "evented",
+                "name": p.name,
+                "unit": "milliseconds",
+                "startValue": min((x.start for x in p.spans), default=0) / 1e6,
+                "endValue": max((x.end for x in p.spans), default=0) / 1e6,
+                "events": [e for x in p.spans for e in events(x)],
+            }
+        )
+
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "labcli",
+        "shared": {"frames": [{"name": x} for x in frames]},
+        "profiles": speedscope_profiles,
+    }
+
+
+def write_profiles(outdir: Path, name: str, profiles: list[Profile]) -> list[Path]:
+    """
+    Writes the profiles as JSON and as a speedscope profile, returning the
+    paths written.
+    """
+    paths = [outdir / f"{name}.json", outdir / f"{name}.speedscope.json"]
+
+    for path, data in zip(paths, [to_json(profiles), to_speedscope(name, profiles)]):
+        write_atomic(path, (json.dumps(data, indent=2) + "\n").encode())
+
+    return paths
+
+
+def report_profiles(
+    outdir: Path, name: str, profiles: list[Profile], *, file: Optional[TextIO] = None
+) -> None:
+    """
+    Prints a summary of the profiles to `file`, or stdout, and writes them to
+    `outdir`.
+    """
+    print(summary_table(profiles), file=file)
+
+    for path in write_profiles(outdir, name, profiles):
+        print(f"wrote {path}", file=file)
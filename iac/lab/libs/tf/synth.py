@@ -0,0 +1,104 @@
+import json
+import shutil
+import tempfile
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Any, NamedTuple, Optional
+
+from cdktf import App
+
+from lab.libs.cache import write_atomic
+from lab.libs.profile import profile
+
+# written by `cdktf.App.synth`, listing the synthesized stacks
+MANIFEST_FILE = "manifest.json"
+
+
+class SynthesizedStack(NamedTuple):
+    name: str
+    # by path relative to the output directory, e.g. "stacks/x/cdk.tf.json"
+    files: dict[str, bytes]
+    # the stack's entry in the manifest
+    manifest: dict[str, Any]
+    # of the manifest, i.e. cdktf's version
+    version: str
+
+
+def synth_stack_files(
+    name: str, build: Callable[[App], None], *, context: dict[str, Any]
+) -> SynthesizedStack:
+    """
+    Builds an App holding the stack `name` with `build`, synthesizes it to a
+    temporary directory, and returns the synthesized files.
+    """
+    with tempfile.TemporaryDirectory(prefix="lab-synth-") as outdir:
+        app = App(outdir=outdir, context=context)
+        build(app)
+
+        with profile("app.synth"):
+            app.synth()
+
+        root = Path(outdir)
+        manifest = json.loads((root / MANIFEST_FILE).read_text())
+
+        return SynthesizedStack(
+            name=name,
+            files={
+                str(x.relative_to(root)): x.read_bytes()
+                for x in sorted((root / "stacks" / name).rglob("*"))
+                if x.is_file()
+            },
+            manifest=manifest["stacks"][name],
+            version=manifest["version"],
+        )
+
+
+def read_manifest(outdir: Path) -> dict[str, Any]:
+    """
+    Returns the manifest previously written to `outdir`, or an empty one.
+    """
+    try:
+        return json.loads((outdir / MANIFEST_FILE).read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"version": "", "stacks": {}}
+
+
+def write_stacks(
+    outdir: Path,
+    stacks: Iterable[SynthesizedStack],
+    *,
+    stack_names: Optional[Iterable[str]] = None,
+) -> None:
+    """
+    Writes synthesized stacks to `outdir`, replacing their previous files, and
+    a manifest listing them, as if they were synthesized by a single App.
+
+    The manifest is merged with the previous one, so other stacks keep their
+    entries, unless they are not in `stack_names`, e.g. removed stacks.
+    """
+    stacks = list(stacks)
+    previous = read_manifest(outdir)
+    kept = {
+        k: v
+        for k, v in previous["stacks"].items()
+        if stack_names is None or k in stack_names
+    }
+
+    with profile("write files"):
+        for stack in stacks:
+            shutil.rmtree(outdir / "stacks" / stack.name, ignore_errors=True)
+
+            for name, data in stack.files.items():
+                path = outdir / name
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(data)
+
+        manifest = {
+            "version": stacks[0].version if stacks else previous["version"],
+            "stacks": {**kept, **{x.name: x.manifest for x in stacks}},
+        }
+        # as written by cdktf, with sorted keys
+        write_atomic(
+            outdir / MANIFEST_FILE,
+            json.dumps(manifest, indent=2, sort_keys=True).encode(),
+        )
@@ -0,0 +1,243 @@
+"""
+Waits for changes to files, with inotify on Linux, or by polling elsewhere.
+
+Watchers watch Python sources in directories, recursively, and individual
+files. Files are watched through their directory, as editors often replace a
+file rather than write to it.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from collections.abc import Iterable
+from pathlib import Path
+from types import TracebackType
+from typing import Optional, Union
+
+# see inotify(7)
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_Q_OVERFLOW = 0x4000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+
+_EVENT = struct.Struct("iIII")
+
+# changes which arrive within this many seconds of each other are batched,
+# e.g. an editor writing a backup, then the file
+DEBOUNCE = 0.1
+
+
+class _BaseWatcher:
+    def __init__(self, directories: Iterable[Path], files: Iterable[Path]):
+        self.directories = [x.resolve() for x in directories]
+        self.files = {x.resolve() for x in files}
+
+    def matches(self, path: Path) -> bool:
+        return path in self.files or (
+            path.suffix == ".py"
+            and any(path.is_relative_to(x) for x in self.directories)
+        )
+
+    def watched(self) -> set[Path]:
+        """
+        Returns the watched files which exist.
+        """
+        paths = {x for x in self.files if x.exists()}
+        for directory in self.directories:
+            paths.update(x for x in directory.rglob("*.py") if x.is_file())
+
+        return paths
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "_BaseWatcher":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+
+class PollingWatcher(_BaseWatcher):
+    """
+    Finds changes by comparing the modification time and size of files.
+    """
+
+    def __init__(
+        self,
+        directories: Iterable[Path],
+        files: Iterable[Path],
+        *,
+        interval: float = 0.5,
+    ):
+        super().__init__(directories, files)
+        self.interval = interval
+        self._snapshot = self._stat()
+
+    def _stat(self) -> dict[Path, tuple[int, int]]:
+        snapshot = {}
+        for path in self.watched():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+
+        return snapshot
+
+    def wait(self, timeout: Optional[float] = None) -> set[Path]:
+        """
+        Returns the files which changed, were created or were deleted, waiting
+        until there are some, or for at most `timeout` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            snapshot = self._stat()
+            changed = {
+                x
+                for x in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(x) != self._snapshot.get(x)
+            }
+            self._snapshot = snapshot
+
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+            time.sleep(self.interval)
+
+
+class InotifyWatcher(_BaseWatcher):
+    """
+    Finds changes with inotify, which the kernel reports as they happen.
+    """
+
+    def __init__(self, directories: Iterable[Path], files: Iterable[Path]):
+        super().__init__(directories, files)
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+
+        self._fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        self._dirs: dict[int, Path] = {}
+        try:
+            for directory in self.directories:
+                for x in [directory, *directory.rglob("*")]:
+                    if x.is_dir() and x.name != "__pycache__":
+                        self._watch(x)
+
+            for x in self.files:
+                self._watch(x.parent)
+        except OSError:
+            self.close()
+            raise
+
+    def _watch(self, directory: Path) -> None:
+        wd = self._add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), str(directory))
+
+        self._dirs[wd] = directory
+
+    def _read(self) -> set[Path]:
+        changed = set()
+
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size : offset + _EVENT.size + length]
+            offset += _EVENT.size + length
+
+            if mask & _IN_Q_OVERFLOW:
+                # events were lost, so anything may have changed
+                return self.watched()
+
+            if not (directory := self._dirs.get(wd)):
+                continue
+
+            path = directory / os.fsdecode(name.rstrip(b"\0"))
+            if mask & _IN_ISDIR:
+                if mask & (_IN_CREATE | _IN_MOVED_TO) and any(
+                    path.is_relative_to(x) for x in self.directories
+                ):
+                    self._watch(path)
+                    changed.update(x for x in path.rglob("*.py") if x.is_file())
+            elif self.matches(path):
+                changed.add(path)
+
+        return changed
+
+    def wait(self, timeout: Optional[float] = None) -> set[Path]:
+        """
+        Returns the files which changed, were created or were deleted, waiting
+        until there are some, or for at most `timeout` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed: set[Path] = set()
+
+        while True:
+            remaining = (
+                None if deadline is None else max(0, deadline - time.monotonic())
+            )
+            if changed:
+                remaining = DEBOUNCE
+
+            ready, _, _ = select.select([self._fd], [], [], remaining)
+            if not ready:
+                if changed or deadline is not None:
+                    return changed
+
+                continue
+
+            changed |= self._read()
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+Watcher = Union[InotifyWatcher, PollingWatcher]
+
+
+def make_watcher(directories: Iterable[Path], files: Iterable[Path]) -> Watcher:
+    """
+    Returns a watcher which uses inotify if it is available, and polls
+    otherwise.
+    """
+    directories, files = list(directories), list(files)
+
+    try:
+        return InotifyWatcher(directories, files)
+    except OSError:
+        return PollingWatcher(directories, files)
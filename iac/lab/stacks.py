@@ -1,21 +1,105 @@
+import json
+import multiprocessing
+import os
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import version
+from itertools import repeat
+from pathlib import Path
+from typing import Any, NamedTuple, Optional
+
 from constructs import Construct
-from cdktf import TerraformStack, TerraformVariable
+from cdktf import (
+    App,
+    CloudBackend,
+    DataTerraformRemoteState,
+    NamedCloudWorkspace,
+    NamedRemoteWorkspace,
+    TerraformOutput,
+    TerraformStack,
+    TerraformVariable,
+)
 
 from imports.oci.provider import OciProvider
 from imports.oci.identity_compartment import IdentityCompartment
 
 from lab.constructs import Budget, KubernetesCluster
+from lab.libs.cache import stable_hash
+from lab.libs.fingerprint import hash_sources, version_constants
+from lab.libs.modules import imported_sources, module_name
+from lab.libs.profile import Profile, enable_profiling, profile
+from lab.libs.tf.synth import SynthesizedStack, synth_stack_files
+
+# construct class attributes which pin the version of what the construct deploys
+VERSION_CONSTANTS = [
+    "CONTROL_PLANE_VERSION",
+    "WORKER_NODE_VERSION",
+    "PINNED_WORKER_IMAGE",
+]
+
+# packages whose version affects the synthesized output of every stack
+SYNTH_PACKAGES = ["cdktf", "constructs"]
+
+# pins the versions of the providers and modules, from which the bindings in
+# `imports` are generated
+CDKTF_JSON = Path(__file__).parents[1] / "cdktf.json"
+
+# resources of the former single stack, by the stack which now defines them.
+# Their addresses are unchanged, but they were in the `lab` workspace, which
+# the cluster stack keeps, so the cluster stack declares them removed, rather
+# than destroying them. See "Terraform stacks" in the README
+MOVED_RESOURCES = {
+    "billing": [
+        "oci_budget_budget.budget_budget-primary_91417F4C",
+        "oci_budget_alert_rule.budget_budget-primary-forecasted-1000_45354669",
+        "oci_budget_alert_rule.budget_budget-primary-forecasted-2000_A1E0C5D9",
+        "oci_budget_alert_rule.budget_budget-primary-actual-500_E3402509",
+        "oci_budget_alert_rule.budget_budget-primary-actual-1000_0BCEC8CF",
+        "oci_budget_alert_rule.budget_budget-primary-actual-2000_787B9A97",
+    ],
+    "identity": ["oci_identity_compartment.compartment-lab"],
+}
+
+
+class TerraformCloud(NamedTuple):
+    """
+    Args:
+        organization: the Terraform Cloud organization
+        workspace: the workspace of the cluster stack, which prefixes the
+            workspaces of the other stacks
+    """
 
+    organization: str
+    workspace: str
 
-class Lab(TerraformStack):
-    def __init__(
-        self,
-        scope: Construct,
-        id: str,
-    ):
+    def workspace_name(self, stack: str) -> str:
+        # the cluster keeps the workspace of the former single stack, as its
+        # state is the slowest to move
+        return self.workspace if stack == "cluster" else f"{self.workspace}-{stack}"
+
+
+class OciStack(TerraformStack):
+    """
+    A stack whose state is kept in its own Terraform Cloud workspace, so that
+    it is planned without refreshing the resources of other stacks.
+    """
+
+    # the stacks whose outputs this stack reads, which must be applied first
+    DEPENDS_ON: Sequence[str] = ()
+    # the classes of the constructs in `lab.constructs` the stack defines
+    CONSTRUCTS: Sequence[type[Construct]] = ()
+
+    def __init__(self, scope: Construct, id: str, *, cloud: TerraformCloud):
         super().__init__(scope, id)
+        self.cloud = cloud
+
+        CloudBackend(
+            self,
+            organization=cloud.organization,
+            workspaces=NamedCloudWorkspace(cloud.workspace_name(id)),
+        )
 
-        tenancy_ocid = TerraformVariable(self, "oci_tenancy_ocid", type="string")
+        self.tenancy_ocid = TerraformVariable(self, "oci_tenancy_ocid", type="string")
         user_ocid = TerraformVariable(self, "oci_user_ocid", type="string")
         fingerprint = TerraformVariable(self, "oci_fingerprint", type="string")
         region = TerraformVariable(self, "oci_region", type="string")
@@ -23,42 +107,201 @@ class Lab(TerraformStack):
             self, "oci_private_key", type="string", sensitive=True
         )
 
-        alerts_email = TerraformVariable(self, "alerts_email", type="string")
-
-        oci = OciProvider(
+        self.oci = OciProvider(
             self,
             "oci",
-            tenancy_ocid=tenancy_ocid.string_value,
+            tenancy_ocid=self.tenancy_ocid.string_value,
             user_ocid=user_ocid.string_value,
             fingerprint=fingerprint.string_value,
             region=region.string_value,
             private_key=private_key.string_value,
         )
 
+    def remote_state(self, stack: str) -> DataTerraformRemoteState:
+        """
+        Returns the outputs of `stack`, read from its workspace.
+        """
+        return DataTerraformRemoteState(
+            self,
+            f"remote-state-{stack}",
+            organization=self.cloud.organization,
+            workspaces=NamedRemoteWorkspace(self.cloud.workspace_name(stack)),
+        )
+
+
+class BillingStack(OciStack):
+    CONSTRUCTS = [Budget]
+
+    def __init__(self, scope: Construct, id: str, *, cloud: TerraformCloud):
+        super().__init__(scope, id, cloud=cloud)
+
+        alerts_email = TerraformVariable(self, "alerts_email", type="string")
+
         Budget(
             self,
             "budget",
             name="primary",
-            compartment_id=tenancy_ocid.string_value,
+            compartment_id=self.tenancy_ocid.string_value,
             amount=15,
             forecasted_alert_thresholds=[100.0, 200.0],
             actual_alert_thresholds=[50.0, 100.0, 200.0],
             alert_recipients=[alerts_email.string_value],
         )
 
+
+class IdentityStack(OciStack):
+    def __init__(self, scope: Construct, id: str, *, cloud: TerraformCloud):
+        super().__init__(scope, id, cloud=cloud)
+
         lab = IdentityCompartment(
             self,
             "compartment-lab",
-            compartment_id=tenancy_ocid.string_value,
+            compartment_id=self.tenancy_ocid.string_value,
             description="Lab",
             name="lab",
         )
 
+        TerraformOutput(self, "lab_compartment_id", value=lab.id)
+        # the cluster was created in the parent of the lab compartment, and
+        # moving it would replace it
+        TerraformOutput(self, "cluster_compartment_id", value=lab.compartment_id)
+
+
+class ClusterStack(OciStack):
+    DEPENDS_ON = ["identity"]
+    CONSTRUCTS = [KubernetesCluster]
+
+    def __init__(self, scope: Construct, id: str, *, cloud: TerraformCloud):
+        super().__init__(scope, id, cloud=cloud)
+
+        # needs Terraform 1.7
+        self.add_override(
+            "removed",
+            [
+                {"from": x, "lifecycle": {"destroy": False}}
+                for addresses in MOVED_RESOURCES.values()
+                for x in addresses
+            ],
+        )
+
+        identity = self.remote_state("identity")
+
         KubernetesCluster(
             self,
             "cluster-lab",
             name="lab",
-            oci_provider=oci,
-            tenancy_id=tenancy_ocid.string_value,
-            compartment_id=lab.compartment_id,
+            oci_provider=self.oci,
+            tenancy_id=self.tenancy_ocid.string_value,
+            compartment_id=identity.get_string("cluster_compartment_id"),
+        )
+
+
+STACKS: dict[str, type[OciStack]] = {
+    "billing": BillingStack,
+    "identity": IdentityStack,
+    "cluster": ClusterStack,
+}
+
+
+def _shared_sources() -> list[Path]:
+    # the composition in this module, the package through which it imports
+    # constructs, and the library which synthesizes it, with its imports
+    root = Path(__file__).parent
+    return imported_sources(
+        module_name(x) for x in (root / "libs" / "tf").rglob("*.py")
+    ) + [Path(__file__), root / "constructs" / "__init__.py"]
+
+
+def fingerprint_stack(name: str, cloud: TerraformCloud, context: dict[str, Any]) -> str:
+    """
+    Returns a hash of everything that affects the synthesized stack: its
+    sources and versions, the providers and modules it uses, and its backend.
+    """
+    stack = STACKS[name]
+    cdktf_json = json.loads(CDKTF_JSON.read_text())
+
+    return stable_hash(
+        {
+            "versions": {
+                x.__name__: version_constants(x, VERSION_CONSTANTS)
+                for x in stack.CONSTRUCTS
+            },
+            "sources": hash_sources(
+                imported_sources({x.__module__ for x in stack.CONSTRUCTS})
+                + _shared_sources()
+            ),
+            "providers": cdktf_json.get("terraformProviders", []),
+            "modules": cdktf_json.get("terraformModules", []),
+            "packages": {x: version(x) for x in SYNTH_PACKAGES},
+            "backend": cloud._asdict(),
+            "context": context,
+            # read by the JSII runtime, writing cdk.tf rather than cdk.tf.json
+            "hcl": os.environ.get("SYNTH_HCL_OUTPUT"),
+        }
+    )
+
+
+def synth_stack(
+    name: str, cloud: TerraformCloud, context: dict[str, Any]
+) -> SynthesizedStack:
+    """
+    Synthesizes a single stack in its own App.
+    """
+
+    def build(app: App) -> None:
+        with profile(f"construct {name}"):
+            STACKS[name](app, name, cloud=cloud)
+
+    stack = synth_stack_files(name, build, context=context)
+
+    # stacks read each other's outputs from their workspaces, so cdktf does
+    # not know they depend on each other
+    stack.manifest["dependencies"] = list(STACKS[name].DEPENDS_ON)
+    return stack
+
+
+def _synth_stack_worker(
+    name: str, cloud: TerraformCloud, context: dict[str, Any], profiling: bool
+) -> tuple[SynthesizedStack, Optional[Profile]]:
+    profiler = enable_profiling(f"worker: {name}") if profiling else None
+
+    return synth_stack(name, cloud, context), profiler.profile if profiler else None
+
+
+def synth_stacks(
+    cloud: TerraformCloud,
+    *,
+    jobs: int,
+    context: dict[str, Any],
+    stacks: Optional[Iterable[str]] = None,
+    profiling: bool = False,
+) -> tuple[list[SynthesizedStack], list[Profile]]:
+    """
+    Synthesizes `stacks`, or all stacks, each in its own App. With more than
+    one job, stacks are synthesized concurrently in worker processes, each with
+    its own JSII runtime.
+
+    Returns the synthesized stacks, in order, and the profiles recorded by
+    workers, if `profiling` is set.
+    """
+    stacks = list(STACKS if stacks is None else stacks)
+
+    if jobs == 1 or len(stacks) <= 1:
+        return [synth_stack(x, cloud, context) for x in stacks], []
+
+    # the JSII runtime is a child process of the parent, so workers must not
+    # be forked from it
+    mp_context = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=mp_context) as pool:
+        results = list(
+            pool.map(
+                _synth_stack_worker,
+                stacks,
+                repeat(cloud),
+                repeat(context),
+                repeat(profiling),
+            )
         )
+
+    return [x for x, _ in results], [x for _, x in results if x]
@@ -0,0 +1,208 @@
+"""
+Helpers for testing charts. Each chart is synthesized once per test session,
+and its objects are indexed for queries by kind, name, namespace and label, and
+compared against snapshots of their hashes.
+"""
+
+import json
+import os
+from collections.abc import Callable, Iterator, Sequence
+from pathlib import Path
+from re import Pattern
+from typing import Any, Optional, Union
+
+import cdk8s
+
+from lab.libs.cache import stable_hash, write_atomic
+from lab.libs.cli import make_envvar
+from lab.libs.k8s.diff import ObjectKey
+
+# set to write snapshots, rather than compare against them
+UPDATE_SNAPSHOTS_ENVVAR = make_envvar("UPDATE_SNAPSHOTS")
+
+Name = Union[str, Pattern]
+
+
+class Resources:
+    """
+    The objects of a synthesized chart, indexed so that queries only scan the
+    objects of a kind.
+
+    Args:
+        objects: the objects, as returned by `Chart.to_json`
+        chart: the chart, if the objects were synthesized from one
+    """
+
+    def __init__(self, objects: Sequence[Any], chart: Optional[cdk8s.Chart] = None):
+        self.objects = list(objects)
+        self.chart = chart
+
+        self._by_kind: dict[str, list[int]] = {}
+        self._by_name: dict[tuple[str, str], list[int]] = {}
+        self._by_namespace: dict[str, set[int]] = {}
+        self._by_label: dict[tuple[str, str], set[int]] = {}
+
+        for i, x in enumerate(self.objects):
+            kind = x.get("kind")
+            metadata = x.get("metadata", {})
+
+            self._by_kind.setdefault(kind, []).append(i)
+            self._by_name.setdefault((kind, metadata.get("name")), []).append(i)
+            self._by_namespace.setdefault(metadata.get("namespace"), set()).add(i)
+            for label in (metadata.get("labels") or {}).items():
+                self._by_label.setdefault(label, set()).add(i)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.objects)
+
+    def __len__(self) -> int:
+        return len(self.objects)
+
+    def find(
+        self,
+        kind: Optional[str] = None,
+        name: Optional[Name] = None,
+        *,
+        namespace: Optional[str] = None,
+        labels: Optional[dict[str, str]] = None,
+    ) -> list[Any]:
+        """
+        Returns the objects which match every given filter, in order. Patterns
+        match the start of names, as `re.match` does.
+        """
+        if kind is not None and isinstance(name, str):
+            indices = self._by_name.get((kind, name), [])
+        elif kind is not None:
+            indices = self._by_kind.get(kind, [])
+        else:
+            indices = list(range(len(self.objects)))
+
+        if namespace is not None:
+            in_namespace = self._by_namespace.get(namespace, set())
+            indices = [x for x in indices if x in in_namespace]
+
+        for label in (labels or {}).items():
+            labelled = self._by_label.get(label, set())
+            indices = [x for x in indices if x in labelled]
+
+        objects = [self.objects[x] for x in indices]
+        if isinstance(name, str):
+            return [x for x in objects if x.get("metadata", {}).get("name") == name]
+        if isinstance(name, Pattern):
+            return [
+                x
+                for x in objects
+                if name.match(x.get("metadata", {}).get("name") or "")
+            ]
+
+        return objects
+
+    def get(
+        self,
+        kind: Optional[str] = None,
+        name: Optional[Name] = None,
+        *,
+        namespace: Optional[str] = None,
+        labels: Optional[dict[str, str]] = None,
+    ) -> Any:
+        """
+        Returns the first object which matches, see `find`, or None.
+        """
+        objects = self.find(kind, name, namespace=namespace, labels=labels)
+        return objects[0] if objects else None
+
+    def one(
+        self,
+        kind: Optional[str] = None,
+        name: Optional[Name] = None,
+        *,
+        namespace: Optional[str] = None,
+        labels: Optional[dict[str, str]] = None,
+    ) -> Any:
+        """
+        Returns the only object which matches, see `find`.
+        """
+        objects = self.find(kind, name, namespace=namespace, labels=labels)
+        if len(objects) != 1:
+            raise LookupError(
+                f"expected one {kind or 'object'} named {name}, found {len(objects)}"
+            )
+
+        return objects[0]
+
+
+# synthesized charts, by key, for the rest of the session
+_SYNTHESIZED: dict[str, Resources] = {}
+
+
+def synth_chart(key: str, build: Callable[[cdk8s.App], cdk8s.Chart]) -> Resources:
+    """
+    Returns the objects of the chart defined by `build`, which is synthesized
+    once per session. `key` must identify the chart and its config, and the
+    objects, which are shared by tests, must not be modified.
+    """
+    if key not in _SYNTHESIZED:
+        chart = build(cdk8s.Testing.app())
+        _SYNTHESIZED[key] = Resources(chart.to_json(), chart)
+
+    return _SYNTHESIZED[key]
+
+
+def object_hashes(resources: Resources) -> dict[str, str]:
+    """
+    Returns the hash of each object, by its apiVersion, kind, namespace and
+    name.
+    """
+    hashes = {}
+
+    for x in resources:
+        metadata = x.get("metadata", {})
+        key = str(
+            ObjectKey(
+                x.get("apiVersion"),
+                x.get("kind"),
+                metadata.get("namespace") or "",
+                metadata.get("name"),
+            )
+        )
+        if key in hashes:
+            raise ValueError(f"{key} is defined more than once")
+
+        hashes[key] = stable_hash(x)
+
+    return hashes
+
+
+def assert_snapshot(resources: Resources, path: Path) -> None:
+    """
+    Raises AssertionError unless the objects are unchanged since the snapshot
+    at `path` was written, or if there is no snapshot. Set
+    `LAB_UPDATE_SNAPSHOTS=1` to write it, and review the changed objects in the
+    synthesized output before committing it.
+    """
+    hashes = object_hashes(resources)
+
+    if os.environ.get(UPDATE_SNAPSHOTS_ENVVAR):
+        write_atomic(
+            path, (json.dumps(hashes, indent=2, sort_keys=True) + "\n").encode()
+        )
+        return
+
+    if not path.exists():
+        raise AssertionError(
+            f"no snapshot at {path}, set {UPDATE_SNAPSHOTS_ENVVAR}=1 to write it"
+        )
+
+    expected: dict[str, str] = json.loads(path.read_text())
+    if hashes == expected:
+        return
+
+    lines = [f"+ {x}" for x in hashes if x not in expected]
+    lines += [f"- {x}" for x in expected if x not in hashes]
+    lines += [f"~ {x}" for x, v in hashes.items() if x in expected and expected[x] != v]
+
+    raise AssertionError(
+        f"objects differ from the snapshot at {path}:\n"
+        + "\n".join(lines)
+        + f"\nset {UPDATE_SNAPSHOTS_ENVVAR}=1 to update it"
+    )
@@ -4,11 +4,11 @@ from typing import Any
 from lab.charts.bitwarden import Bitwarden
 from pydantic import SecretStr
 import pytest
-import cdk8s
 
 
-from lab.libs.config import BitwardenConfig, BitwardenSmtpConfig
-from tests.utils import get_resource
+from lab.libs.config import BitwardenConfig, BitwardenSmtpConfig, ResourcesConfig
+from lab.testing import Resources, assert_snapshot, synth_chart
+from tests.utils import SNAPSHOT_DIR
 
 
 CONFIG = BitwardenConfig(
@@ -33,31 +33,42 @@ INGRESS_CLASS_NAME = "nginx"
 CLUSTER_ISSUER_NAME = "cluster-issuer"
 
 
-class TestBitwarden:
-    @pytest.fixture(scope="class")
-    def chart(self) -> Generator[list[Any], None, None]:
-        yield Bitwarden(
-            cdk8s.Testing.app(),
+def synth(name: str, resources: ResourcesConfig) -> Resources:
+    return synth_chart(
+        name,
+        lambda app: Bitwarden(
+            app,
             "bitwarden",
             config=CONFIG,
             ingress_class_name=INGRESS_CLASS_NAME,
             cluster_issuer_name=CLUSTER_ISSUER_NAME,
-        ).to_json()
+            resources=resources,
+        ),
+    )
 
+
+class TestBitwarden:
     @pytest.fixture(scope="class")
-    def container(self, chart: list[Any]) -> Generator[dict[str, Any], None, None]:
-        deploy = get_resource(chart, "Deployment", RESOURCE_NAME_PATTERN)
+    def chart(self) -> Resources:
+        return synth("bitwarden", ResourcesConfig())
+
+    @pytest.fixture(scope="class")
+    def container(self, chart: Resources) -> Generator[dict[str, Any], None, None]:
+        deploy = chart.get("Deployment", RESOURCE_NAME_PATTERN)
         yield deploy["spec"]["template"]["spec"]["containers"][0]
 
     @pytest.fixture(scope="class")
-    def ingress(self, chart: list[Any]) -> Generator[dict[str, Any], None, None]:
-        yield get_resource(chart, "Ingress", RESOURCE_NAME_PATTERN)
+    def ingress(self, chart: Resources) -> Generator[dict[str, Any], None, None]:
+        yield chart.get("Ingress", RESOURCE_NAME_PATTERN)
+
+    def test_snapshot(self, chart: Resources) -> None:
+        assert_snapshot(chart, SNAPSHOT_DIR / "bitwarden.json")
 
-    def test_creates_namespace(self, chart: list[Any]) -> None:
-        assert get_resource(chart, "Namespace", "bitwarden")
+    def test_creates_namespace(self, chart: Resources) -> None:
+        assert chart.get("Namespace", "bitwarden")
 
-    def test_configmap(self, chart: list[Any]) -> None:
-        cm = get_resource(chart, "ConfigMap", RESOURCE_NAME_PATTERN)
+    def test_configmap(self, chart: Resources) -> None:
+        cm = chart.get("ConfigMap", RESOURCE_NAME_PATTERN)
         assert {
             "DOMAIN": CONFIG.domain,
             "ICON_BLACKLIST_REGEX": CONFIG.icon_blacklist_regex,
@@ -72,24 +83,43 @@ class TestBitwarden:
             "SMTP_USERNAME": CONFIG.smtp.username,
         } == cm["data"]
 
-    def test_secret(self, chart: list[Any]) -> None:
-        secret = get_resource(chart, "Secret", RESOURCE_NAME_PATTERN)
+    def test_secret(self, chart: Resources) -> None:
+        secret = chart.get("Secret", RESOURCE_NAME_PATTERN)
         assert {
             "ADMIN_TOKEN": CONFIG.admin_token.get_secret_value(),
             "SMTP_PASSWORD": CONFIG.smtp.password.get_secret_value(),
         } == secret["stringData"]
 
-    def test_pvc(self, chart: list[Any]) -> None:
-        pvc = get_resource(chart, "PersistentVolumeClaim", RESOURCE_NAME_PATTERN)
+    def test_pvc(self, chart: Resources) -> None:
+        pvc = chart.get("PersistentVolumeClaim", RESOURCE_NAME_PATTERN)
         assert "15Gi" == pvc["spec"]["resources"]["requests"]["storage"]
         assert ["ReadWriteOncePod"] == pvc["spec"]["accessModes"]
 
     def test_deployment_image(self, container: dict[str, Any]) -> None:
         assert f"vaultwarden/server:{Bitwarden.VERSION}" == container["image"]
 
-    def test_deployment_env(self, chart: list[Any], container: dict[str, Any]) -> None:
-        secret = get_resource(chart, "Secret", RESOURCE_NAME_PATTERN)
-        cm = get_resource(chart, "ConfigMap", RESOURCE_NAME_PATTERN)
+    def test_deployment_resources(self, container: dict[str, Any]) -> None:
+        assert {
+            "requests": {"cpu": "50m", "memory": "128Mi"},
+            "limits": {"cpu": "500m", "memory": "512Mi"},
+        } == container["resources"]
+
+    def test_deployment_resources_by_synthesized_name(self, chart: Resources) -> None:
+        deploy = chart.get("Deployment", RESOURCE_NAME_PATTERN)
+        key = f"{deploy['metadata']['namespace']}/{deploy['metadata']['name']}"
+
+        large = synth("bitwarden-large", ResourcesConfig(workloads={key: "large"}))
+
+        deploy = large.get("Deployment", RESOURCE_NAME_PATTERN)
+        container = deploy["spec"]["template"]["spec"]["containers"][0]
+        assert {
+            "requests": {"cpu": "100m", "memory": "256Mi"},
+            "limits": {"cpu": "1000m", "memory": "1024Mi"},
+        } == container["resources"]
+
+    def test_deployment_env(self, chart: Resources, container: dict[str, Any]) -> None:
+        secret = chart.get("Secret", RESOURCE_NAME_PATTERN)
+        cm = chart.get("ConfigMap", RESOURCE_NAME_PATTERN)
 
         assert 2 == len(container["envFrom"])
         assert {"secretRef": {"name": secret["metadata"]["name"]}} in container[
@@ -113,15 +143,12 @@ class TestBitwarden:
         assert expected_probe.items() <= container["livenessProbe"].items()
         assert expected_probe.items() <= container["readinessProbe"].items()
 
-    def test_resources(self, container: dict[str, Any]) -> None:
-        assert "resources" not in container
-
     def test_security_context(self, container: dict[str, Any]) -> None:
         assert not container["securityContext"]["runAsNonRoot"]
 
-    def test_volume_mounts(self, chart: list[Any], container: dict[str, Any]) -> None:
-        pvc = get_resource(chart, "PersistentVolumeClaim", RESOURCE_NAME_PATTERN)
-        deploy = get_resource(chart, "Deployment", RESOURCE_NAME_PATTERN)
+    def test_volume_mounts(self, chart: Resources, container: dict[str, Any]) -> None:
+        pvc = chart.get("PersistentVolumeClaim", RESOURCE_NAME_PATTERN)
+        deploy = chart.get("Deployment", RESOURCE_NAME_PATTERN)
 
         assert 1 == len(deploy["spec"]["template"]["spec"]["volumes"])
         volume = deploy["spec"]["template"]["spec"]["volumes"][0]
@@ -141,9 +168,9 @@ class TestBitwarden:
         ] == container["volumeMounts"]
 
     def test_ingress_tls_enabled(
-        self, chart: list[Any], ingress: dict[str, Any]
+        self, chart: Resources, ingress: dict[str, Any]
     ) -> None:
-        tls_secret = get_resource(chart, "Secret", re.compile(".*bitwarden-tls.*"))
+        tls_secret = chart.get("Secret", re.compile(".*bitwarden-tls.*"))
 
         assert {
             "cert-manager.io/cluster-issuer": CLUSTER_ISSUER_NAME,
@@ -162,8 +189,8 @@ class TestBitwarden:
     def test_ingress_classs(self, ingress: dict[str, Any]) -> None:
         assert INGRESS_CLASS_NAME == ingress["spec"]["ingressClassName"]
 
-    def test_ingress_rules(self, chart: list[Any], ingress: dict[str, Any]) -> None:
-        service = get_resource(chart, "Service", RESOURCE_NAME_PATTERN)
+    def test_ingress_rules(self, chart: Resources, ingress: dict[str, Any]) -> None:
+        service = chart.get("Service", RESOURCE_NAME_PATTERN)
 
         assert 1 == len(service["spec"]["ports"])
         port = service["spec"]["ports"][0]["port"]
@@ -189,12 +216,12 @@ class TestBitwarden:
             }
         ] == ingress["spec"]["rules"]
 
-    def test_service_type(self, chart: list[Any], container: dict[str, Any]) -> None:
-        service = get_resource(chart, "Service", RESOURCE_NAME_PATTERN)
+    def test_service_type(self, chart: Resources, container: dict[str, Any]) -> None:
+        service = chart.get("Service", RESOURCE_NAME_PATTERN)
         assert "ClusterIP" == service["spec"]["type"]
 
-    def test_service_ports(self, chart: list[Any], container: dict[str, Any]) -> None:
-        service = get_resource(chart, "Service", RESOURCE_NAME_PATTERN)
+    def test_service_ports(self, chart: Resources, container: dict[str, Any]) -> None:
+        service = chart.get("Service", RESOURCE_NAME_PATTERN)
 
         container_ports = sorted(x["containerPort"] for x in container["ports"])
         service_target_ports = sorted(x["targetPort"] for x in service["spec"]["ports"])
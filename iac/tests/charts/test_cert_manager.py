@@ -4,11 +4,11 @@ from typing import Any
 from lab.charts.cert_manager import CertManager, CloudflareAcmeIssuer
 from pydantic import SecretStr
 import pytest
-import cdk8s
 
 
-from lab.libs.config import CloudflareAcmeIssuerConfig
-from tests.utils import get_resource
+from lab.libs.config import CloudflareAcmeIssuerConfig, ResourcesConfig
+from lab.testing import Resources, assert_snapshot, synth_chart
+from tests.utils import SNAPSHOT_DIR
 
 
 EMAIL = "admin@example.com"
@@ -21,37 +21,47 @@ RESOURCE_NAME_PATTERN = re.compile(".*cloudflare-acme-issuer.*")
 
 
 class TestCertManager:
-    def test_cert_manager_include(self) -> None:
-        cm = CertManager(cdk8s.Testing.app(), "cert-manager").to_json()
-        assert get_resource(cm, "Deployment", "cert-manager")
+    @pytest.fixture(scope="class")
+    def chart(self) -> Resources:
+        return synth_chart(
+            "cert-manager",
+            lambda app: CertManager(app, "cert-manager", resources=ResourcesConfig()),
+        )
+
+    def test_snapshot(self, chart: Resources) -> None:
+        assert_snapshot(chart, SNAPSHOT_DIR / "cert-manager.json")
+
+    def test_cert_manager_include(self, chart: Resources) -> None:
+        assert chart.get("Deployment", "cert-manager")
 
 
 class TestCloudflareAcmeIssuer:
-    @pytest.fixture
-    def chart(self) -> Generator[CloudflareAcmeIssuer, None, None]:
-        yield CloudflareAcmeIssuer(
-            cdk8s.Testing.app(),
+    @pytest.fixture(scope="class")
+    def chart(self) -> Resources:
+        return synth_chart(
             CHART_NAME,
-            config=CloudflareAcmeIssuerConfig(
-                email=EMAIL,
-                api_token=SecretStr(API_TOKEN),
-                dns_zones=[DNS_ZONE],
+            lambda app: CloudflareAcmeIssuer(
+                app,
+                CHART_NAME,
+                config=CloudflareAcmeIssuerConfig(
+                    email=EMAIL,
+                    api_token=SecretStr(API_TOKEN),
+                    dns_zones=[DNS_ZONE],
+                ),
+                acme_server=CloudflareAcmeIssuer.LETS_ENCRYPT_STAGING,
             ),
-            acme_server=CloudflareAcmeIssuer.LETS_ENCRYPT_STAGING,
         )
 
-    @pytest.fixture
-    def secret(
-        self, chart: CloudflareAcmeIssuer
-    ) -> Generator[dict[str, Any], None, None]:
-        yield get_resource(chart.to_json(), "Secret", RESOURCE_NAME_PATTERN)
+    @pytest.fixture(scope="class")
+    def secret(self, chart: Resources) -> Generator[dict[str, Any], None, None]:
+        yield chart.get("Secret", RESOURCE_NAME_PATTERN)
+
+    @pytest.fixture(scope="class")
+    def issuer(self, chart: Resources) -> Generator[dict[str, Any], None, None]:
+        yield chart.get("ClusterIssuer", RESOURCE_NAME_PATTERN)
 
-    @pytest.fixture
-    def issuer(
-        self,
-        chart: CloudflareAcmeIssuer,
-    ) -> Generator[dict[str, Any], None, None]:
-        yield get_resource(chart.to_json(), "ClusterIssuer", RESOURCE_NAME_PATTERN)
+    def test_snapshot(self, chart: Resources) -> None:
+        assert_snapshot(chart, SNAPSHOT_DIR / f"{CHART_NAME}.json")
 
     def test_secret(self, secret: dict[str, Any]) -> None:
         assert {CloudflareAcmeIssuer.API_TOKEN_SECRET_KEY: API_TOKEN} == secret[
@@ -92,6 +102,6 @@ class TestCloudflareAcmeIssuer:
         ] == issuer["spec"]["acme"]["solvers"]
 
     def test_cluster_issuer_name_property(
-        self, chart: CloudflareAcmeIssuer, issuer: dict[str, Any]
+        self, chart: Resources, issuer: dict[str, Any]
     ) -> None:
-        assert issuer["metadata"]["name"] == chart.cluster_issuer_name
+        assert issuer["metadata"]["name"] == chart.chart.cluster_issuer_name
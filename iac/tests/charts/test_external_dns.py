@@ -5,12 +5,12 @@ from typing import Any
 from lab.charts.external_dns import CloudflareExternalDns
 from pydantic import SecretStr
 import pytest
-import cdk8s
 
 import cdk8s_plus_29 as kplus
 
-from lab.libs.config import CloudflareDnsConfig
-from tests.utils import get_resource
+from lab.libs.config import CloudflareDnsConfig, ResourcesConfig
+from lab.testing import Resources, assert_snapshot, synth_chart
+from tests.utils import SNAPSHOT_DIR
 
 
 CF_DOMAIN = "example.com"
@@ -19,31 +19,40 @@ VCN_CIDR = IPv4Network("10.0.0.0/16")
 
 RESOURCE_NAME_PATTERN = re.compile(".*cloudflare-external-dns.*")
 
+CONFIG = CloudflareDnsConfig(
+    domain=CF_DOMAIN,
+    api_token=SecretStr(CF_API_TOKEN),
+    local_network_cidr=VCN_CIDR,
+)
+
+
+def synth(name: str, resources: ResourcesConfig) -> Resources:
+    return synth_chart(
+        name,
+        lambda app: CloudflareExternalDns(
+            app, "cloudflare-external-dns", config=CONFIG, resources=resources
+        ),
+    )
+
 
 class TestCloudflareExternalDns:
     @pytest.fixture(scope="class")
-    def chart(self) -> Generator[list[Any], None, None]:
-        yield CloudflareExternalDns(
-            cdk8s.Testing.app(),
-            "cloudflare-external-dns",
-            config=CloudflareDnsConfig(
-                domain=CF_DOMAIN,
-                api_token=SecretStr(CF_API_TOKEN),
-                local_network_cidr=VCN_CIDR,
-            ),
-        ).to_json()
+    def chart(self) -> Resources:
+        return synth("cloudflare-external-dns", ResourcesConfig())
 
     @pytest.fixture(scope="class")
-    def container(self, chart: list[Any]) -> Generator[dict[str, Any], None, None]:
-        deploy = get_resource(chart, "Deployment", RESOURCE_NAME_PATTERN)
+    def container(self, chart: Resources) -> Generator[dict[str, Any], None, None]:
+        deploy = chart.get("Deployment", RESOURCE_NAME_PATTERN)
         yield deploy["spec"]["template"]["spec"]["containers"][0]
 
-    def test_creates_namespace(self, chart: list[Any]) -> None:
-        assert get_resource(chart, "Namespace", RESOURCE_NAME_PATTERN)
+    def test_snapshot(self, chart: Resources) -> None:
+        assert_snapshot(chart, SNAPSHOT_DIR / "cloudflare-external-dns.json")
+
+    def test_creates_namespace(self, chart: Resources) -> None:
+        assert chart.get("Namespace", RESOURCE_NAME_PATTERN)
 
-    def test_creates_service_account(self, chart: list[Any]) -> None:
-        assert get_resource(
-            chart,
+    def test_creates_service_account(self, chart: Resources) -> None:
+        assert chart.get(
             "ServiceAccount",
             RESOURCE_NAME_PATTERN,
         )
@@ -59,10 +68,9 @@ class TestCloudflareExternalDns:
         ids=lambda x: x.resource_type,
     )
     def test_cluster_role_permissions(
-        self, chart: list[Any], resource: kplus.ApiResource
+        self, chart: Resources, resource: kplus.ApiResource
     ) -> None:
-        role = get_resource(
-            chart,
+        role = chart.get(
             "ClusterRole",
             RESOURCE_NAME_PATTERN,
         )
@@ -74,9 +82,8 @@ class TestCloudflareExternalDns:
             "verbs": ["get", "watch", "list"],
         } in role["rules"]
 
-    def test_cluster_role_node_permissions(self, chart: list[Any]) -> None:
-        role = get_resource(
-            chart,
+    def test_cluster_role_node_permissions(self, chart: Resources) -> None:
+        role = chart.get(
             "ClusterRole",
             RESOURCE_NAME_PATTERN,
         )
@@ -88,19 +95,16 @@ class TestCloudflareExternalDns:
             "verbs": ["watch", "list"],
         } in role["rules"]
 
-    def test_cluster_role_binding(self, chart: list[Any]) -> None:
-        crb = get_resource(
-            chart,
+    def test_cluster_role_binding(self, chart: Resources) -> None:
+        crb = chart.get(
             "ClusterRoleBinding",
             RESOURCE_NAME_PATTERN,
         )
-        cr = get_resource(
-            chart,
+        cr = chart.get(
             "ClusterRole",
             RESOURCE_NAME_PATTERN,
         )
-        sa = get_resource(
-            chart,
+        sa = chart.get(
             "ServiceAccount",
             RESOURCE_NAME_PATTERN,
         )
@@ -116,18 +120,17 @@ class TestCloudflareExternalDns:
             "namespace": sa["metadata"]["namespace"],
         } in crb["subjects"]
 
-    def test_secret(self, chart: list[Any]) -> None:
-        secret = get_resource(
-            chart,
+    def test_secret(self, chart: Resources) -> None:
+        secret = chart.get(
             "Secret",
             RESOURCE_NAME_PATTERN,
         )
 
         assert {"CF_API_TOKEN": CF_API_TOKEN} == secret["stringData"]
 
-    def test_deployment_service_account(self, chart: list[Any]) -> None:
-        deploy = get_resource(chart, "Deployment", RESOURCE_NAME_PATTERN)
-        sa = get_resource(chart, "ServiceAccount", RESOURCE_NAME_PATTERN)
+    def test_deployment_service_account(self, chart: Resources) -> None:
+        deploy = chart.get("Deployment", RESOURCE_NAME_PATTERN)
+        sa = chart.get("ServiceAccount", RESOURCE_NAME_PATTERN)
         assert deploy["spec"]["template"]["spec"]["automountServiceAccountToken"]
         assert (
             sa["metadata"]["name"]
@@ -140,8 +143,8 @@ class TestCloudflareExternalDns:
             == container["image"]
         )
 
-    def test_deployment_env(self, chart: list[Any], container: dict[str, Any]) -> None:
-        secret = get_resource(chart, "Secret", RESOURCE_NAME_PATTERN)
+    def test_deployment_env(self, chart: Resources, container: dict[str, Any]) -> None:
+        secret = chart.get("Secret", RESOURCE_NAME_PATTERN)
         assert [{"secretRef": {"name": secret["metadata"]["name"]}}] == container[
             "envFrom"
         ]
@@ -157,7 +160,25 @@ class TestCloudflareExternalDns:
         ] == container["args"]
 
     def test_resources(self, container: dict[str, Any]) -> None:
-        assert "resources" not in container
+        assert {
+            "requests": {"cpu": "10m", "memory": "32Mi"},
+            "limits": {"cpu": "100m", "memory": "128Mi"},
+        } == container["resources"]
+
+    def test_resources_by_synthesized_name(self, chart: Resources) -> None:
+        deploy = chart.get("Deployment", RESOURCE_NAME_PATTERN)
+        key = f"{deploy['metadata']['namespace']}/{deploy['metadata']['name']}"
+
+        large = synth(
+            "cloudflare-external-dns-large", ResourcesConfig(workloads={key: "large"})
+        )
+
+        deploy = large.get("Deployment", RESOURCE_NAME_PATTERN)
+        container = deploy["spec"]["template"]["spec"]["containers"][0]
+        assert {
+            "requests": {"cpu": "100m", "memory": "256Mi"},
+            "limits": {"cpu": "1000m", "memory": "1024Mi"},
+        } == container["resources"]
 
     def test_security_context(self, container: dict[str, Any]) -> None:
         assert not container["securityContext"]["runAsNonRoot"]
@@ -2,12 +2,18 @@ import re
 from unittest.mock import patch
 import pytest
 import cdk8s
-from typing import Any, Generator
 
-from lab.charts.grafana import GrafanaAlloy, GrafanaAlloyCrd, get_chart_values
-from lab.libs.config import GrafanaConfig, GrafanaServiceConfig
+from lab.charts.grafana import (
+    GrafanaAlloy,
+    GrafanaAlloyCrd,
+    get_chart_values,
+    get_ingress_access_log_stages,
+)
+from lab.libs.access_log import LATENCY_FIELDS
+from lab.libs.config import GrafanaConfig, GrafanaServiceConfig, ResourcesConfig
+from lab.testing import Resources, assert_snapshot, synth_chart
 from pydantic import SecretStr
-from tests.utils import get_resource
+from tests.utils import SNAPSHOT_DIR
 
 
 CONFIG = GrafanaConfig(
@@ -20,12 +26,18 @@ CONFIG = GrafanaConfig(
 
 
 class TestGrafanaAlloyCrd:
-    def test_creates_crd(self) -> None:
-        chart = GrafanaAlloyCrd(cdk8s.Testing.app(), "grafana-alloy-crd").to_json()
-        assert get_resource(
-            chart, "CustomResourceDefinition", "alloys.collectors.grafana.com"
+    @pytest.fixture(scope="class")
+    def chart(self) -> Resources:
+        return synth_chart(
+            "grafana-alloy-crd", lambda app: GrafanaAlloyCrd(app, "grafana-alloy-crd")
         )
 
+    def test_snapshot(self, chart: Resources) -> None:
+        assert_snapshot(chart, SNAPSHOT_DIR / "grafana-alloy-crd.json")
+
+    def test_creates_crd(self, chart: Resources) -> None:
+        assert chart.get("CustomResourceDefinition", "alloys.collectors.grafana.com")
+
     def test_pins_helm_chart_version(self) -> None:
         with patch("lab.charts.grafana.Helm", autospec=True) as mocked_helm:
             GrafanaAlloyCrd(cdk8s.Testing.app(), "grafana-alloy-crd")
@@ -38,28 +50,39 @@ class TestGrafanaAlloyCrd:
 
 class TestGrafanaAlloy:
     @pytest.fixture(scope="class")
-    def chart(self) -> Generator[list[Any], None, None]:
-        yield GrafanaAlloy(
-            cdk8s.Testing.app(), "grafana-alloy", config=CONFIG
-        ).to_json()
+    def chart(self) -> Resources:
+        return synth_chart(
+            "grafana-alloy",
+            lambda app: GrafanaAlloy(
+                app, "grafana-alloy", config=CONFIG, resources=ResourcesConfig()
+            ),
+        )
 
-    def test_creates_namespace(self, chart: list[Any]) -> None:
-        assert get_resource(chart, "Namespace", GrafanaAlloy.NAMESPACE)
+    def test_snapshot(self, chart: Resources) -> None:
+        assert_snapshot(chart, SNAPSHOT_DIR / "grafana-alloy.json")
 
-    def test_grafana_alloy_operator_deployment(self, chart: list[Any]) -> None:
+    def test_creates_namespace(self, chart: Resources) -> None:
+        assert chart.get("Namespace", GrafanaAlloy.NAMESPACE)
+
+    def test_grafana_alloy_operator_deployment(self, chart: Resources) -> None:
         # test that we have at least one resource we expect from the Helm chart
-        assert get_resource(chart, "Deployment", name=re.compile(".*alloy-operator"))
+        assert chart.get("Deployment", name=re.compile(".*alloy-operator"))
 
     def test_pins_helm_chart_version(self) -> None:
         with patch("lab.charts.grafana.Helm", autospec=True) as mocked_helm:
-            GrafanaAlloy(cdk8s.Testing.app(), "grafana-alloy", config=CONFIG)
+            GrafanaAlloy(
+                cdk8s.Testing.app(),
+                "grafana-alloy",
+                config=CONFIG,
+                resources=ResourcesConfig(),
+            )
             call_kwargs = mocked_helm.call_args.kwargs
 
         assert "https://grafana.github.io/helm-charts" == call_kwargs["repo"]
         assert "k8s-monitoring" == call_kwargs["chart"]
         assert GrafanaAlloy.CHART_VERSION == call_kwargs["version"]
 
-    def test_helm_resources_are_namespaced(self, chart: list[Any]) -> None:
+    def test_helm_resources_are_namespaced(self, chart: Resources) -> None:
         assert all(
             x["metadata"]["namespace"] == GrafanaAlloy.NAMESPACE
             for x in chart
@@ -147,3 +170,14 @@ class TestGetChartValues:
         assert "applicationObservability" not in values
         assert "autoInstrumentation" not in values
         assert "profiling" not in values
+
+    def test_ingress_access_logs(self) -> None:
+        assert "extraLogProcessingStages" not in get_chart_values(CONFIG)["podLogs"]
+
+        values = get_chart_values(CONFIG, ingress_access_logs=True)
+        stages = values["podLogs"]["extraLogProcessingStages"]
+
+        assert get_ingress_access_log_stages() == stages
+        assert 'container=\\"controller\\"' in stages
+        for x in LATENCY_FIELDS:
+            assert f'source      = "{x}"' in stages
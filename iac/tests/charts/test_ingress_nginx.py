@@ -1,13 +1,19 @@
-from collections.abc import Generator
-from typing import Any
 from unittest.mock import Mock, patch
 from lab.charts.ingress_nginx import IngressNginx
 import pytest
 import cdk8s
 
-from lab.libs.config import IngressConfig
+from lab.libs.access_log import log_format
+from lab.libs.config import (
+    IngressConfig,
+    IngressLoadBalancerConfig,
+    IngressPerformanceConfig,
+    IngressScalingConfig,
+    ResourcesConfig,
+)
 from lab.libs.exceptions import LabError
-from tests.utils import get_resource
+from lab.testing import Resources, assert_snapshot, synth_chart
+from tests.utils import SNAPSHOT_DIR
 
 
 CONFIG = IngressConfig(
@@ -17,28 +23,176 @@ CONFIG = IngressConfig(
 
 class TestIngressNginx:
     @pytest.fixture(scope="class")
-    def chart(self) -> Generator[list[Any], None, None]:
-        yield IngressNginx(
-            cdk8s.Testing.app(),
+    def chart(self) -> Resources:
+        return synth_chart(
             "ingress-nginx",
-            config=CONFIG,
-        ).to_json()
+            lambda app: IngressNginx(
+                app, "ingress-nginx", config=CONFIG, resources=ResourcesConfig()
+            ),
+        )
+
+    def test_snapshot(self, chart: Resources) -> None:
+        assert_snapshot(chart, SNAPSHOT_DIR / "ingress-nginx.json")
 
-    def test_includes_deployment(self, chart: list[Any]) -> None:
-        assert get_resource(chart, "Deployment", "ingress-nginx-controller")
+    def test_includes_deployment(self, chart: Resources) -> None:
+        assert chart.get("Deployment", "ingress-nginx-controller")
 
-    def test_service_uses_nlb(self, chart: list[Any]) -> None:
-        svc = get_resource(chart, "Service", "ingress-nginx-controller")
+    def test_service_uses_nlb(self, chart: Resources) -> None:
+        svc = chart.get("Service", "ingress-nginx-controller")
         assert {
             "oci.oraclecloud.com/load-balancer-type": "nlb",
             "oci-network-load-balancer.oraclecloud.com/oci-network-security-groups": CONFIG.oci_public_load_balancer_nsg_ocid,
         } == svc["metadata"]["annotations"]
 
-    def test_snippets_are_enabled(self, chart: list[Any]) -> None:
-        cfg = get_resource(chart, "ConfigMap", "ingress-nginx-controller")
+    def test_snippets_are_enabled(self, chart: Resources) -> None:
+        cfg = chart.get("ConfigMap", "ingress-nginx-controller")
         assert bool(cfg["data"]["allow-snippet-annotations"])
         assert "Critical" == cfg["data"]["annotations-risk-level"]
 
+    def test_service_external_traffic_policy(self, chart: Resources) -> None:
+        svc = chart.get("Service", "ingress-nginx-controller")
+        assert "Local" == svc["spec"]["externalTrafficPolicy"]
+
+    def test_not_scaled_by_default(self, chart: Resources) -> None:
+        deployment = chart.get("Deployment", "ingress-nginx-controller")
+
+        assert [] == chart.find("HorizontalPodAutoscaler")
+        assert [] == chart.find("PodDisruptionBudget")
+        # a single replica, by default
+        assert "replicas" not in deployment["spec"]
+        assert "topologySpreadConstraints" not in deployment["spec"]["template"]["spec"]
+
+    def test_connections_metric(self) -> None:
+        chart = synth_chart(
+            "ingress-nginx-connections",
+            lambda app: IngressNginx(
+                app,
+                "ingress-nginx",
+                config=IngressConfig(
+                    oci_public_load_balancer_nsg_ocid="ocid",
+                    scaling=IngressScalingConfig(
+                        enabled=True, max_replicas=6, target_connections=500
+                    ),
+                ),
+                resources=ResourcesConfig(),
+            ),
+        )
+
+        hpa = chart.one("HorizontalPodAutoscaler")
+        assert 6 == hpa["spec"]["maxReplicas"]
+        assert {
+            "type": "Pods",
+            "pods": {
+                "metric": {"name": IngressNginx.CONNECTIONS_METRIC},
+                "target": {"type": "AverageValue", "averageValue": 500},
+            },
+        } == hpa["spec"]["metrics"][1]
+
+    def test_performance_settings(self) -> None:
+        chart = synth_chart(
+            "ingress-nginx-performance",
+            lambda app: IngressNginx(
+                app,
+                "ingress-nginx",
+                config=IngressConfig(
+                    oci_public_load_balancer_nsg_ocid="ocid",
+                    performance=IngressPerformanceConfig(
+                        worker_processes=2, use_gzip=True, gzip_level=5
+                    ),
+                ),
+                resources=ResourcesConfig(),
+            ),
+        )
+
+        cfg = chart.get("ConfigMap", "ingress-nginx-controller")
+        assert {
+            "allow-snippet-annotations": "true",
+            "annotations-risk-level": "Critical",
+            "worker-processes": "2",
+            "use-gzip": "true",
+            "gzip-level": "5",
+        } == cfg["data"]
+
+    def test_json_access_logs(self) -> None:
+        chart = synth_chart(
+            "ingress-nginx-access-logs",
+            lambda app: IngressNginx(
+                app,
+                "ingress-nginx",
+                config=IngressConfig(
+                    oci_public_load_balancer_nsg_ocid="ocid",
+                    json_access_logs=True,
+                ),
+                resources=ResourcesConfig(),
+            ),
+        )
+
+        cfg = chart.get("ConfigMap", "ingress-nginx-controller")
+        assert "true" == cfg["data"]["log-format-escape-json"]
+        assert log_format() == cfg["data"]["log-format-upstream"]
+
+    def test_flexible_load_balancer(self) -> None:
+        chart = synth_chart(
+            "ingress-nginx-lb",
+            lambda app: IngressNginx(
+                app,
+                "ingress-nginx",
+                config=IngressConfig(
+                    oci_public_load_balancer_nsg_ocid="ocid",
+                    load_balancer=IngressLoadBalancerConfig(
+                        type="lb",
+                        max_bandwidth_mbps=100,
+                        proxy_protocol=True,
+                        idle_timeout_seconds=300,
+                    ),
+                ),
+                resources=ResourcesConfig(),
+            ),
+        )
+
+        svc = chart.get("Service", "ingress-nginx-controller")
+        lb = "service.beta.kubernetes.io/oci-load-balancer"
+        assert {
+            "oci.oraclecloud.com/load-balancer-type": "lb",
+            "oci.oraclecloud.com/oci-network-security-groups": "ocid",
+            f"{lb}-shape": "flexible",
+            f"{lb}-shape-flex-min": "10",
+            f"{lb}-shape-flex-max": "100",
+            f"{lb}-connection-idle-timeout": "300",
+            f"{lb}-connection-proxy-protocol-version": "2",
+        } == svc["metadata"]["annotations"]
+
+        cfg = chart.get("ConfigMap", "ingress-nginx-controller")
+        assert "true" == cfg["data"]["use-proxy-protocol"]
+
+    def test_network_load_balancer_health_check(self) -> None:
+        chart = synth_chart(
+            "ingress-nginx-nlb",
+            lambda app: IngressNginx(
+                app,
+                "ingress-nginx",
+                config=IngressConfig(
+                    oci_public_load_balancer_nsg_ocid="ocid",
+                    load_balancer=IngressLoadBalancerConfig(
+                        preserve_source=True,
+                        health_check_interval_ms=5000,
+                        health_check_retries=2,
+                    ),
+                ),
+                resources=ResourcesConfig(),
+            ),
+        )
+
+        annotations = chart.get("Service", "ingress-nginx-controller")["metadata"][
+            "annotations"
+        ]
+        nlb = "oci-network-load-balancer.oraclecloud.com"
+        assert {
+            f"{nlb}/is-preserve-source": "true",
+            f"{nlb}/health-check-interval": "5000",
+            f"{nlb}/health-check-retries": "2",
+        }.items() <= annotations.items()
+
     @patch("cdk8s.ApiObject.to_json")
     def test_cannot_override_default_service_annotations(
         self, mocked_to_json: Mock
@@ -54,6 +208,7 @@ class TestIngressNginx:
                 cdk8s.Testing.app(),
                 "ingress-nginx",
                 config=CONFIG,
+                resources=ResourcesConfig(),
             )
 
     @patch("cdk8s.ApiObject.to_json")
@@ -67,4 +222,51 @@ class TestIngressNginx:
                 cdk8s.Testing.app(),
                 "ingress-nginx",
                 config=CONFIG,
+                resources=ResourcesConfig(),
             )
+
+
+class TestIngressNginxScaling:
+    @pytest.fixture(scope="class")
+    def chart(self) -> Resources:
+        return synth_chart(
+            "ingress-nginx-scaling",
+            lambda app: IngressNginx(
+                app,
+                "ingress-nginx",
+                config=CONFIG.model_copy(
+                    update={"scaling": IngressScalingConfig(enabled=True)}
+                ),
+                resources=ResourcesConfig(),
+            ),
+        )
+
+    def test_hpa(self, chart: Resources) -> None:
+        hpa = chart.one("HorizontalPodAutoscaler", "ingress-nginx-controller")
+        assert {"apiVersion": "apps/v1", "kind": "Deployment"}.items() <= hpa["spec"][
+            "scaleTargetRef"
+        ].items()
+        assert (2, 4) == (hpa["spec"]["minReplicas"], hpa["spec"]["maxReplicas"])
+        assert ["cpu"] == [x["resource"]["name"] for x in hpa["spec"]["metrics"]]
+        assert (
+            "replicas"
+            not in chart.get("Deployment", "ingress-nginx-controller")["spec"]
+        )
+
+    def test_pdb(self, chart: Resources) -> None:
+        pdb = chart.one("PodDisruptionBudget", "ingress-nginx-controller")
+        deployment = chart.get("Deployment", "ingress-nginx-controller")
+
+        assert 1 == pdb["spec"]["maxUnavailable"]
+        assert deployment["spec"]["selector"] == pdb["spec"]["selector"]
+
+    def test_topology_spread(self, chart: Resources) -> None:
+        deployment = chart.get("Deployment", "ingress-nginx-controller")
+        constraints = deployment["spec"]["template"]["spec"][
+            "topologySpreadConstraints"
+        ]
+
+        assert [
+            ("kubernetes.io/hostname", "DoNotSchedule"),
+            (IngressNginx.FAULT_DOMAIN_LABEL, "ScheduleAnyway"),
+        ] == [(x["topologyKey"], x["whenUnsatisfiable"]) for x in constraints]
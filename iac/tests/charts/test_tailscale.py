@@ -1,15 +1,17 @@
-from collections.abc import Generator
 import re
 from typing import Any
 import pytest
-import cdk8s
 
 from lab.charts.tailscale import Tailscale
-from lab.libs.config import TailscaleClusterApiProxy, TailscaleConfig
-from tests.utils import get_resource
+from lab.libs.config import (
+    ResourcesConfig,
+    TailscaleClusterApiProxy,
+    TailscaleConfig,
+)
+from lab.testing import Resources, assert_snapshot, synth_chart
 from pydantic import SecretStr
 
-from tests.utils import get_default_container_env
+from tests.utils import SNAPSHOT_DIR, get_default_container_env
 
 CLIENT_ID = "client_id"
 CLIENT_SECRET = "client_secret"
@@ -29,57 +31,70 @@ def _get_api_server_proxy_status(deployment: Any) -> str:
 
 class TestTailscaleDefault:
     @pytest.fixture(scope="class")
-    def chart(self) -> Generator[list[Any], None, None]:
-        yield Tailscale(
-            cdk8s.Testing.app(),
+    def chart(self) -> Resources:
+        return synth_chart(
             "tailscale",
-            config=TailscaleConfig(
-                client_id=CLIENT_ID,
-                client_secret=SecretStr(CLIENT_SECRET),
+            lambda app: Tailscale(
+                app,
+                "tailscale",
+                config=TailscaleConfig(
+                    client_id=CLIENT_ID,
+                    client_secret=SecretStr(CLIENT_SECRET),
+                ),
+                resources=ResourcesConfig(),
             ),
-        ).to_json()
+        )
+
+    def test_snapshot(self, chart: Resources) -> None:
+        assert_snapshot(chart, SNAPSHOT_DIR / "tailscale.json")
 
-    def test_includes_operator_manifest(self, chart: list[Any]) -> None:
-        assert get_resource(chart, "Deployment", "operator")
+    def test_includes_operator_manifest(self, chart: Resources) -> None:
+        assert chart.get("Deployment", "operator")
 
-    def test_oauth_secret(self, chart: list[Any]) -> None:
-        secret = get_resource(chart, "Secret", "operator-oauth")
+    def test_oauth_secret(self, chart: Resources) -> None:
+        secret = chart.get("Secret", "operator-oauth")
         assert CLIENT_ID == secret["stringData"]["client_id"]
         assert CLIENT_SECRET == secret["stringData"]["client_secret"]
 
-    def test_default_api_proxy_disabled(self, chart: list[Any]) -> None:
-        deployment = get_resource(chart, "Deployment", "operator")
+    def test_default_api_proxy_disabled(self, chart: Resources) -> None:
+        deployment = chart.get("Deployment", "operator")
         assert "false" == _get_api_server_proxy_status(deployment)
 
-    def test_default_no_api_proxy_rbac(self, chart: list[Any]) -> None:
-        assert get_resource(chart, "ClusterRoleBinding", "tailscale-auth-proxy") is None
+    def test_default_no_api_proxy_rbac(self, chart: Resources) -> None:
+        assert chart.get("ClusterRoleBinding", "tailscale-auth-proxy") is None
 
 
 class TestTailscaleApiProxyEnabled:
     @pytest.fixture(scope="class")
-    def chart(self) -> Generator[list[Any], None, None]:
-        yield Tailscale(
-            cdk8s.Testing.chart(),
-            "tailscale",
-            config=TailscaleConfig(
-                client_id=CLIENT_ID,
-                client_secret=SecretStr(CLIENT_SECRET),
-                cluster_api_proxy=TailscaleClusterApiProxy(
-                    cluster_admins=[ADMIN_USER],
+    def chart(self) -> Resources:
+        return synth_chart(
+            "tailscale-api-proxy",
+            lambda app: Tailscale(
+                app,
+                "tailscale",
+                config=TailscaleConfig(
+                    client_id=CLIENT_ID,
+                    client_secret=SecretStr(CLIENT_SECRET),
+                    cluster_api_proxy=TailscaleClusterApiProxy(
+                        cluster_admins=[ADMIN_USER],
+                    ),
                 ),
+                resources=ResourcesConfig(),
             ),
-        ).to_json()
+        )
+
+    def test_snapshot(self, chart: Resources) -> None:
+        assert_snapshot(chart, SNAPSHOT_DIR / "tailscale-api-proxy.json")
 
-    def test_api_proxy_enabled(self, chart: list[Any]) -> None:
-        deployment = get_resource(chart, "Deployment", "operator")
+    def test_api_proxy_enabled(self, chart: Resources) -> None:
+        deployment = chart.get("Deployment", "operator")
         assert "true" == _get_api_server_proxy_status(deployment)
 
-    def test_includes_authproxy_rbac_manifest(self, chart: list[Any]) -> None:
-        assert get_resource(chart, "ClusterRoleBinding", "tailscale-auth-proxy")
+    def test_includes_authproxy_rbac_manifest(self, chart: Resources) -> None:
+        assert chart.get("ClusterRoleBinding", "tailscale-auth-proxy")
 
-    def test_api_proxy_clusterrolebinding(self, chart: list[Any]) -> None:
-        cluster_admins = get_resource(
-            chart,
+    def test_api_proxy_clusterrolebinding(self, chart: Resources) -> None:
+        cluster_admins = chart.get(
             "ClusterRoleBinding",
             re.compile(".*tailscale-cluster-admins.*"),
         )
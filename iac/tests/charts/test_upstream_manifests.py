@@ -0,0 +1,24 @@
+import pytest
+
+from lab.charts import CertManager, IngressNginx, Tailscale
+from tests.utils import synth_included_yaml
+
+# the remote manifests which charts include with `include_manifest`
+MANIFEST_URLS = [
+    IngressNginx.MANIFEST_URL,
+    CertManager.MANIFEST_URL,
+    Tailscale.OPERATOR_MANIFEST_URL,
+    Tailscale.AUTHPROXY_RBAC_MANIFEST_URL,
+]
+
+
+@pytest.mark.parametrize("url", MANIFEST_URLS)
+@pytest.mark.parametrize("find", [False, True])
+def test_lazy_include_byte_identical(url: str, find: bool) -> None:
+    """
+    LazyInclude renders manifests in Python, in place of cdk8s.Include, which
+    must give identical output for each manifest the charts include.
+    """
+    assert synth_included_yaml(url, lazy=False, find=find) == synth_included_yaml(
+        url, lazy=True, find=find
+    )
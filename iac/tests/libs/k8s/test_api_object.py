@@ -1,5 +1,9 @@
 from lab.libs.exceptions import LabError
-from lab.libs.k8s.api_object import set_deployment_container_env
+from lab.libs.k8s.api_object import (
+    PatchSession,
+    set_deployment_container_env,
+    set_deployment_container_envs,
+)
 
 import cdk8s
 import cdk8s_plus_29 as kplus
@@ -139,3 +143,198 @@ class TestSetDeploymentContainerEnv:
             {"name": "test-c", "value": "test-value-old"},
             {"name": "test-d", "value": "test-value"},
         ] == get_default_container_env(deploy_json)
+
+
+class TestPatchSession:
+    @pytest.fixture
+    def config_map(self) -> cdk8s.ApiObject:
+        return cdk8s.ApiObject(
+            cdk8s.Testing.chart(),
+            "config-map",
+            api_version="v1",
+            kind="ConfigMap",
+            metadata=cdk8s.ApiObjectMetadata(name="config"),
+        )
+
+    def test_applies_operations(self, config_map: cdk8s.ApiObject) -> None:
+        with PatchSession(config_map) as patch:
+            patch.add("/data", {"a": "1", "b": "2"})
+            patch.replace("/data/a", "3")
+            patch.remove("/data/b")
+            patch.add("/metadata/labels", {"app/name": "x"})
+            patch.replace("/metadata/labels/app~1name", "y")
+
+        assert {"a": "3"} == config_map.to_json()["data"]
+        assert {"app/name": "y"} == config_map.to_json()["metadata"]["labels"]
+
+    def test_snapshot_reflects_operations(self, config_map: cdk8s.ApiObject) -> None:
+        with PatchSession(config_map) as patch:
+            patch.add("/data", {"a": "1"})
+            assert {"a": "1"} == patch.snapshot["data"]
+
+            # not applied until the session exits
+            assert "data" not in config_map.to_json()
+
+    def test_arrays(self, config_map: cdk8s.ApiObject) -> None:
+        with PatchSession(config_map) as patch:
+            patch.add("/items", ["a", "c"])
+            patch.add("/items/1", "b")
+            patch.add("/items/-", "d")
+            patch.remove("/items/0")
+
+        assert ["b", "c", "d"] == config_map.to_json()["items"]
+
+    def test_applied_in_one_call(
+        self, config_map: cdk8s.ApiObject, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        calls = []
+        add_json_patch = config_map.add_json_patch
+        monkeypatch.setattr(
+            config_map,
+            "add_json_patch",
+            lambda *ops: calls.append(ops) or add_json_patch(*ops),
+        )
+
+        with PatchSession(config_map) as patch:
+            patch.add("/metadata/annotations", {})
+            for i in range(5):
+                patch.add(f"/metadata/annotations/a-{i}", str(i))
+
+        assert [6] == [len(x) for x in calls]
+        assert 5 == len(config_map.to_json()["metadata"]["annotations"])
+
+    @pytest.mark.parametrize(
+        "op, args, reason",
+        [
+            ("add", ("/data/a", "1"), "'/data' does not exist"),
+            ("replace", ("/metadata/labels", {}), "path does not exist"),
+            ("remove", ("/metadata/missing",), "path does not exist"),
+            ("add", ("data", {}), "JSON pointer must start with '/'"),
+            ("add", ("", {}), "cannot patch the whole object"),
+            ("add", ("/kind/a", "1"), "parent is not an object or array"),
+        ],
+    )
+    def test_bad_paths(
+        self, config_map: cdk8s.ApiObject, op: str, args: tuple, reason: str
+    ) -> None:
+        with pytest.raises(LabError, match=f"configmap/config: {reason}"):
+            getattr(PatchSession(config_map), op)(*args)
+
+    def test_bad_array_index(self, config_map: cdk8s.ApiObject) -> None:
+        patch = PatchSession(config_map)
+        patch.add("/items", ["a"])
+
+        with pytest.raises(LabError, match="index 2 is out of range"):
+            patch.add("/items/2", "b")
+
+        with pytest.raises(LabError, match="'x' is not an array index"):
+            patch.remove("/items/x")
+
+    def test_not_applied_on_error(self, config_map: cdk8s.ApiObject) -> None:
+        with pytest.raises(LabError):
+            with PatchSession(config_map) as patch:
+                patch.add("/data", {"a": "1"})
+                patch.remove("/missing")
+
+        assert "data" not in config_map.to_json()
+
+    def test_merge(self, config_map: cdk8s.ApiObject) -> None:
+        with PatchSession(config_map) as patch:
+            patch.add("/data", {"a": "1", "b": "2"})
+            patch.add("/items", ["a"])
+            patch.add(
+                "/containers",
+                [{"name": "a", "image": "a", "args": ["x"]}, {"name": "b"}],
+            )
+
+        with PatchSession(config_map) as patch:
+            patch.merge(
+                {
+                    "metadata": {"labels": {"app": "x"}},
+                    "data": {"a": None, "c": "3"},
+                    "items": ["b"],
+                    "containers": [
+                        {"name": "a", "image": "a:2", "args": ["y"]},
+                        {"name": "c", "image": None},
+                    ],
+                    "spec": {"a": {"b": None}, "c": [{"d": None}]},
+                }
+            )
+
+        obj = config_map.to_json()
+        assert {"app": "x"} == obj["metadata"]["labels"]
+        assert {"b": "2", "c": "3"} == obj["data"]
+        assert ["b"] == obj["items"]
+        assert [
+            {"name": "a", "image": "a:2", "args": ["y"]},
+            {"name": "b"},
+            {"name": "c"},
+        ] == obj["containers"]
+        assert {"a": {}, "c": [{}]} == obj["spec"]
+
+
+class TestSetDeploymentContainerEnvs:
+    @pytest.fixture
+    def deployment(self) -> cdk8s.ApiObject:
+        deploy = kplus.Deployment(
+            cdk8s.Testing.chart(),
+            "deployment",
+            init_containers=[kplus.ContainerProps(name="init", image="busybox")],
+            containers=[
+                kplus.ContainerProps(
+                    name="nginx",
+                    image="nginx/nginx",
+                    env_variables={
+                        "test-a": kplus.EnvValue.from_value("old"),
+                        "test-b": kplus.EnvValue.from_value("old"),
+                    },
+                ),
+                kplus.ContainerProps(name="sidecar", image="busybox"),
+            ],
+        )
+        return cdk8s.ApiObject.of(deploy)
+
+    def test_sets_many_containers(self, deployment: cdk8s.ApiObject) -> None:
+        secret_ref = {"secretKeyRef": {"name": "secret", "key": "password"}}
+
+        set_deployment_container_envs(
+            deployment,
+            {
+                "nginx": {"test-a": "new", "test-c": "new", "test-d": secret_ref},
+                "sidecar": {"test-e": "new"},
+                "init": {"test-f": "new"},
+            },
+        )
+
+        pod_spec = deployment.to_json()["spec"]["template"]["spec"]
+        containers = {x["name"]: x for x in pod_spec["containers"]}
+
+        assert [
+            {"name": "test-a", "value": "new"},
+            {"name": "test-b", "value": "old"},
+            {"name": "test-c", "value": "new"},
+            {"name": "test-d", "valueFrom": secret_ref},
+        ] == containers["nginx"]["env"]
+        assert [{"name": "test-e", "value": "new"}] == containers["sidecar"]["env"]
+        assert [{"name": "test-f", "value": "new"}] == pod_spec["initContainers"][0][
+            "env"
+        ]
+
+    def test_replaces_value_with_value_from(self, deployment: cdk8s.ApiObject) -> None:
+        field_ref = {"fieldRef": {"fieldPath": "metadata.name"}}
+
+        set_deployment_container_envs(deployment, {"nginx": {"test-a": field_ref}})
+
+        assert [
+            {"name": "test-a", "valueFrom": field_ref},
+            {"name": "test-b", "value": "old"},
+        ] == get_default_container_env(deployment.to_json())
+
+    def test_container_not_found(self, deployment: cdk8s.ApiObject) -> None:
+        with pytest.raises(LabError, match="container 'missing' not found"):
+            set_deployment_container_envs(
+                deployment, {"nginx": {"test-a": "new"}, "missing": {"test-a": "new"}}
+            )
+
+        # nothing is applied
+        assert "old" == get_default_container_env(deployment.to_json())[0]["value"]
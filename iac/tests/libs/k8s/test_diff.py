@@ -0,0 +1,133 @@
+import pytest
+
+from lab.libs.exceptions import LabError
+from lab.libs.k8s.diff import (
+    REDACTED,
+    Change,
+    ObjectKey,
+    diff_manifests,
+    diff_values,
+    index_objects,
+)
+
+CONFIG = (
+    "apiVersion: v1\n"
+    "kind: ConfigMap\n"
+    "metadata:\n"
+    "  name: config\n"
+    "  namespace: default\n"
+    "data:\n"
+    "  a: '1'\n"
+)
+SECRET = (
+    "apiVersion: v1\n"
+    "kind: Secret\n"
+    "metadata:\n"
+    "  name: secret\n"
+    "  namespace: default\n"
+    "stringData:\n"
+    "  password: hunter2\n"
+)
+NAMESPACE = "apiVersion: v1\nkind: Namespace\nmetadata:\n  name: default\n"
+
+CONFIG_KEY = ObjectKey("v1", "ConfigMap", "default", "config")
+SECRET_KEY = ObjectKey("v1", "Secret", "default", "secret")
+NAMESPACE_KEY = ObjectKey("v1", "Namespace", "", "default")
+
+
+def files(*documents: str) -> dict[str, bytes]:
+    return {"a.k8s.yaml": "---\n".join(documents).encode()}
+
+
+class TestIndexObjects:
+    def test_index(self) -> None:
+        index = index_objects(files(CONFIG, NAMESPACE))
+
+        assert [CONFIG_KEY, NAMESPACE_KEY] == list(index)
+        assert CONFIG == index[CONFIG_KEY].text
+
+    def test_keys_in_any_order(self) -> None:
+        index = index_objects(files("data: {}\n" + NAMESPACE))
+
+        assert [NAMESPACE_KEY] == list(index)
+
+    def test_duplicate_objects(self) -> None:
+        with pytest.raises(LabError, match="is in both"):
+            index_objects({**files(CONFIG), "b.k8s.yaml": CONFIG.encode()})
+
+    def test_object_without_name(self) -> None:
+        with pytest.raises(LabError, match="without apiVersion, kind or name"):
+            index_objects(files("apiVersion: v1\nkind: ConfigMap\nmetadata: {}\n"))
+
+
+class TestDiffValues:
+    def test_changes(self) -> None:
+        old = {"a": 1, "b": {"c": [1, 2, 3]}, "d/e": True}
+        new = {"a": 1, "b": {"c": [1, 4]}, "d/e": 1, "f": None}
+
+        assert [
+            Change("replace", "/b/c/1", old=2, new=4),
+            Change("remove", "/b/c/2", old=3),
+            Change("replace", "/d~1e", old=True, new=1),
+            Change("add", "/f", new=None),
+        ] == diff_values(old, new)
+
+    def test_equal(self) -> None:
+        assert [] == diff_values({"a": [{"b": 1}]}, {"a": [{"b": 1}]})
+
+
+class TestDiffManifests:
+    def test_added_removed_unchanged(self) -> None:
+        manifest_diff = diff_manifests(files(CONFIG, NAMESPACE), files(CONFIG, SECRET))
+
+        assert [SECRET_KEY] == manifest_diff.added
+        assert [NAMESPACE_KEY] == manifest_diff.removed
+        assert {} == manifest_diff.changed
+        assert 1 == manifest_diff.unchanged
+
+    def test_changed(self) -> None:
+        manifest_diff = diff_manifests(
+            files(CONFIG), files(CONFIG.replace("'1'", "'2'"))
+        )
+
+        assert {
+            CONFIG_KEY: [Change("replace", "/data/a", old="1", new="2")]
+        } == manifest_diff.changed
+
+    def test_equal_objects_written_differently(self) -> None:
+        manifest_diff = diff_manifests(
+            files(CONFIG), files(CONFIG.replace("'1'", '"1"'))
+        )
+
+        assert {} == manifest_diff.changed
+        assert 1 == manifest_diff.unchanged
+
+    def test_unchanged_objects_are_not_loaded(self) -> None:
+        # timestamps cannot be loaded, but the text is unchanged
+        manifest = NAMESPACE + "spec: 2025-01-01\n"
+
+        assert 1 == diff_manifests(files(manifest), files(manifest)).unchanged
+
+    def test_redacts_secrets(self) -> None:
+        manifest_diff = diff_manifests(
+            files(SECRET),
+            files(SECRET.replace("hunter2", "hunter3") + "data:\n  token: YQ==\n"),
+        )
+
+        assert {
+            SECRET_KEY: [
+                Change("replace", "/stringData/password", old=REDACTED, new=REDACTED),
+                Change("add", "/data", new=REDACTED),
+            ]
+        } == manifest_diff.changed
+
+    def test_changed_files(self) -> None:
+        changed_config = CONFIG.replace("'1'", "'2'")
+
+        manifest_diff = diff_manifests(
+            files(CONFIG, NAMESPACE), files(NAMESPACE, changed_config, SECRET)
+        )
+
+        assert {
+            "a.k8s.yaml": f"{changed_config}---\n{SECRET}".encode()
+        } == manifest_diff.changed_files()
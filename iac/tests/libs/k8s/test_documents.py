@@ -0,0 +1,160 @@
+from pathlib import Path
+
+import pytest
+
+from lab.libs.k8s.documents import (
+    load_documents,
+    load_synthesized,
+    render_document,
+    sanitize,
+)
+from tests.utils import synth_included_yaml
+
+# manifests, and the YAML cdk8s.Include synthesized from them, captured once
+# with and without CDK8S_DISABLE_SORT
+YAML_1_1_DIR = Path(__file__).parent / "yaml11"
+
+HEADER = "apiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: config\n"
+
+
+def load_value(value: str) -> object:
+    documents = load_documents(f"{HEADER}data:\n  key: {value}\n")
+
+    assert documents is not None
+    return documents[0]["data"]["key"]
+
+
+class TestLoadDocuments:
+    @pytest.mark.parametrize(
+        "value,expected",
+        [
+            ("y", True),
+            ("No", False),
+            ("off", False),
+            ("oN", "oN"),
+            ("~", None),
+            ("", None),
+            ("0777", 511),
+            ("08", 8),
+            ("0x1F", 31),
+            ("-0b11", -3),
+            ("1_000", 1000),
+            ("1e3", 1000.0),
+            ("-.5", -0.5),
+            ("1.2.3", "1.2.3"),
+            ("'y'", "y"),
+            ("!!str 12", "12"),
+        ],
+    )
+    def test_yaml_1_1_scalars(self, value: str, expected: object) -> None:
+        loaded = load_value(value)
+
+        assert expected == loaded
+        assert type(expected) is type(loaded)
+
+    @pytest.mark.parametrize(
+        "value",
+        [
+            "2025-01-01",
+            "1:30",
+            ".inf",
+            ".nan",
+            "-0",
+            "9007199254740993",
+            "!!binary aGk=",
+            "!!int '1'",
+            "! 12",
+            "{<<: {a: b}}",
+            "{1: a}",
+            "{a: 1, a: 2}",
+        ],
+    )
+    def test_unsupported(self, value: str) -> None:
+        assert load_documents(f"{HEADER}data:\n  key: {value}\n") is None
+
+    @pytest.mark.parametrize(
+        "manifest",
+        [
+            "apiVersion: v1\nkind: ConfigMap\nmetadata: {}\n",
+            "apiVersion: a/b/c\nkind: ConfigMap\nmetadata:\n  name: config\n",
+            f"{HEADER}  generation: 1\n",
+            f"{HEADER}  labels:\n    version: 1\n",
+            f"{HEADER}---\n{HEADER}",
+            "- not an object\n",
+            "data: [\n",
+        ],
+    )
+    def test_unsupported_objects(self, manifest: str) -> None:
+        assert load_documents(manifest) is None
+
+    def test_skips_empty_documents(self) -> None:
+        documents = load_documents(f"---\n---\n{{}}\n---\n[]\n---\n{HEADER}")
+
+        assert documents is not None
+        assert ["config"] == [x["metadata"]["name"] for x in documents]
+
+
+class TestLoadSynthesized:
+    def test_loads_any_documents(self) -> None:
+        assert [{"a": "! b\n"}, ["y", True]] == load_synthesized(
+            "a: |\n  ! b\n---\n---\n- 'y'\n- y\n"
+        )
+
+    def test_unsupported(self) -> None:
+        with pytest.raises(ValueError, match="unsupported YAML tag"):
+            load_synthesized("a: 2025-01-01\n")
+
+
+class TestRenderDocument:
+    def test_render(self) -> None:
+        document = {
+            "metadata": {
+                "name": "config",
+                "labels": {"app": "config"},
+                "annotations": {},
+                "creationTimestamp": None,
+            },
+            "kind": "ConfigMap",
+            "data": {"b": None, "a": "1"},
+            "apiVersion": "v1",
+        }
+
+        assert {
+            "apiVersion": "v1",
+            "kind": "ConfigMap",
+            "metadata": {
+                "labels": {"app": "config", "chart": "label"},
+                "name": "config",
+                "namespace": "chart",
+            },
+            "data": {"a": "1"},
+        } == render_document(document, namespace="chart", labels={"chart": "label"})
+
+    def test_sanitize_sorts_like_javascript(self) -> None:
+        # by UTF-16 code unit, not code point
+        assert ["a", "\U0001f600", "～"] == list(
+            sanitize({"～": 1, "\U0001f600": 2, "a": 3})
+        )
+
+
+class TestMatchesCdk8s:
+    @pytest.mark.parametrize("suffix", [".synth.yaml", ".unsorted.synth.yaml"])
+    def test_supported(self, suffix: str, monkeypatch: pytest.MonkeyPatch) -> None:
+        path = YAML_1_1_DIR / "supported.yaml"
+        if suffix.startswith(".unsorted"):
+            monkeypatch.setenv("CDK8S_DISABLE_SORT", "1")
+
+        assert path.with_suffix(suffix).read_text() == synth_included_yaml(
+            str(path), lazy=True
+        )
+
+    def test_fallback(self) -> None:
+        path = YAML_1_1_DIR / "fallback.yaml"
+
+        for document in path.read_text().split("\n---\n")[1:]:
+            assert load_documents(document) is None, document
+
+        # the jsii runtime reads CDK8S_DISABLE_SORT once, when it starts
+        assert path.with_suffix(".synth.yaml").read_text() == synth_included_yaml(
+            str(path), lazy=False
+        )
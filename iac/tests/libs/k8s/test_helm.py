@@ -0,0 +1,191 @@
+import base64
+import json
+import sys
+from pathlib import Path
+
+import cdk8s
+import pytest
+
+from lab.libs.exceptions import CacheError
+from lab.libs.k8s.helm import Helm, HelmChartRef, HelmRenderCache
+
+SECRET = "hunter2-secret"
+
+REF = HelmChartRef(repo="https://charts.example.com", chart="example", version="1.0.0")
+
+# stands in for helm, rendering a Secret from the values and logging its args
+FAKE_HELM = f"""#!{sys.executable}
+import base64, json, sys
+from pathlib import Path
+
+import yaml
+
+args = sys.argv[1:]
+with open(Path(__file__).parent / "calls.jsonl", "a") as f:
+    f.write(json.dumps(args) + "\\n")
+
+if args[0] == "pull":
+    destination = Path(args[args.index("--destination") + 1])
+    (destination / f"{{args[1]}}-{{args[args.index('--version') + 1]}}.tgz").write_text("")
+    sys.exit(0)
+
+values = yaml.safe_load(open(args[args.index("-f") + 1])) if "-f" in args else {{}}
+password = values.get("password", "")
+print(f\"\"\"---
+apiVersion: v1
+kind: Secret
+metadata:
+  name: {{args[-2]}}-auth
+data:
+  password: {{base64.b64encode(password.encode()).decode()}}
+---
+apiVersion: v1
+kind: ConfigMap
+metadata:
+  name: {{args[-2]}}-config
+data:
+  config.alloy: "password = {{password}}"
+\"\"\")
+"""
+
+
+@pytest.fixture
+def helm_executable(tmp_path: Path) -> Path:
+    path = tmp_path / "bin" / "helm"
+    path.parent.mkdir()
+    path.write_text(FAKE_HELM)
+    path.chmod(0o755)
+    return path
+
+
+def helm_calls(helm_executable: Path) -> list[list[str]]:
+    calls_path = helm_executable.parent / "calls.jsonl"
+    if not calls_path.exists():
+        return []
+
+    return [json.loads(x) for x in calls_path.read_text().splitlines()]
+
+
+def make_cache(tmp_path: Path, helm_executable: Path, **kwargs) -> HelmRenderCache:
+    return HelmRenderCache(
+        cache_dir=tmp_path / "cache",
+        helm_executable=str(helm_executable),
+        **kwargs,
+    )
+
+
+def render(cache: HelmRenderCache, values: dict | None = None) -> bytes:
+    return cache.render(
+        REF,
+        release_name="release",
+        namespace="example",
+        values={"password": SECRET} if values is None else values,
+        secrets=[SECRET],
+    )
+
+
+class TestHelmRenderCache:
+    def test_miss_then_hit(self, tmp_path: Path, helm_executable: Path) -> None:
+        cache = make_cache(tmp_path, helm_executable)
+
+        first = render(cache)
+        second = render(cache)
+
+        assert first == second
+        assert SECRET.encode() in first
+        assert (1, 1) == (cache.stats.hits, cache.stats.misses)
+        assert 1 == len(helm_calls(helm_executable))
+
+    def test_template_args(self, tmp_path: Path, helm_executable: Path) -> None:
+        render(make_cache(tmp_path, helm_executable))
+
+        [args] = helm_calls(helm_executable)
+        assert "template" == args[0]
+        assert ["--repo", REF.repo, "--version", REF.version] == args[3:7]
+        assert ["--namespace", "example", "release", REF.chart] == args[7:]
+
+    def test_secrets_are_not_stored_in_clear(
+        self, tmp_path: Path, helm_executable: Path
+    ) -> None:
+        render(make_cache(tmp_path, helm_executable))
+
+        stored = b"".join(x.read_bytes() for x in (tmp_path / "cache").rglob("*.yaml"))
+        assert stored
+        assert SECRET.encode() not in stored
+        assert base64.b64encode(SECRET.encode()) not in stored
+
+    def test_values_change_key(self, tmp_path: Path, helm_executable: Path) -> None:
+        cache = make_cache(tmp_path, helm_executable)
+
+        render(cache)
+        render(cache, values={"password": SECRET, "replicas": 2})
+
+        assert (0, 2) == (cache.stats.hits, cache.stats.misses)
+
+    def test_hit_requires_secrets(self, tmp_path: Path, helm_executable: Path) -> None:
+        cache = make_cache(tmp_path, helm_executable)
+        render(cache)
+
+        with pytest.raises(CacheError, match="secret that was not provided"):
+            cache.render(
+                REF,
+                release_name="release",
+                namespace="example",
+                values={"password": SECRET},
+            )
+
+    def test_offline_miss(self, tmp_path: Path, helm_executable: Path) -> None:
+        cache = make_cache(tmp_path, helm_executable, offline=True)
+
+        with pytest.raises(CacheError, match="offline mode"):
+            render(cache)
+
+        assert [] == helm_calls(helm_executable)
+
+    def test_offline_renders_pulled_chart(
+        self, tmp_path: Path, helm_executable: Path
+    ) -> None:
+        tarball = make_cache(tmp_path, helm_executable).pull(REF)
+        assert tarball.is_file()
+
+        render(make_cache(tmp_path, helm_executable, offline=True))
+
+        _, args = helm_calls(helm_executable)
+        assert "--repo" not in args
+        assert str(tarball) == args[-1]
+
+
+class TestHelm:
+    def test_includes_rendered_objects(
+        self,
+        tmp_path: Path,
+        helm_executable: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        cache = make_cache(tmp_path, helm_executable)
+        monkeypatch.setattr("lab.libs.k8s.helm._helm_cache", cache)
+
+        charts = [
+            Helm(
+                cdk8s.Testing.chart(),
+                "helm",
+                repo=REF.repo,
+                chart=REF.chart,
+                version=REF.version,
+                release_name="release",
+                values={"password": SECRET},
+                secrets=[SECRET],
+            )
+            for _ in range(2)
+        ]
+
+        for helm in charts:
+            secret = helm.find_object(kind="Secret", name="release-auth")
+            assert secret is not None
+            assert (
+                base64.b64encode(SECRET.encode()).decode()
+                == secret.to_json()["data"]["password"]
+            )
+
+        assert (1, 1) == (cache.stats.hits, cache.stats.misses)
+        assert 1 == len(helm_calls(helm_executable))
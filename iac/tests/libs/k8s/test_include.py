@@ -1,8 +1,32 @@
 import pytest
 import cdk8s
 
+from typing import Optional
+
 from pathlib import Path
-from lab.libs.k8s.include import Include
+from lab.libs.exceptions import LabError
+from lab.libs.k8s.chart import Chart
+from lab.libs.k8s.include import (
+    Include,
+    IncludedManifest,
+    LazyInclude,
+    ObjectSelector,
+    Override,
+    _Lookups,
+    include_manifest,
+)
+from tests.utils import FIXTURES_DIR, synth_included_yaml
+
+MANIFESTS = [
+    Path(__file__).parent / x
+    for x in ["deployments.yaml", "objects.yaml", "scalars.yaml"]
+]
+
+
+def lab_chart(
+    namespace: Optional[str] = None, labels: Optional[dict[str, str]] = None
+) -> Chart:
+    return Chart(cdk8s.App(), "chart", namespace=namespace, labels=labels)
 
 
 class TestInclude:
@@ -33,3 +57,202 @@ class TestInclude:
 
     def test_find_object_not_found(self, deployments: Include) -> None:
         assert deployments.find_object(kind="Deployment", name="deployment") is None
+
+
+class TestIncludeIndex:
+    @pytest.fixture(params=["eager", "lazy"])
+    def objects(self, request: pytest.FixtureRequest) -> IncludedManifest:
+        url = str(Path(__file__).parent / "objects.yaml")
+
+        if request.param == "lazy":
+            return include_manifest(lab_chart(), "include", url=url)
+
+        return Include(cdk8s.Testing.chart(), "include", url=url)
+
+    def test_find_object_in_namespace(self, objects: IncludedManifest) -> None:
+        obj = objects.find_object(kind="ConfigMap", name="config", namespace="api")
+
+        assert obj is not None
+        assert "api" == obj.metadata.namespace
+
+    def test_find_object_any_namespace_returns_first(
+        self, objects: IncludedManifest
+    ) -> None:
+        obj = objects.find_object(kind="configmap", name="config")
+
+        assert obj is not None
+        assert "web" == obj.metadata.namespace
+
+    def test_find_object_wrong_namespace(self, objects: IncludedManifest) -> None:
+        assert (
+            objects.find_object(kind="Service", name="nginx", namespace="api") is None
+        )
+
+    def test_find_objects_by_kind(self, objects: IncludedManifest) -> None:
+        found = objects.find_objects(ObjectSelector(kind="configmap"))
+        assert ["web", "api"] == [x.metadata.namespace for x in found]
+
+    def test_find_objects_by_labels(self, objects: IncludedManifest) -> None:
+        found = objects.find_objects(ObjectSelector(labels={"app": "nginx"}))
+        assert [("ConfigMap", "config"), ("Service", "nginx")] == [
+            (x.kind, x.name) for x in found
+        ]
+
+    def test_find_objects_by_namespace(self, objects: IncludedManifest) -> None:
+        found = objects.find_objects(ObjectSelector(namespace="web"))
+        assert ["ConfigMap", "Service"] == [x.kind for x in found]
+
+    def test_find_objects_all_fields(self, objects: IncludedManifest) -> None:
+        found = objects.find_objects(
+            ObjectSelector(
+                kind="ConfigMap", namespace="web", labels={"tier": "frontend"}
+            )
+        )
+        assert ["config"] == [x.name for x in found]
+
+    def test_find_objects_no_match(self, objects: IncludedManifest) -> None:
+        assert [] == objects.find_objects(ObjectSelector(kind="Deployment"))
+
+    def test_find_objects_by_name_glob(self, objects: IncludedManifest) -> None:
+        found = objects.find_objects(ObjectSelector(name="con*"))
+        assert ["web", "api"] == [x.metadata.namespace for x in found]
+
+    def test_override(self, objects: IncludedManifest) -> None:
+        objects.override(
+            Override(ObjectSelector(labels={"app": "nginx"}), {"data": {"a": "1"}}),
+            Override(
+                ObjectSelector(kind="ConfigMap", name="conf*"),
+                {"metadata": {"labels": {"tier": None}}, "data": {"b": "2"}},
+            ),
+        )
+
+        web, api, service = objects.find_objects(ObjectSelector(name="*"))[:3]
+        assert {"a": "1", "b": "2"} == web.to_json()["data"]
+        assert {"app": "nginx"} == web.to_json()["metadata"]["labels"]
+        assert {"b": "2"} == api.to_json()["data"]
+        assert {"a": "1"} == service.to_json()["data"]
+
+    def test_override_matches_nothing(self, objects: IncludedManifest) -> None:
+        with pytest.raises(
+            LabError, match=r"selector\(kind=Deployment\) matches no included object"
+        ):
+            objects.override(Override(ObjectSelector(kind="Deployment"), {}))
+
+
+class TestLazyInclude:
+    def synth(
+        self,
+        path: Path,
+        *,
+        lazy: bool,
+        find: bool = False,
+        namespace: Optional[str] = None,
+        labels: Optional[dict[str, str]] = None,
+    ) -> list:
+        chart = lab_chart(namespace, labels)
+
+        if lazy:
+            include = include_manifest(chart, "include", url=str(path))
+            assert isinstance(include, LazyInclude)
+        else:
+            include = Include(chart, "include", url=str(path))
+
+        if find:
+            # modify every other object, in reverse manifest order
+            for obj in include.find_objects(ObjectSelector())[::-2]:
+                obj.metadata.add_annotation("found", "true")
+
+        return cdk8s.Testing.synth(chart)
+
+    @pytest.mark.parametrize("path", MANIFESTS, ids=lambda x: x.name)
+    @pytest.mark.parametrize("find", [False, True])
+    def test_output_identical(self, path: Path, find: bool) -> None:
+        assert self.synth(path, lazy=False, find=find) == self.synth(
+            path, lazy=True, find=find
+        )
+
+    @pytest.mark.parametrize("path", MANIFESTS, ids=lambda x: x.name)
+    def test_output_identical_with_chart_metadata(self, path: Path) -> None:
+        labels = {"app": "chart"}
+
+        assert self.synth(
+            path, lazy=False, namespace="chart", labels=labels
+        ) == self.synth(path, lazy=True, namespace="chart", labels=labels)
+
+    def test_output_identical_unsorted(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setenv("CDK8S_DISABLE_SORT", "1")
+        path = Path(__file__).parent / "scalars.yaml"
+
+        assert self.synth(path, lazy=False, find=True) == self.synth(
+            path, lazy=True, find=True
+        )
+
+    def test_find_object_returns_same_object(self) -> None:
+        include = include_manifest(
+            lab_chart(), "include", url=str(Path(__file__).parent / "objects.yaml")
+        )
+
+        assert include.find_object(kind="Service", name="nginx") is include.find_object(
+            kind="service", name="nginx", namespace="web"
+        )
+
+    def test_objects_after_include(self) -> None:
+        chart = lab_chart()
+        include = include_manifest(
+            chart, "include", url=str(Path(__file__).parent / "objects.yaml")
+        )
+        include.find_object(kind="Namespace", name="web")
+        cdk8s.ApiObject(chart, "after", api_version="v1", kind="After")
+
+        assert ["ConfigMap", "ConfigMap", "Service", "Namespace", "After"] == [
+            x["kind"] for x in cdk8s.Testing.synth(chart)
+        ]
+
+    def test_falls_back_outside_lab_chart(self) -> None:
+        include = include_manifest(
+            cdk8s.Testing.chart(),
+            "include",
+            url=str(Path(__file__).parent / "objects.yaml"),
+        )
+
+        assert isinstance(include, Include)
+
+    def test_falls_back_for_unsupported_manifest(self, tmp_path: Path) -> None:
+        path = tmp_path / "manifest.yaml"
+        path.write_text(
+            "apiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: a\n"
+            "data:\n  date: 2025-01-01\n"
+        )
+        chart = lab_chart()
+
+        include = include_manifest(chart, "include", url=str(path))
+
+        assert isinstance(include, Include)
+        assert (
+            "2025-01-01T00:00:00.000Z" == cdk8s.Testing.synth(chart)[0]["data"]["date"]
+        )
+
+    @pytest.mark.parametrize(
+        "name",
+        [
+            "ingress-nginx",
+            "cert-manager",
+            "tailscale-operator",
+            "tailscale-authproxy-rbac",
+        ],
+    )
+    @pytest.mark.parametrize("find", [False, True])
+    def test_upstream_fixtures_byte_identical(self, name: str, find: bool) -> None:
+        path = str(FIXTURES_DIR / f"{name}.yaml")
+
+        assert synth_included_yaml(path, lazy=False, find=find) == synth_included_yaml(
+            path, lazy=True, find=find
+        )
+
+    def test_lookups_are_abstract(self) -> None:
+        with pytest.raises(TypeError, match="abstract method _build_index"):
+            _Lookups()  # type: ignore[abstract]
+
+    def test_requires_lab_chart(self) -> None:
+        with pytest.raises(LabError, match="must be in a lab.libs.k8s.chart.Chart"):
+            LazyInclude(cdk8s.Testing.chart(), "include", documents=[])
@@ -0,0 +1,222 @@
+import json
+import threading
+from collections.abc import Generator
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import cdk8s
+import pytest
+
+from lab.libs.cache import sha256_digest
+from lab.libs.exceptions import CacheError
+from lab.libs.k8s.include import Include
+from lab.libs.k8s.manifest_cache import DEFAULT_LOCKFILE, ManifestCache
+
+MANIFEST = (Path(__file__).parent / "deployments.yaml").read_bytes()
+
+
+class ManifestServer:
+    """
+    Serves files from a directory over HTTP, counting requests.
+    """
+
+    def __init__(self, directory: Path):
+        self.requests = 0
+
+        server = self
+
+        class Handler(SimpleHTTPRequestHandler):
+            def do_GET(self) -> None:
+                server.requests += 1
+                super().do_GET()
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self._httpd = ThreadingHTTPServer(
+            ("127.0.0.1", 0), partial(Handler, directory=str(directory))
+        )
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def url(self, path: str) -> str:
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}/{path}"
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture
+def server(tmp_path: Path) -> Generator[ManifestServer, None, None]:
+    root = tmp_path / "www"
+    root.mkdir()
+    (root / "deployments.yaml").write_bytes(MANIFEST)
+
+    server = ManifestServer(root)
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def lockfile(tmp_path: Path) -> Path:
+    return tmp_path / "manifests.lock"
+
+
+def make_cache(tmp_path: Path, lockfile: Path, **kwargs) -> ManifestCache:
+    return ManifestCache(cache_dir=tmp_path / "cache", lockfile=lockfile, **kwargs)
+
+
+def pin(lockfile: Path, url: str, data: bytes = MANIFEST) -> None:
+    lockfile.write_text(json.dumps({url: sha256_digest(data)}))
+
+
+class TestManifestCache:
+    def test_default_lockfile_is_in_project(self) -> None:
+        assert Path(__file__).parents[3] / "manifests.lock" == DEFAULT_LOCKFILE
+
+    def test_local_paths_are_not_cached(self, tmp_path: Path, lockfile: Path) -> None:
+        cache = make_cache(tmp_path, lockfile)
+        path = str(Path(__file__).parent / "deployments.yaml")
+
+        assert path == cache.resolve(path)
+        assert (0, 0) == (cache.stats.hits, cache.stats.misses)
+
+    def test_miss_then_hit(
+        self, tmp_path: Path, lockfile: Path, server: ManifestServer
+    ) -> None:
+        url = server.url("deployments.yaml")
+        pin(lockfile, url)
+        cache = make_cache(tmp_path, lockfile)
+
+        first = cache.resolve(url)
+        second = cache.resolve(url)
+
+        assert first == second
+        assert MANIFEST == Path(first).read_bytes()
+        assert (1, 1) == (cache.stats.hits, cache.stats.misses)
+        assert 1 == server.requests
+
+    def test_cache_persists_across_instances(
+        self, tmp_path: Path, lockfile: Path, server: ManifestServer
+    ) -> None:
+        url = server.url("deployments.yaml")
+        pin(lockfile, url)
+        make_cache(tmp_path, lockfile).resolve(url)
+
+        cache = make_cache(tmp_path, lockfile)
+        cache.resolve(url)
+
+        assert (1, 0) == (cache.stats.hits, cache.stats.misses)
+        assert 1 == server.requests
+
+    def test_writes_lockfile(
+        self, tmp_path: Path, lockfile: Path, server: ManifestServer
+    ) -> None:
+        url = server.url("deployments.yaml")
+        make_cache(tmp_path, lockfile).resolve(url, pin=True)
+
+        assert {url: sha256_digest(MANIFEST)} == json.loads(lockfile.read_text())
+
+    def test_unpinned_url(
+        self, tmp_path: Path, lockfile: Path, server: ManifestServer
+    ) -> None:
+        pin(lockfile, server.url("other.yaml"))
+
+        with pytest.raises(CacheError, match="not pinned"):
+            make_cache(tmp_path, lockfile).resolve(server.url("deployments.yaml"))
+
+        assert 0 == server.requests
+        assert [server.url("other.yaml")] == list(json.loads(lockfile.read_text()))
+
+    def test_missing_lockfile(
+        self, tmp_path: Path, lockfile: Path, server: ManifestServer
+    ) -> None:
+        cache = make_cache(tmp_path, lockfile)
+
+        with pytest.warns(UserWarning, match="manifests are not pinned"):
+            path = cache.resolve(server.url("deployments.yaml"))
+
+        assert MANIFEST == Path(path).read_bytes()
+        assert not lockfile.exists()
+
+    def test_without_lockfile(self, tmp_path: Path, server: ManifestServer) -> None:
+        cache = make_cache(tmp_path, None)
+        path = cache.resolve(server.url("deployments.yaml"))
+
+        assert MANIFEST == Path(path).read_bytes()
+
+    def test_pinned_digest_mismatch(
+        self, tmp_path: Path, lockfile: Path, server: ManifestServer
+    ) -> None:
+        url = server.url("deployments.yaml")
+        pin(lockfile, url, b"other")
+
+        with pytest.raises(CacheError, match="digest mismatch"):
+            make_cache(tmp_path, lockfile).resolve(url)
+
+    def test_refresh_repins(
+        self, tmp_path: Path, lockfile: Path, server: ManifestServer
+    ) -> None:
+        url = server.url("deployments.yaml")
+        pin(lockfile, url, b"other")
+
+        cache = make_cache(tmp_path, lockfile)
+        cache.resolve(url, refresh=True)
+
+        assert {url: sha256_digest(MANIFEST)} == json.loads(lockfile.read_text())
+        assert 1 == server.requests
+
+    def test_offline_hit(
+        self, tmp_path: Path, lockfile: Path, server: ManifestServer
+    ) -> None:
+        url = server.url("deployments.yaml")
+        pin(lockfile, url)
+        make_cache(tmp_path, lockfile).resolve(url)
+        server.stop()
+
+        cache = make_cache(tmp_path, lockfile, offline=True)
+        assert MANIFEST == Path(cache.resolve(url)).read_bytes()
+        assert (1, 0) == (cache.stats.hits, cache.stats.misses)
+
+    def test_offline_miss(
+        self, tmp_path: Path, lockfile: Path, server: ManifestServer
+    ) -> None:
+        url = server.url("deployments.yaml")
+        pin(lockfile, url)
+        cache = make_cache(tmp_path, lockfile, offline=True)
+
+        with pytest.raises(CacheError, match="offline mode"):
+            cache.resolve(url)
+
+        assert 0 == server.requests
+
+    def test_fetch_error(
+        self, tmp_path: Path, lockfile: Path, server: ManifestServer
+    ) -> None:
+        with pytest.raises(CacheError, match="error fetching"):
+            make_cache(tmp_path, lockfile).resolve(server.url("missing.yaml"), pin=True)
+
+
+class TestIncludeUsesManifestCache:
+    def test_include_remote_manifest(
+        self,
+        tmp_path: Path,
+        lockfile: Path,
+        server: ManifestServer,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        url = server.url("deployments.yaml")
+        pin(lockfile, url)
+
+        cache = make_cache(tmp_path, lockfile)
+        monkeypatch.setattr("lab.libs.k8s.manifest_cache._manifest_cache", cache)
+
+        for i in range(2):
+            include = Include(cdk8s.Testing.chart(), f"include-{i}", url=url)
+            assert include.find_object(kind="Deployment", name="nginx-deployment")
+
+        assert (1, 1) == (cache.stats.hits, cache.stats.misses)
+        assert 1 == server.requests
@@ -0,0 +1,32 @@
+from decimal import Decimal
+
+import pytest
+
+from lab.libs.k8s.quantity import format_cpu, format_memory, parse_quantity
+
+
+@pytest.mark.parametrize(
+    "quantity,expected",
+    [
+        ("250m", Decimal("0.25")),
+        ("2", Decimal(2)),
+        (1.5, Decimal("1.5")),
+        ("128Mi", Decimal(128 * 2**20)),
+        ("1G", Decimal(10**9)),
+        ("1e3", Decimal(1000)),
+        ("1E", Decimal(10**18)),
+    ],
+)
+def test_parse_quantity(quantity: str, expected: Decimal) -> None:
+    assert expected == parse_quantity(quantity)
+
+
+@pytest.mark.parametrize("quantity", ["", "Mi", "1Xi", "1.2.3"])
+def test_invalid_quantity(quantity: str) -> None:
+    with pytest.raises(ValueError, match="invalid quantity"):
+        parse_quantity(quantity)
+
+
+def test_format() -> None:
+    assert "250m" == format_cpu(0.25)
+    assert "128Mi" == format_memory(128 * 2**20)
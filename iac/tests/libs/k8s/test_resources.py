@@ -0,0 +1,188 @@
+from pathlib import Path
+
+import cdk8s
+import cdk8s_plus_29 as kplus
+import pytest
+from pydantic import ValidationError
+
+from lab.libs.config import ResourcesConfig, ResourceProfile
+from lab.libs.exceptions import LabError
+from lab.libs.k8s.chart import Chart
+from lab.libs.k8s.include import include_manifest
+from lab.libs.k8s.resources import (
+    check_bounded,
+    container_resources,
+    set_included_resources,
+    workload_key,
+)
+
+MANIFEST = """\
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: api
+  namespace: app
+spec:
+  template:
+    spec:
+      initContainers:
+      - name: migrate
+        image: api
+      containers:
+      - name: api
+        image: api
+        resources:
+          requests:
+            cpu: 1m
+---
+apiVersion: apps/v1
+kind: DaemonSet
+metadata:
+  name: agent
+spec:
+  template:
+    spec:
+      containers:
+      - name: agent
+        image: agent
+"""
+
+SMALL = {
+    "requests": {"cpu": "10m", "memory": "32Mi"},
+    "limits": {"cpu": "100m", "memory": "128Mi"},
+}
+LARGE = {
+    "requests": {"cpu": "100m", "memory": "256Mi"},
+    "limits": {"cpu": "1", "memory": "1Gi"},
+}
+CUSTOM = {
+    "requests": {"cpu": "250m", "memory": "64Mi"},
+    "limits": {"cpu": "500m", "memory": "96Mi"},
+}
+
+
+def pod_spec(chart: cdk8s.Chart, kind: str) -> dict:
+    [obj] = [x for x in chart.to_json() if x["kind"] == kind]
+    return obj["spec"]["template"]["spec"]
+
+
+class TestSetIncludedResources:
+    @pytest.fixture
+    def chart(self, tmp_path: Path) -> Chart:
+        path = tmp_path / "manifest.yaml"
+        path.write_text(MANIFEST)
+
+        return Chart(cdk8s.App(), "chart", namespace="agents")
+
+    def include(self, chart: Chart, tmp_path: Path):
+        return include_manifest(chart, "include", url=str(tmp_path / "manifest.yaml"))
+
+    def test_sets_every_container(self, chart: Chart, tmp_path: Path) -> None:
+        set_included_resources(
+            self.include(chart, tmp_path), ResourcesConfig(), {"app/api": "small"}
+        )
+
+        spec = pod_spec(chart, "Deployment")
+        assert SMALL == spec["initContainers"][0]["resources"]
+        assert SMALL == spec["containers"][0]["resources"]
+        assert "resources" not in pod_spec(chart, "DaemonSet")["containers"][0]
+
+    def test_default_and_configured(self, chart: Chart, tmp_path: Path) -> None:
+        resources = ResourcesConfig(
+            profiles={"custom": ResourceProfile.model_validate(CUSTOM)},
+            workloads={"agents/agent": "custom"},
+        )
+        set_included_resources(
+            self.include(chart, tmp_path),
+            resources,
+            {"app/api": "small"},
+            default="large",
+        )
+
+        assert SMALL == pod_spec(chart, "Deployment")["containers"][0]["resources"]
+        assert CUSTOM == pod_spec(chart, "DaemonSet")["containers"][0]["resources"]
+
+        resources = ResourcesConfig()
+        assert LARGE == resources.profile("agents/agent", "large").model_dump()
+
+    def test_missing_workload(self, chart: Chart, tmp_path: Path) -> None:
+        with pytest.raises(LabError, match="could not find workloads app/web"):
+            set_included_resources(
+                self.include(chart, tmp_path), ResourcesConfig(), {"app/web": "small"}
+            )
+
+
+class TestResourcesConfig:
+    def test_unknown_profile(self) -> None:
+        with pytest.raises(ValidationError, match="app/api has unknown profile huge"):
+            ResourcesConfig(workloads={"app/api": "huge"})
+
+    def test_requests_within_limits(self) -> None:
+        with pytest.raises(ValidationError, match="cpu request 1 is more than"):
+            ResourceProfile.model_validate(
+                {**SMALL, "requests": {"cpu": "1", "memory": "32Mi"}}
+            )
+
+    def test_replaces_default_profile(self) -> None:
+        resources = ResourcesConfig(
+            profiles={"small": ResourceProfile.model_validate(CUSTOM)}
+        )
+
+        assert CUSTOM == resources.profile("app/api", "small").model_dump()
+
+
+def test_container_resources() -> None:
+    chart = cdk8s.Testing.chart()
+    kplus.Deployment(chart, "deployment").add_container(
+        image="api",
+        resources=container_resources(ResourceProfile.model_validate(LARGE)),
+    )
+
+    assert {
+        "requests": {"cpu": "100m", "memory": "256Mi"},
+        "limits": {"cpu": "1000m", "memory": "1024Mi"},
+    } == pod_spec(chart, "Deployment")["containers"][0]["resources"]
+
+
+def test_workload_key() -> None:
+    chart = Chart(cdk8s.App(), "chart", namespace="app")
+    containers = [kplus.ContainerProps(image="api")]
+    workloads = [
+        kplus.Deployment(chart, "deployment", containers=containers),
+        kplus.Deployment(
+            chart,
+            "other",
+            containers=containers,
+            metadata=cdk8s.ApiObjectMetadata(namespace="other"),
+        ),
+    ]
+
+    assert [
+        f"{x['metadata']['namespace']}/{x['metadata']['name']}" for x in chart.to_json()
+    ] == [workload_key(cdk8s.ApiObject.of(x)) for x in workloads]
+
+
+def test_container_resources_whole_units() -> None:
+    profile = ResourceProfile.model_validate(
+        {**CUSTOM, "limits": {"cpu": "500m", "memory": "1G"}}
+    )
+
+    with pytest.raises(LabError, match="1G is not a whole number of mebibytes"):
+        container_resources(profile)
+
+
+def test_check_bounded() -> None:
+    check_bounded(
+        {
+            "config.k8s.yaml": b"apiVersion: v1\nkind: ConfigMap\n"
+            b"metadata:\n  name: config\n"
+        }
+    )
+
+    with pytest.raises(LabError) as e:
+        check_bounded({"app.k8s.yaml": MANIFEST.encode()})
+
+    assert "deployment/api in app, container migrate: no cpu or memory limit" in str(
+        e.value
+    )
+    assert "daemonset/agent in default, container agent" in str(e.value)
@@ -0,0 +1,65 @@
+import io
+import json
+
+import cdk8s
+import cdk8s_plus_29 as kplus
+import pytest
+
+from lab.libs.exceptions import LabError
+from lab.libs.k8s.stream import OutputFormat, write_stream
+from lab.libs.k8s.synth import synth_files
+
+
+def build(app: cdk8s.App) -> None:
+    for chart_id in ["b", "a"]:
+        chart = cdk8s.Chart(app, chart_id)
+        kplus.Deployment(
+            chart, "deployment", containers=[kplus.ContainerProps(image="nginx")]
+        )
+        cdk8s.ApiObject(
+            chart,
+            "config",
+            api_version="v1",
+            kind="ConfigMap",
+            metadata=cdk8s.ApiObjectMetadata(name=f"config-{chart_id}"),
+        ).add_json_patch(
+            cdk8s.JsonPatch.add("/data", {"y": "y", "n": "1e3", "script": "a\n! b\n"})
+        )
+
+    cdk8s.Chart(app, "empty")
+
+
+def write(files: dict[str, bytes], output_format: OutputFormat) -> bytes:
+    stream = io.BytesIO()
+    write_stream(stream, files, output_format)
+    return stream.getvalue()
+
+
+@pytest.fixture(scope="module")
+def files() -> dict[str, bytes]:
+    return synth_files(build)
+
+
+class TestWriteStream:
+    def test_yaml_is_synthesized_files(self, files: dict[str, bytes]) -> None:
+        assert b"---\n" + files["a.k8s.yaml"] + b"---\n" + files["b.k8s.yaml"] == write(
+            files, OutputFormat.YAML
+        )
+
+    def test_json_lines(self, files: dict[str, bytes]) -> None:
+        app = cdk8s.App()
+        build(app)
+        charts = {x.node.id: x for x in app.charts}
+
+        lines = write(files, OutputFormat.JSONL).decode().splitlines()
+
+        assert [
+            *charts["a"].to_json(),
+            *charts["b"].to_json(),
+        ] == [json.loads(x) for x in lines]
+
+    def test_json_lines_unsupported(self) -> None:
+        files = {"a.k8s.yaml": b"apiVersion: v1\nkind: ConfigMap\nnow: 2025-01-01\n"}
+
+        with pytest.raises(LabError, match="a.k8s.yaml"):
+            write(files, OutputFormat.JSONL)
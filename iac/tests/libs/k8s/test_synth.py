@@ -0,0 +1,54 @@
+from pathlib import Path
+
+import cdk8s
+import cdk8s_plus_29 as kplus
+import pytest
+
+from lab.libs.k8s.synth import get_outdir, synth_files, write_files
+
+
+def build(app: cdk8s.App, chart_ids: list[str]) -> None:
+    for chart_id in chart_ids:
+        chart = cdk8s.Chart(app, chart_id)
+        kplus.Deployment(
+            chart, "deployment", containers=[kplus.ContainerProps(image="nginx")]
+        )
+
+
+class TestSynthFiles:
+    def test_matches_app_synth(self, tmp_path: Path) -> None:
+        app = cdk8s.App(outdir=str(tmp_path))
+        build(app, ["a", "b"])
+        app.synth()
+
+        files = synth_files(lambda app: build(app, ["a", "b"]))
+
+        assert {x.name: x.read_bytes() for x in tmp_path.iterdir()} == files
+
+    def test_charts_synthesized_separately_match(self) -> None:
+        together = synth_files(lambda app: build(app, ["a", "b"]))
+
+        separately = {
+            **synth_files(lambda app: build(app, ["a"])),
+            **synth_files(lambda app: build(app, ["b"])),
+        }
+
+        assert together == separately
+
+
+class TestWriteFiles:
+    def test_writes_files(self, tmp_path: Path) -> None:
+        write_files(tmp_path / "dist", {"a.k8s.yaml": b"a", "b.k8s.yaml": b"b"})
+
+        assert b"a" == (tmp_path / "dist" / "a.k8s.yaml").read_bytes()
+        assert b"b" == (tmp_path / "dist" / "b.k8s.yaml").read_bytes()
+
+
+class TestGetOutdir:
+    def test_default(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.delenv("CDK8S_OUTDIR", raising=False)
+        assert Path("dist") == get_outdir()
+
+    def test_from_env(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setenv("CDK8S_OUTDIR", "out")
+        assert Path("out") == get_outdir()
@@ -0,0 +1,14 @@
+import json
+
+from lab.libs.access_log import ACCESS_LOG_FIELDS, LATENCY_FIELDS, log_format
+
+
+def test_log_format() -> None:
+    fields = json.loads(log_format())
+
+    assert ACCESS_LOG_FIELDS == fields
+    assert "$upstream_response_time" == fields["upstream_response_time"]
+
+
+def test_latency_fields_are_logged() -> None:
+    assert set(LATENCY_FIELDS) <= set(ACCESS_LOG_FIELDS)
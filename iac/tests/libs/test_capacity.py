@@ -0,0 +1,142 @@
+import pytest
+
+from lab.libs.capacity import (
+    GIB,
+    Amount,
+    WorkerPool,
+    allocatable,
+    find_workloads,
+    plan_capacity,
+    pod_spec,
+)
+from lab.libs.exceptions import LabError
+from lab.libs.k8s.diff import ObjectKey, index_objects
+
+POOL = WorkerPool(size=2, shape="VM.Standard.A1.Flex", ocpus=2, memory_gbs=12)
+KEY = ObjectKey("apps/v1", "Deployment", "default", "app")
+
+
+def container(requests: dict, limits: dict) -> dict:
+    return {"name": "app", "resources": {"requests": requests, "limits": limits}}
+
+
+def workload(kind: str, name: str, *containers: dict, **spec: object) -> str:
+    return (
+        f"apiVersion: apps/v1\nkind: {kind}\n"
+        f"metadata:\n  name: {name}\n  namespace: default\n"
+        + "spec: "
+        + repr({**spec, "template": {"spec": {"containers": list(containers)}}})
+        + "\n"
+    )
+
+
+def test_allocatable() -> None:
+    node = allocatable(POOL)
+
+    # 6% of the first core and 1% of the second
+    assert 1.93 == pytest.approx(node.cpu)
+    # 25% of 4Gi, 20% of 4Gi, 10% of 4Gi and the eviction threshold
+    assert (12 - 1 - 0.8 - 0.4) * GIB - 100 * 2**20 == pytest.approx(node.memory)
+
+
+@pytest.mark.parametrize("ocpus,memory_gbs", [(0, 12), (2, 0.1), (-1, 12)])
+def test_allocatable_none(ocpus: float, memory_gbs: float) -> None:
+    pool = WorkerPool(size=1, shape=POOL.shape, ocpus=ocpus, memory_gbs=memory_gbs)
+
+    with pytest.raises(LabError, match="no allocatable CPU or memory"):
+        allocatable(pool)
+
+
+class TestPodSpec:
+    def test_requests_default_to_limits(self) -> None:
+        pod = pod_spec(KEY, {"containers": [container({}, {"cpu": "500m"})]})
+
+        assert Amount(0.5, 0) == pod.requests
+        assert not pod.unbounded_cpu
+        assert pod.unbounded_memory
+
+    def test_init_containers(self) -> None:
+        pod = pod_spec(
+            KEY,
+            {
+                "containers": [
+                    container({"cpu": "100m"}, {}),
+                    container({"cpu": "100m"}, {}),
+                ],
+                "initContainers": [container({"cpu": "1", "memory": "1Gi"}, {})],
+            },
+        )
+
+        assert Amount(1, GIB) == pod.requests
+
+    def test_invalid_quantity(self) -> None:
+        with pytest.raises(LabError, match="container app: invalid quantity"):
+            pod_spec(KEY, {"containers": [container({"cpu": "a lot"}, {})]})
+
+
+def test_find_workloads() -> None:
+    hpa = (
+        "apiVersion: autoscaling/v2\nkind: HorizontalPodAutoscaler\n"
+        "metadata:\n  name: web\n  namespace: default\n"
+        "spec:\n  maxReplicas: 3\n"
+        "  scaleTargetRef: {apiVersion: apps/v1, kind: Deployment, name: web}\n"
+    )
+    objects = index_objects(
+        {
+            "app.k8s.yaml": "---\n".join(
+                [
+                    workload("Deployment", "web", container({"cpu": "1"}, {})),
+                    workload("Deployment", "api", container({}, {}), replicas=2),
+                    workload("DaemonSet", "agent", container({}, {})),
+                    workload("CronJob", "backup", container({}, {})),
+                    hpa,
+                ]
+            ).encode()
+        }
+    )
+
+    workloads = find_workloads(objects)
+
+    assert ["agent"] == [x.workload.name for x in workloads.daemons]
+    assert ["web"] * 3 + ["api"] * 2 == sorted(
+        (x.workload.name for x in workloads.replicas), reverse=True
+    )
+
+
+class TestPlanCapacity:
+    def plan(self, *documents: str):
+        objects = index_objects({"app.k8s.yaml": "---\n".join(documents).encode()})
+        return plan_capacity(POOL, find_workloads(objects))
+
+    def test_spreads_pods(self) -> None:
+        plan = self.plan(
+            workload("DaemonSet", "agent", container({"cpu": "100m"}, {"cpu": "100m"})),
+            workload(
+                "Deployment",
+                "web",
+                container({"cpu": "500m", "memory": "1Gi"}, {"cpu": "1"}),
+                replicas=2,
+            ),
+        )
+
+        assert [] == plan.unschedulable
+        assert [2, 2] == [len(x.pods) for x in plan.nodes]
+        assert Amount(0.6, GIB) == plan.nodes[0].requests
+        assert 1.1 / 1.93 == pytest.approx(plan.nodes[0].cpu_overcommit())
+        assert [] == plan.starved(2.0)
+
+    def test_unschedulable(self) -> None:
+        plan = self.plan(
+            workload("Deployment", "big", container({"cpu": "1500m"}, {}), replicas=3)
+        )
+
+        assert ["big"] == [x.workload.name for x in plan.unschedulable]
+
+    def test_unbounded_cpu_is_starved(self) -> None:
+        plan = self.plan(
+            workload("Deployment", "web", container({"cpu": "100m"}, {}), replicas=6)
+        )
+
+        # each node runs three pods, each of which can use all of its CPU
+        assert 3.0 == pytest.approx(plan.nodes[0].cpu_overcommit())
+        assert plan.nodes == plan.starved(2.0)
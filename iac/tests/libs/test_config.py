@@ -0,0 +1,75 @@
+import pytest
+from pydantic import ValidationError
+
+from lab.libs.config import (
+    IngressLoadBalancerConfig,
+    IngressPerformanceConfig,
+    IngressScalingConfig,
+)
+
+
+class TestIngressPerformanceConfig:
+    def test_unset(self) -> None:
+        assert {} == IngressPerformanceConfig().configmap_data()
+
+    def test_configmap_data(self) -> None:
+        config = IngressPerformanceConfig(
+            worker_processes="auto",
+            max_worker_connections=4096,
+            use_gzip=True,
+            gzip_types=["text/css", "application/json"],
+            use_http2=False,
+            proxy_buffer_size="16k",
+        )
+
+        assert {
+            "worker-processes": "auto",
+            "max-worker-connections": "4096",
+            "use-gzip": "true",
+            "gzip-types": "text/css application/json",
+            "use-http2": "false",
+            "proxy-buffer-size": "16k",
+        } == config.configmap_data()
+
+    @pytest.mark.parametrize(
+        "settings, error",
+        [
+            ({"worker_processes": 0}, "greater than 0"),
+            ({"use_gzip": True, "gzip_level": 10}, "less than or equal to 9"),
+            ({"proxy_buffer_size": "16kb"}, "should match pattern"),
+            ({"enable_brotli": True, "brotli_types": ["html"]}, "should match"),
+            ({"gzip_level": 5}, "gzip_level has no effect unless use_gzip"),
+            (
+                {"ssl_session_cache": False, "ssl_session_cache_size": "10m"},
+                "ssl_session_cache_size has no effect",
+            ),
+        ],
+    )
+    def test_invalid(self, settings: dict, error: str) -> None:
+        with pytest.raises(ValidationError, match=error):
+            IngressPerformanceConfig.model_validate(settings)
+
+
+def test_ingress_scaling_range() -> None:
+    with pytest.raises(ValidationError, match="min_replicas 3 is more than"):
+        IngressScalingConfig(min_replicas=3, max_replicas=2)
+
+
+@pytest.mark.parametrize(
+    "settings, error",
+    [
+        (
+            {"type": "lb", "preserve_source": True},
+            "preserve_source only apply to load balancers of type nlb",
+        ),
+        ({"max_bandwidth_mbps": 100}, "only apply to load balancers of type lb"),
+        (
+            {"type": "lb", "min_bandwidth_mbps": 100, "max_bandwidth_mbps": 50},
+            "min_bandwidth_mbps 100 is more than",
+        ),
+        ({"type": "lb", "max_bandwidth_mbps": 9000}, "less than or equal to 8000"),
+    ],
+)
+def test_ingress_load_balancer_invalid(settings: dict, error: str) -> None:
+    with pytest.raises(ValidationError, match=error):
+        IngressLoadBalancerConfig.model_validate(settings)
@@ -0,0 +1,226 @@
+import io
+import os
+import socket
+import threading
+import time
+from collections.abc import Generator
+from pathlib import Path
+
+import pytest
+
+from lab.libs import daemon
+from lab.libs.daemon import forward_command, request_command, serve
+
+
+@pytest.fixture
+def socket_path(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> Generator[Path, None, None]:
+    # Unix socket paths are limited to about 100 bytes
+    path = Path(f"/tmp/lab-test-{os.getpid()}.sock")
+    monkeypatch.setenv("LAB_SOCKET", str(path))
+    monkeypatch.delenv("LAB_NO_SERVE", raising=False)
+
+    yield path
+
+    path.unlink(missing_ok=True)
+
+
+class BlockingApp:
+    """
+    A command which writes a line, then waits to be released before writing
+    another.
+    """
+
+    def __init__(self) -> None:
+        self.release = threading.Event()
+
+    def __call__(self, args: list[str], prog_name: str) -> None:
+        print("first", flush=True)
+        assert self.release.wait(5)
+        print("second")
+
+
+class Output(io.BytesIO):
+    """
+    Records what is written to it, signalling each write.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.written = threading.Event()
+
+    def write(self, data) -> int:  # type: ignore[override]
+        n = super().write(data)
+        self.written.set()
+        return n
+
+
+@pytest.fixture
+def blocking_app(monkeypatch: pytest.MonkeyPatch) -> BlockingApp:
+    app = BlockingApp()
+    monkeypatch.setattr("lab.__main__.app", app)
+    return app
+
+
+def request_in_thread(socket_path: Path, stdout: Output) -> threading.Thread:
+    thread = threading.Thread(
+        target=request_command,
+        args=(socket_path, ["k8s", "synth"]),
+        kwargs={"stdout": stdout, "stderr": io.BytesIO()},
+    )
+    thread.start()
+    return thread
+
+
+def start_daemon(socket_path: Path, *, max_requests: int) -> threading.Thread:
+    thread = threading.Thread(
+        target=serve,
+        args=(socket_path,),
+        kwargs={"max_requests": max_requests, "preload": []},
+    )
+    thread.start()
+
+    while not socket_path.exists():
+        assert thread.is_alive()
+        time.sleep(0.01)
+
+    return thread
+
+
+class TestForwardCommand:
+    def test_not_running(self, socket_path: Path) -> None:
+        assert forward_command(["k8s", "synth", "--config-file", "x"]) is None
+
+    def test_forwards(
+        self,
+        socket_path: Path,
+        tmp_path: Path,
+        capfdbinary: pytest.CaptureFixture[bytes],
+    ) -> None:
+        thread = start_daemon(socket_path, max_requests=1)
+
+        exit_code = forward_command(
+            ["k8s", "synth", "--config-file", str(tmp_path / "missing")]
+        )
+        thread.join()
+
+        assert 2 == exit_code
+        assert b"No such file" in capfdbinary.readouterr().err
+
+    @pytest.mark.parametrize(
+        "args",
+        [
+            ["k8s", "lock"],
+            ["k8s", "synth", "--help"],
+            ["k8s", "synth", "--config-file", "x", "--watch"],
+            ["k8s", "synth", "--config-file", "-"],
+            ["k8s", "synth", "--config-file=-"],
+        ],
+    )
+    def test_not_served(self, socket_path: Path, args: list[str]) -> None:
+        thread = start_daemon(socket_path, max_requests=1)
+
+        try:
+            assert forward_command(args) is None
+        finally:
+            request_command(socket_path, ["--help"])
+            thread.join()
+
+
+class TestServe:
+    def test_runs_command(self, socket_path: Path, tmp_path: Path) -> None:
+        thread = start_daemon(socket_path, max_requests=1)
+
+        stderr = io.BytesIO()
+        response = request_command(
+            socket_path,
+            ["k8s", "synth", "--config-file", str(tmp_path / "missing")],
+            stdout=io.BytesIO(),
+            stderr=stderr,
+        )
+        thread.join()
+
+        assert response is not None
+        assert "ok" == response["status"]
+        assert 2 == response["exit_code"]
+        assert b"No such file" in stderr.getvalue()
+        assert not socket_path.exists()
+
+    def test_streams_output(self, socket_path: Path, blocking_app: BlockingApp) -> None:
+        thread = start_daemon(socket_path, max_requests=1)
+        stdout = Output()
+
+        client = request_in_thread(socket_path, stdout)
+        try:
+            assert stdout.written.wait(5)
+            assert b"first\n" == stdout.getvalue()
+        finally:
+            blocking_app.release.set()
+            client.join()
+            thread.join()
+
+        assert b"first\nsecond\n" == stdout.getvalue()
+
+    def test_falls_back_while_running(
+        self, socket_path: Path, blocking_app: BlockingApp
+    ) -> None:
+        thread = start_daemon(socket_path, max_requests=1)
+        stdout = Output()
+
+        client = request_in_thread(socket_path, stdout)
+        try:
+            assert stdout.written.wait(5)
+            response = request_command(socket_path, ["k8s", "synth"])
+        finally:
+            blocking_app.release.set()
+            client.join()
+            thread.join()
+
+        assert response is not None
+        assert "fallback" == response["status"]
+
+    def test_stalled_client_blocks_no_other(
+        self, socket_path: Path, tmp_path: Path
+    ) -> None:
+        thread = start_daemon(socket_path, max_requests=1)
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stalled:
+            stalled.connect(str(socket_path))
+
+            response = request_command(
+                socket_path,
+                ["k8s", "synth", "--config-file", str(tmp_path / "missing")],
+                stdout=io.BytesIO(),
+                stderr=io.BytesIO(),
+            )
+            thread.join()
+
+        assert response is not None
+        assert "ok" == response["status"]
+
+    def test_restarts_if_sources_change(
+        self, socket_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        thread = start_daemon(socket_path, max_requests=10)
+
+        monkeypatch.setattr(daemon, "_source_stamp", lambda: [])
+        response = request_command(socket_path, ["--help"])
+        thread.join()
+
+        assert response is not None
+        assert "fallback" == response["status"]
+
+    def test_falls_back_if_runtime_env_differs(
+        self, socket_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        thread = start_daemon(socket_path, max_requests=1)
+
+        monkeypatch.setenv("CDK8S_DISABLE_SORT", "1")
+        response = request_command(socket_path, ["--help"])
+        monkeypatch.delenv("CDK8S_DISABLE_SORT")
+        request_command(socket_path, ["--help"])
+        thread.join()
+
+        assert response is not None
+        assert "fallback" == response["status"]
@@ -0,0 +1,141 @@
+from pathlib import Path
+
+import pytest
+from pydantic import BaseModel, SecretStr
+
+from lab.libs.fingerprint import (
+    FingerprintStore,
+    get_fingerprint_store,
+    hash_files,
+    hash_sources,
+    reveal_secrets,
+    version_constants,
+)
+
+
+class Example:
+    VERSION = "1.0.0"
+    CHART_VERSION = "2.0.0"
+
+
+class ExampleConfig(BaseModel):
+    name: str
+    token: SecretStr
+
+
+class TestHashSources:
+    def test_changes_with_content(self, tmp_path: Path) -> None:
+        path = tmp_path / "a.py"
+        path.write_text("a = 1")
+        before = hash_sources([path])
+
+        path.write_text("a = 2")
+        assert before != hash_sources([path])
+
+    def test_independent_of_order(self, tmp_path: Path) -> None:
+        a, b = tmp_path / "a.py", tmp_path / "b.py"
+        a.write_text("a")
+        b.write_text("b")
+
+        assert hash_sources([a, b]) == hash_sources([b, a])
+
+
+class TestVersionConstants:
+    def test_only_defined_constants(self) -> None:
+        assert {"VERSION": "1.0.0", "CHART_VERSION": "2.0.0"} == version_constants(
+            Example, ["VERSION", "CHART_VERSION", "OPERATOR_VERSION"]
+        )
+
+
+class TestRevealSecrets:
+    def test_reveals_nested_secrets(self) -> None:
+        assert {"configs": [{"name": "a", "token": "secret"}]} == reveal_secrets(
+            {"configs": [ExampleConfig(name="a", token=SecretStr("secret"))]}
+        )
+
+
+class TestFingerprintStore:
+    def test_current_after_record(self, tmp_path: Path) -> None:
+        outdir = tmp_path / "dist"
+        outdir.mkdir()
+        (outdir / "a.k8s.yaml").write_bytes(b"a")
+
+        store = FingerprintStore(tmp_path / "fingerprints.json")
+        store.record("a", "fp", {"a.k8s.yaml": b"a"})
+        store.save()
+
+        store = FingerprintStore(tmp_path / "fingerprints.json")
+        assert store.is_current("a", "fp", outdir)
+        assert not store.is_current("a", "other", outdir)
+        assert not store.is_current("b", "fp", outdir)
+
+    def test_not_current_if_file_changed(self, tmp_path: Path) -> None:
+        outdir = tmp_path / "dist"
+        outdir.mkdir()
+        (outdir / "a.k8s.yaml").write_bytes(b"edited")
+
+        store = FingerprintStore(tmp_path / "fingerprints.json")
+        store.record("a", "fp", {"a.k8s.yaml": b"a"})
+
+        assert not store.is_current("a", "fp", outdir)
+
+    def test_not_current_if_file_missing(self, tmp_path: Path) -> None:
+        store = FingerprintStore(tmp_path / "fingerprints.json")
+        store.record("a", "fp", {"a.k8s.yaml": b"a"})
+
+        assert not store.is_current("a", "fp", tmp_path)
+
+    def test_record_hashes(self, tmp_path: Path) -> None:
+        outdir = tmp_path / "dist"
+        outdir.mkdir()
+        (outdir / "a.k8s.yaml").write_bytes(b"a")
+
+        store = FingerprintStore(tmp_path / "fingerprints.json")
+        store.record_hashes("a", "fp", hash_files({"a.k8s.yaml": b"a"}))
+
+        assert store.is_current("a", "fp", outdir)
+
+    def test_prune_removed_units(self, tmp_path: Path) -> None:
+        for name in ["a.k8s.yaml", "b.k8s.yaml"]:
+            (tmp_path / name).write_bytes(b"")
+
+        store = FingerprintStore(tmp_path / "fingerprints.json")
+        store.record("a", "fp", {"a.k8s.yaml": b""})
+        store.record("b", "fp", {"b.k8s.yaml": b""})
+
+        assert ["b.k8s.yaml"] == store.prune(["a"], tmp_path)
+        assert (tmp_path / "a.k8s.yaml").exists()
+        assert not (tmp_path / "b.k8s.yaml").exists()
+        assert not store.is_current("b", "fp", tmp_path)
+
+    def test_prune_files_no_longer_produced(self, tmp_path: Path) -> None:
+        for name in ["a.k8s.yaml", "renamed.k8s.yaml"]:
+            (tmp_path / name).write_bytes(b"")
+
+        store = FingerprintStore(tmp_path / "fingerprints.json")
+        store.record("a", "fp", {"a.k8s.yaml": b""})
+        store.record("a", "fp", {"renamed.k8s.yaml": b""})
+
+        assert ["a.k8s.yaml"] == store.prune(["a"], tmp_path)
+        assert (tmp_path / "renamed.k8s.yaml").exists()
+
+    def test_prune_keeps_files_moved_between_units(self, tmp_path: Path) -> None:
+        (tmp_path / "a.k8s.yaml").write_bytes(b"")
+
+        store = FingerprintStore(tmp_path / "fingerprints.json")
+        store.record("a", "fp", {"a.k8s.yaml": b""})
+        store.record("b", "fp", {"a.k8s.yaml": b""})
+
+        assert [] == store.prune(["b"], tmp_path)
+        assert (tmp_path / "a.k8s.yaml").exists()
+
+
+class TestGetFingerprintStore:
+    def test_per_outdir(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setenv("LAB_CACHE_DIR", str(tmp_path / "cache"))
+
+        dist = get_fingerprint_store(tmp_path / "dist")
+        cdktf_out = get_fingerprint_store(tmp_path / "cdktf.out")
+
+        assert dist.path != cdktf_out.path
+        assert dist.path.is_relative_to(tmp_path / "cache")
@@ -0,0 +1,56 @@
+import sys
+
+import lab.libs.daemon
+from lab.libs.modules import (
+    PACKAGE_ROOT,
+    dependents,
+    import_graph,
+    imported_sources,
+    module_name,
+    reload_modules,
+)
+
+
+class TestModuleName:
+    def test_module(self) -> None:
+        assert "lab.libs.modules" == module_name(PACKAGE_ROOT / "libs" / "modules.py")
+
+    def test_package(self) -> None:
+        assert "lab.charts" == module_name(PACKAGE_ROOT / "charts" / "__init__.py")
+
+
+class TestImportGraph:
+    def test_imports(self) -> None:
+        graph = import_graph()
+
+        assert "lab.libs.k8s.documents" in graph["lab.libs.k8s.diff"]
+        assert {"lab.charts", "lab.charts.Bitwarden"} <= graph["lab.cluster"]
+
+    def test_imported_sources(self) -> None:
+        sources = imported_sources(["lab.libs.k8s.diff"])
+
+        assert PACKAGE_ROOT / "libs" / "k8s" / "diff.py" in sources
+        assert PACKAGE_ROOT / "libs" / "k8s" / "documents.py" in sources
+        assert PACKAGE_ROOT / "libs" / "daemon.py" not in sources
+
+    def test_dependents(self) -> None:
+        graph = {"a": set(), "b": {"a"}, "c": {"b"}, "d": set()}
+
+        assert {"a", "b", "c"} == dependents(graph, ["a"])
+
+
+class TestReloadModules:
+    def test_reloads_changed_modules(self) -> None:
+        module = sys.modules["lab.libs.daemon"]
+
+        reloaded = reload_modules([PACKAGE_ROOT / "libs" / "daemon.py"])
+
+        # the CLI, which imports it, is running
+        assert ["lab.libs.daemon"] == reloaded
+        assert module is lab.libs.daemon
+
+    def test_ignores_running_modules(self) -> None:
+        assert [] == reload_modules([PACKAGE_ROOT / "libs" / "watch.py"])
+
+    def test_ignores_other_files(self) -> None:
+        assert [] == reload_modules([PACKAGE_ROOT.parent / "README.md"])
@@ -0,0 +1,116 @@
+import io
+import json
+from collections.abc import Generator
+from pathlib import Path
+
+import cdk8s
+import pytest
+
+from lab.libs.k8s.include import Include
+from lab.libs.profile import (
+    Profiler,
+    disable_profiling,
+    enable_profiling,
+    profile,
+    report_profiles,
+    summary_table,
+    to_speedscope,
+    write_profiles,
+)
+
+
+@pytest.fixture
+def profiler() -> Generator[Profiler, None, None]:
+    yield enable_profiling("test")
+    disable_profiling()
+
+
+class TestProfile:
+    def test_disabled_is_noop(self) -> None:
+        with profile("phase"):
+            pass
+
+    def test_records_nested_phases(self, profiler: Profiler) -> None:
+        with profile("outer"):
+            with profile("a"):
+                pass
+            with profile("b"):
+                pass
+
+        (outer,) = profiler.profile.spans
+        assert "outer" == outer.name
+        assert ["a", "b"] == [x.name for x in outer.children]
+        assert outer.start <= outer.children[0].start
+        assert outer.children[1].end <= outer.end
+
+    def test_records_on_error(self, profiler: Profiler) -> None:
+        with pytest.raises(ValueError):
+            with profile("phase"):
+                raise ValueError()
+
+        with profile("next"):
+            pass
+
+        assert ["phase", "next"] == [x.name for x in profiler.profile.spans]
+
+    def test_include_phases(self, profiler: Profiler) -> None:
+        Include(
+            cdk8s.Testing.chart(),
+            "include",
+            url=str(Path(__file__).parent / "k8s" / "deployments.yaml"),
+        )
+
+        assert ["include fetch (include)", "include parse (include)"] == [
+            x.name for x in profiler.profile.spans
+        ]
+
+
+class TestOutput:
+    def test_summary_sorted_by_total(self, profiler: Profiler) -> None:
+        for name in ["short", "long", "long"]:
+            with profile(name):
+                pass
+
+        profiler.profile.spans[1].end += 10**9
+        table = summary_table([profiler.profile])
+
+        assert ["long", "short"] == list(table.columns[0].cells)
+        assert ["2", "1"] == list(table.columns[1].cells)
+
+    def test_speedscope_events_balanced(self, profiler: Profiler) -> None:
+        with profile("outer"):
+            with profile("inner"):
+                pass
+
+        data = to_speedscope("test", [profiler.profile])
+
+        assert [{"name": "outer"}, {"name": "inner"}] == data["shared"]["frames"]
+        assert [("O", 0), ("O", 1), ("C", 1), ("C", 0)] == [
+            (x["type"], x["frame"]) for x in data["profiles"][0]["events"]
+        ]
+
+    def test_write_profiles(self, tmp_path: Path, profiler: Profiler) -> None:
+        with profile("phase"):
+            pass
+
+        paths = write_profiles(tmp_path, "synth", [profiler.profile])
+
+        assert ["synth.json", "synth.speedscope.json"] == [x.name for x in paths]
+        summary = json.loads(paths[0].read_text())
+        assert "phase" == summary["profiles"][0]["spans"][0]["name"]
+
+    def test_report_profiles_to_file(
+        self,
+        tmp_path: Path,
+        profiler: Profiler,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        with profile("phase"):
+            pass
+        file = io.StringIO()
+
+        report_profiles(tmp_path, "synth", [profiler.profile], file=file)
+
+        assert "phase" in file.getvalue()
+        assert f"wrote {tmp_path / 'synth.json'}" in file.getvalue()
+        assert "" == capsys.readouterr().out
@@ -0,0 +1,124 @@
+import json
+import re
+from pathlib import Path
+
+import cdk8s
+import cdk8s_plus_29 as kplus
+import pytest
+
+from lab.testing import Resources, assert_snapshot, object_hashes, synth_chart
+
+OBJECTS = [
+    {"apiVersion": "v1", "kind": "Namespace", "metadata": {"name": "app"}},
+    {
+        "apiVersion": "v1",
+        "kind": "Service",
+        "metadata": {"name": "app-web", "namespace": "app", "labels": {"tier": "web"}},
+    },
+    {
+        "apiVersion": "v1",
+        "kind": "Service",
+        "metadata": {"name": "app-db", "namespace": "app", "labels": {"tier": "db"}},
+    },
+    {
+        "apiVersion": "v1",
+        "kind": "Service",
+        "metadata": {"name": "other-web", "namespace": "other"},
+    },
+]
+
+
+@pytest.fixture
+def resources() -> Resources:
+    return Resources(OBJECTS)
+
+
+class TestResources:
+    def test_by_kind(self, resources: Resources) -> None:
+        assert OBJECTS[1:] == resources.find("Service")
+        assert [] == resources.find("Deployment")
+
+    def test_by_name(self, resources: Resources) -> None:
+        assert OBJECTS[2] == resources.get("Service", "app-db")
+        assert resources.get("Namespace", "app-db") is None
+
+    def test_by_pattern(self, resources: Resources) -> None:
+        assert [OBJECTS[1], OBJECTS[3]] == resources.find(
+            "Service", re.compile(".*-web")
+        )
+
+    def test_by_namespace(self, resources: Resources) -> None:
+        assert [OBJECTS[3]] == resources.find("Service", namespace="other")
+
+    def test_by_labels(self, resources: Resources) -> None:
+        assert [OBJECTS[1]] == resources.find(labels={"tier": "web"})
+        assert [] == resources.find(labels={"tier": "web", "other": "x"})
+
+    def test_one(self, resources: Resources) -> None:
+        assert OBJECTS[0] == resources.one("Namespace")
+
+        with pytest.raises(LookupError, match="found 3"):
+            resources.one("Service")
+
+
+class TestSynthChart:
+    def test_synthesizes_once(self) -> None:
+        built = []
+
+        def build(app: cdk8s.App) -> cdk8s.Chart:
+            chart = cdk8s.Chart(app, "chart")
+            kplus.Deployment(
+                chart, "deployment", containers=[kplus.ContainerProps(image="nginx")]
+            )
+            built.append(chart)
+            return chart
+
+        first = synth_chart("test-synthesizes-once", build)
+        second = synth_chart("test-synthesizes-once", build)
+
+        assert first is second
+        assert built == [first.chart]
+        assert first.get("Deployment")
+
+
+class TestAssertSnapshot:
+    def test_writes_and_matches(
+        self, resources: Resources, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        path = tmp_path / "snapshot.json"
+
+        monkeypatch.setenv("LAB_UPDATE_SNAPSHOTS", "1")
+        assert_snapshot(resources, path)
+        assert object_hashes(resources) == json.loads(path.read_text())
+
+        monkeypatch.delenv("LAB_UPDATE_SNAPSHOTS")
+        assert_snapshot(resources, path)
+
+    def test_lists_changed_objects(
+        self, resources: Resources, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        path = tmp_path / "snapshot.json"
+        monkeypatch.setenv("LAB_UPDATE_SNAPSHOTS", "1")
+        assert_snapshot(resources, path)
+        monkeypatch.delenv("LAB_UPDATE_SNAPSHOTS")
+
+        changed = json.loads(json.dumps(OBJECTS[:3]))
+        changed[1]["metadata"]["labels"]["tier"] = "frontend"
+
+        with pytest.raises(AssertionError) as e:
+            assert_snapshot(Resources(changed), path)
+
+        assert "~ v1 Service app/app-web" in str(e.value)
+        assert "- v1 Service other/other-web" in str(e.value)
+
+    def test_fails_without_snapshot(
+        self, resources: Resources, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.delenv("LAB_UPDATE_SNAPSHOTS", raising=False)
+
+        with pytest.raises(AssertionError, match="no snapshot at"):
+            assert_snapshot(resources, tmp_path / "missing.json")
+
+    def test_duplicate_objects(self) -> None:
+        with pytest.raises(ValueError, match="more than once"):
+            object_hashes(Resources([OBJECTS[0], OBJECTS[0]]))
@@ -0,0 +1,64 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from lab.libs.watch import InotifyWatcher, PollingWatcher, Watcher
+
+
+@pytest.fixture(params=["inotify", "polling"])
+def make_watcher(request: pytest.FixtureRequest, tmp_path: Path):
+    (tmp_path / "package").mkdir()
+    (tmp_path / "package" / "module.py").write_text("a = 1\n")
+    (tmp_path / "config.yaml").write_text("a: 1\n")
+
+    def make() -> Watcher:
+        args = ([tmp_path / "package"], [tmp_path / "config.yaml"])
+        if request.param == "polling":
+            return PollingWatcher(*args, interval=0.01)
+
+        try:
+            return InotifyWatcher(*args)
+        except OSError:
+            pytest.skip("inotify is not available")
+
+    return make
+
+
+def touch(path: Path, text: str) -> None:
+    path.write_text(text)
+    # some filesystems have coarse modification times
+    os.utime(path, ns=(0, path.stat().st_mtime_ns + 10**9))
+
+
+class TestWatcher:
+    def test_changed_source(self, make_watcher, tmp_path: Path) -> None:
+        with make_watcher() as watcher:
+            touch(tmp_path / "package" / "module.py", "a = 2\n")
+
+            assert {(tmp_path / "package" / "module.py").resolve()} == watcher.wait(
+                timeout=5
+            )
+
+    def test_replaced_file(self, make_watcher, tmp_path: Path) -> None:
+        with make_watcher() as watcher:
+            touch(tmp_path / "config.yaml.tmp", "a: 2\n")
+            (tmp_path / "config.yaml.tmp").replace(tmp_path / "config.yaml")
+
+            assert {(tmp_path / "config.yaml").resolve()} == watcher.wait(timeout=5)
+
+    def test_new_directory(self, make_watcher, tmp_path: Path) -> None:
+        with make_watcher() as watcher:
+            (tmp_path / "package" / "sub").mkdir()
+            touch(tmp_path / "package" / "sub" / "module.py", "b = 1\n")
+
+            changed = watcher.wait(timeout=5)
+
+            assert (tmp_path / "package" / "sub" / "module.py").resolve() in changed
+
+    def test_ignores_other_files(self, make_watcher, tmp_path: Path) -> None:
+        with make_watcher() as watcher:
+            touch(tmp_path / "package" / "notes.txt", "")
+            touch(tmp_path / "other.yaml", "")
+
+            assert set() == watcher.wait(timeout=0.2)
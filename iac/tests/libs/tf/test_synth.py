@@ -0,0 +1,111 @@
+import json
+from pathlib import Path
+
+import cdktf
+
+from lab.libs.tf.synth import (
+    MANIFEST_FILE,
+    read_manifest,
+    synth_stack_files,
+    write_stacks,
+)
+
+
+def build(app: cdktf.App, stack_ids: list[str]) -> None:
+    for stack_id in stack_ids:
+        stack = cdktf.TerraformStack(app, stack_id)
+        variable = cdktf.TerraformVariable(stack, "name", type="string")
+        cdktf.TerraformOutput(stack, "greeting", value=variable.string_value)
+
+
+def read_tree(root: Path) -> dict[str, bytes]:
+    return {
+        str(x.relative_to(root)): x.read_bytes()
+        for x in sorted(root.rglob("*"))
+        if x.is_file()
+    }
+
+
+class TestSynthStackFiles:
+    def test_matches_app_synth(self, tmp_path: Path) -> None:
+        app = cdktf.App(outdir=str(tmp_path))
+        build(app, ["a"])
+        app.synth()
+
+        stack = synth_stack_files("a", lambda app: build(app, ["a"]), context={})
+
+        files = read_tree(tmp_path)
+        manifest = json.loads(files.pop(MANIFEST_FILE))
+        assert files == stack.files
+        assert manifest["stacks"]["a"] == stack.manifest
+        assert manifest["version"] == stack.version
+
+
+class TestWriteStacks:
+    def test_stacks_synthesized_separately_match(self, tmp_path: Path) -> None:
+        app = cdktf.App(outdir=str(tmp_path / "together"))
+        build(app, ["a", "b"])
+        app.synth()
+
+        write_stacks(
+            tmp_path / "separately",
+            [
+                synth_stack_files(x, lambda app, x=x: build(app, [x]), context={})
+                for x in ["a", "b"]
+            ],
+        )
+
+        together = read_tree(tmp_path / "together")
+        separately = read_tree(tmp_path / "separately")
+        assert json.loads(together.pop(MANIFEST_FILE)) == json.loads(
+            separately.pop(MANIFEST_FILE)
+        )
+        assert together == separately
+
+    def test_replaces_previous_files(self, tmp_path: Path) -> None:
+        stale = tmp_path / "stacks" / "a" / "stale.json"
+        stale.parent.mkdir(parents=True)
+        stale.write_text("{}")
+
+        write_stacks(
+            tmp_path,
+            [synth_stack_files("a", lambda app: build(app, ["a"]), context={})],
+        )
+
+        assert not stale.exists()
+        assert (tmp_path / "stacks" / "a" / "cdk.tf.json").exists()
+
+    def test_keeps_other_stacks(self, tmp_path: Path) -> None:
+        app = cdktf.App(outdir=str(tmp_path))
+        build(app, ["a", "b"])
+        app.synth()
+        before = read_tree(tmp_path)
+
+        write_stacks(
+            tmp_path,
+            [synth_stack_files("b", lambda app: build(app, ["b"]), context={})],
+        )
+
+        after = read_tree(tmp_path)
+        assert json.loads(before.pop(MANIFEST_FILE)) == json.loads(
+            after.pop(MANIFEST_FILE)
+        )
+        assert before == after
+
+    def test_drops_removed_stacks(self, tmp_path: Path) -> None:
+        app = cdktf.App(outdir=str(tmp_path))
+        build(app, ["a", "b"])
+        app.synth()
+
+        write_stacks(
+            tmp_path,
+            [synth_stack_files("b", lambda app: build(app, ["b"]), context={})],
+            stack_names=["b"],
+        )
+
+        assert ["b"] == list(read_manifest(tmp_path)["stacks"])
+
+
+class TestReadManifest:
+    def test_missing(self, tmp_path: Path) -> None:
+        assert {} == read_manifest(tmp_path)["stacks"]
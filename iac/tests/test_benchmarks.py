@@ -0,0 +1,50 @@
+from benchmarks.runner import compare_results
+
+
+def results(**benchmarks: dict) -> dict:
+    return {"benchmarks": benchmarks}
+
+
+def regressions(baseline: dict, current: dict, threshold: float) -> set:
+    return {
+        (x.name, x.metric)
+        for x in compare_results(baseline, current, threshold)
+        if x.regressed
+    }
+
+
+BASELINE = results(include={"median_ms": 100.0, "jsii_calls": 10})
+
+
+class TestCompareResults:
+    def test_regression_past_threshold(self) -> None:
+        current = results(include={"median_ms": 111.0, "jsii_calls": 10})
+
+        assert {("include", "median_ms")} == regressions(BASELINE, current, 0.1)
+
+    def test_regression_within_threshold(self) -> None:
+        current = results(include={"median_ms": 109.0, "jsii_calls": 11})
+
+        comparisons = compare_results(BASELINE, current, 0.1)
+
+        assert 2 == len(comparisons)
+        assert not any(x.regressed for x in comparisons)
+        assert 0.09 == round(comparisons[0].change, 2)
+
+    def test_jsii_calls_regression(self) -> None:
+        current = results(include={"median_ms": 50.0, "jsii_calls": 12})
+
+        assert {("include", "jsii_calls")} == regressions(BASELINE, current, 0.1)
+
+    def test_missing_from_baseline(self) -> None:
+        current = results(
+            include={"median_ms": 100.0, "jsii_calls": 10},
+            synth={"median_ms": 1000.0, "jsii_calls": 500},
+        )
+
+        assert {"include"} == {x.name for x in compare_results(BASELINE, current, 0.1)}
+
+    def test_skipped(self) -> None:
+        current = results(include={"skipped": "no helm"})
+
+        assert [] == compare_results(BASELINE, current, 0.1)
@@ -0,0 +1,91 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from lab.libs.exceptions import LabError
+
+CONFIG_PATH = Path(__file__).parent / "config.yaml"
+
+
+def loaded_modules(code: str) -> set[str]:
+    """
+    Returns the modules loaded after running `code` in a new interpreter.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", f"{code}\nimport sys\nprint(' '.join(sys.modules))"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return set(result.stdout.split())
+
+
+def loaded_from(modules: set[str], *packages: str) -> set[str]:
+    return {x for x in modules if x.startswith(tuple(f"{p}." for p in packages))} | (
+        modules & set(packages)
+    )
+
+
+class TestStartup:
+    def test_cli_does_not_load_jsii(self) -> None:
+        loaded = loaded_modules("import lab.__main__")
+
+        assert not loaded_from(
+            loaded, "cdk8s", "cdk8s_plus_29", "cdktf", "imports", "jsii"
+        )
+
+    def test_k8s_synth_does_not_load_cdktf(self) -> None:
+        loaded = loaded_modules("import lab.cluster")
+
+        assert "cdk8s" in loaded
+        assert not loaded_from(loaded, "cdktf", "imports.oci", "imports.oke")
+
+    def test_plan_capacity_does_not_load_jsii(self, tmp_path: Path) -> None:
+        loaded = loaded_modules(
+            "from typer.testing import CliRunner\n"
+            "from lab.__main__ import app\n"
+            f"CliRunner().invoke(app, ['plan', 'capacity', '--manifests', '{tmp_path}'])"
+        )
+
+        assert "lab.libs.capacity" in loaded
+        assert not loaded_from(loaded, "cdk8s", "cdktf", "imports", "jsii")
+
+    def test_infra_synth_does_not_load_cdk8s_plus(self) -> None:
+        loaded = loaded_modules("import lab.stacks")
+
+        assert "cdktf" in loaded
+        assert not loaded_from(loaded, "cdk8s_plus_29")
+
+
+class TestK8sSynth:
+    @pytest.mark.parametrize("output", ["-", "dist"])
+    def test_reports_lab_error(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, output: str
+    ) -> None:
+        from lab.__main__ import app
+
+        def synth_cluster(*args, **kwargs) -> None:
+            raise LabError("container app has no CPU limit")
+
+        monkeypatch.setenv("LAB_CACHE_DIR", str(tmp_path / "cache"))
+        monkeypatch.setattr("lab.cluster.synth_cluster", synth_cluster)
+        monkeypatch.chdir(tmp_path)
+
+        result = CliRunner().invoke(
+            app,
+            [
+                "k8s",
+                "synth",
+                "--config-file",
+                str(CONFIG_PATH),
+                "--output",
+                output,
+            ],
+        )
+
+        assert 1 == result.exit_code
+        assert isinstance(result.exception, SystemExit)
+        assert "container app has no CPU limit" in result.output
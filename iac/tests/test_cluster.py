@@ -0,0 +1,119 @@
+import inspect
+from pathlib import Path
+
+import pytest
+from pydantic import SecretStr
+
+from lab.charts import IngressNginx
+from lab.cluster import CHART_GROUPS, build_cluster, synth_cluster
+from lab.libs.config import Config, parse_config
+from lab.libs.k8s.resources import check_bounded
+from lab.libs.k8s.synth import synth_files
+
+CONFIG_PATH = Path(__file__).parent / "config.yaml"
+
+
+@pytest.fixture(scope="module")
+def config() -> Config:
+    with open(CONFIG_PATH) as f:
+        return parse_config(f)
+
+
+class TestSynthCluster:
+    @pytest.fixture(scope="class")
+    def serial(self, config: Config) -> dict[str, bytes]:
+        return synth_files(lambda app: build_cluster(app, config))
+
+    def test_synthesizes_every_chart(self, serial: dict[str, bytes]) -> None:
+        assert {
+            "ingress-nginx.k8s.yaml",
+            "cloudflare-external-dns.k8s.yaml",
+            "cert-manager.k8s.yaml",
+            "cloudflare-acme-issuer.k8s.yaml",
+            "grafana-alloy-crd.k8s.yaml",
+            "grafana-alloy.k8s.yaml",
+            "tailscale.k8s.yaml",
+            "bitwarden.k8s.yaml",
+        } == set(serial)
+
+    def test_every_container_is_bounded(self, serial: dict[str, bytes]) -> None:
+        check_bounded(serial)
+
+    def test_groups_identical_to_single_app(self, serial: dict[str, bytes]) -> None:
+        result = synth_cluster(CONFIG_PATH.read_text(), jobs=1, offline=False)
+        assert serial == result.files
+
+    def test_parallel_identical_to_single_app(self, serial: dict[str, bytes]) -> None:
+        result = synth_cluster(
+            CONFIG_PATH.read_text(), jobs=len(CHART_GROUPS), offline=False
+        )
+        assert serial == result.files
+
+    @pytest.mark.parametrize("jobs,isolate", [(1, False), (2, True)])
+    def test_on_group(self, serial: dict[str, bytes], jobs: int, isolate: bool) -> None:
+        streamed: dict[str, dict[str, bytes]] = {}
+
+        result = synth_cluster(
+            CONFIG_PATH.read_text(),
+            jobs=jobs,
+            offline=False,
+            on_group=streamed.__setitem__,
+            isolate=isolate,
+        )
+
+        assert list(CHART_GROUPS) == list(streamed)
+        assert serial == {k: v for x in streamed.values() for k, v in x.items()}
+        assert {} == result.files_by_group
+
+
+class TestChartGroupFingerprint:
+    def test_stable(self, config: Config) -> None:
+        for group in CHART_GROUPS.values():
+            assert group.fingerprint(config) == group.fingerprint(config)
+
+    def test_changes_with_config_slice(self, config: Config) -> None:
+        changed = config.model_copy(deep=True)
+        changed.bitwarden.smtp.host = "smtp.example.org"
+
+        assert {
+            k
+            for k, v in CHART_GROUPS.items()
+            if v.fingerprint(config) != v.fingerprint(changed)
+        } == {"bitwarden"}
+
+    def test_changes_with_secrets(self, config: Config) -> None:
+        changed = config.model_copy(deep=True)
+        changed.tailscale.client_secret = SecretStr("other-secret")
+
+        group = CHART_GROUPS["tailscale"]
+        assert group.fingerprint(config) != group.fingerprint(changed)
+
+    def test_changes_with_version(
+        self, config: Config, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        group = CHART_GROUPS["ingress-nginx"]
+        before = group.fingerprint(config)
+
+        monkeypatch.setattr(group.charts[0], "VERSION", "0.0.0")
+        assert before != group.fingerprint(config)
+
+    def test_changes_with_sources_read_by_builder(
+        self, config: Config, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        before = {k: v.fingerprint(config) for k, v in CHART_GROUPS.items()}
+
+        # bitwarden reads IngressNginx.INGRESS_CLASS_NAME, outside its group
+        source = Path(inspect.getfile(IngressNginx))
+        edited = source.read_bytes().replace(
+            b'INGRESS_CLASS_NAME = "nginx"', b'INGRESS_CLASS_NAME = "other"'
+        )
+        assert edited != source.read_bytes()
+
+        read_bytes = Path.read_bytes
+        monkeypatch.setattr(
+            Path, "read_bytes", lambda x: edited if x == source else read_bytes(x)
+        )
+
+        assert {"ingress-nginx", "bitwarden"} == {
+            k for k, v in CHART_GROUPS.items() if v.fingerprint(config) != before[k]
+        }
@@ -1,17 +1,120 @@
+import json
+from pathlib import Path
+
 import cdktf
 import pytest
 
-from lab.stacks import Lab
+from lab.constructs import KubernetesCluster
+from lab.libs import capacity
+from lab.stacks import (
+    MOVED_RESOURCES,
+    STACKS,
+    ClusterStack,
+    IdentityStack,
+    TerraformCloud,
+    fingerprint_stack,
+    synth_stack,
+)
+
+CLOUD = TerraformCloud(organization="org", workspace="lab")
+
+
+def synth_json(stack: cdktf.TerraformStack) -> dict:
+    return json.loads(cdktf.Testing.synth(stack))
 
 
-class TestLab:
+def resource_addresses(stack: dict) -> set[str]:
+    return {f"{t}.{k}" for t, xs in stack.get("resource", {}).items() for k in xs}
+
+
+class TestStacks:
     # The test is failing even though the the synthesized stack is valid when
     # checked directly, using `terraform validate`. CDKTF only prints validation
     # errors in TypeScript right now, which makes this difficult to debug.
     @pytest.mark.skip(reason="does not print validation errors")
-    def test_terraform_is_valid(self):
-        lab_stack = Lab(cdktf.Testing.app(), "lab")
-        dst = cdktf.Testing.full_synth(lab_stack)
+    @pytest.mark.parametrize("name", STACKS)
+    def test_terraform_is_valid(self, name: str):
+        stack = STACKS[name](cdktf.Testing.app(), name, cloud=CLOUD)
+        dst = cdktf.Testing.full_synth(stack)
         assert cdktf.Testing.to_be_valid_terraform(
             dst
         ), f"terraform is not valid: {dst}"
+
+    @pytest.mark.parametrize(
+        "name,workspace",
+        [("billing", "lab-billing"), ("identity", "lab-identity"), ("cluster", "lab")],
+    )
+    def test_workspace(self, name: str, workspace: str):
+        stack = STACKS[name](cdktf.Testing.app(), name, cloud=CLOUD)
+
+        cloud = synth_json(stack)["terraform"]["cloud"]
+        assert "org" == cloud["organization"]
+        assert {"name": workspace} == cloud["workspaces"]
+
+    def test_cluster_reads_compartment_from_identity(self):
+        identity = synth_json(
+            IdentityStack(cdktf.Testing.app(), "identity", cloud=CLOUD)
+        )
+        cluster = synth_json(ClusterStack(cdktf.Testing.app(), "cluster", cloud=CLOUD))
+
+        assert "cluster_compartment_id" in identity["output"]
+        (remote_state,) = cluster["data"]["terraform_remote_state"].values()
+        assert {"name": "lab-identity"} == remote_state["config"]["workspaces"]
+
+    @pytest.mark.parametrize("name", MOVED_RESOURCES)
+    def test_moved_resources_are_defined_by_their_stack(self, name: str):
+        stack = synth_json(STACKS[name](cdktf.Testing.app(), name, cloud=CLOUD))
+
+        assert set(MOVED_RESOURCES[name]) == resource_addresses(stack)
+
+    def test_cluster_removes_moved_resources(self):
+        cluster = synth_json(ClusterStack(cdktf.Testing.app(), "cluster", cloud=CLOUD))
+        moved = {x for addresses in MOVED_RESOURCES.values() for x in addresses}
+
+        assert not moved & resource_addresses(cluster)
+        assert [{"destroy": False}] * len(moved) == [
+            x["lifecycle"] for x in cluster["removed"]
+        ]
+        assert moved == {x["from"] for x in cluster["removed"]}
+
+    def test_manifest_lists_dependencies(self):
+        stack = synth_stack("cluster", CLOUD, context={})
+
+        assert ["identity"] == stack.manifest["dependencies"]
+
+
+class TestFingerprintStack:
+    def test_stable(self):
+        assert fingerprint_stack("cluster", CLOUD, {}) == fingerprint_stack(
+            "cluster", CLOUD, {}
+        )
+
+    def test_changes_with_version_constants(self, monkeypatch: pytest.MonkeyPatch):
+        cluster = fingerprint_stack("cluster", CLOUD, {})
+        billing = fingerprint_stack("billing", CLOUD, {})
+        monkeypatch.setattr(KubernetesCluster, "CONTROL_PLANE_VERSION", "v0")
+
+        assert cluster != fingerprint_stack("cluster", CLOUD, {})
+        # billing does not define the cluster
+        assert billing == fingerprint_stack("billing", CLOUD, {})
+
+    def test_changes_with_backend(self):
+        assert fingerprint_stack("billing", CLOUD, {}) != fingerprint_stack(
+            "billing", CLOUD._replace(organization="other"), {}
+        )
+
+    def test_changes_with_imported_sources(self, monkeypatch: pytest.MonkeyPatch):
+        cluster = fingerprint_stack("cluster", CLOUD, {})
+        billing = fingerprint_stack("billing", CLOUD, {})
+
+        # imported by KubernetesCluster, for its worker pool
+        source = Path(capacity.__file__)
+        edited = source.read_bytes() + b"\n# edited\n"
+
+        read_bytes = Path.read_bytes
+        monkeypatch.setattr(
+            Path, "read_bytes", lambda x: edited if x == source else read_bytes(x)
+        )
+
+        assert cluster != fingerprint_stack("cluster", CLOUD, {})
+        assert billing == fingerprint_stack("billing", CLOUD, {})
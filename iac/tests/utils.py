@@ -1,14 +1,22 @@
-import pytest
+from pathlib import Path
 from typing import Any
 
-from re import Pattern
+import cdk8s
+import pytest
 
+from lab.libs.k8s.chart import Chart
+from lab.libs.k8s.include import (
+    Include,
+    LazyInclude,
+    ObjectSelector,
+    include_manifest,
+)
 
-def str_match(a: str, b: str | Pattern) -> bool:
-    if isinstance(b, Pattern):
-        return bool(b.match(a))
+# reduced copies of the upstream manifests included by charts
+FIXTURES_DIR = Path(__file__).parents[1] / "benchmarks" / "fixtures"
 
-    return a == b
+# golden snapshots of the objects of each chart, see `lab.testing.assert_snapshot`
+SNAPSHOT_DIR = Path(__file__).parent / "charts" / "snapshots"
 
 
 def get_default_container_env(deploy_json: Any) -> list[dict]:
@@ -20,13 +28,23 @@ def get_default_container_env(deploy_json: Any) -> list[dict]:
         pytest.fail("Deployment spec is not valid")
 
 
-def get_resource(obj: list[Any], kind: str, name: str | Pattern) -> Any:
-    try:
-        return next(
-            x
-            for x in obj
-            if x.get("kind") == kind
-            and str_match(x.get("metadata", {}).get("name"), name)
-        )
-    except StopIteration:
-        return None
+def synth_included_yaml(path: str, *, lazy: bool, find: bool = False) -> str:
+    """
+    Returns the YAML synthesized from a chart including the manifest at `path`,
+    with `include_manifest` if `lazy`, and with `cdk8s.Include` otherwise. With
+    `find`, every other object is found and modified.
+    """
+    app = cdk8s.App()
+    chart = Chart(app, "chart")
+
+    if lazy:
+        include = include_manifest(chart, "include", url=path)
+        assert isinstance(include, LazyInclude), f"{path} is not loaded lazily"
+    else:
+        include = Include(chart, "include", url=path)
+
+    if find:
+        for obj in include.find_objects(ObjectSelector())[::-2]:
+            obj.metadata.add_annotation("found", "true")
+
+    return app.synth_yaml()